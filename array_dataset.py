@@ -0,0 +1,469 @@
+import numpy as np
+import pandas as pd
+
+from .dataset import _materialize, _rolling_block, _split_windows
+from .profiling import profiled
+from .windows import SlidingWindows
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TiB"
+
+
+class _ExogColumns:
+    """
+    The columns of an array left and right of the target column as one 2D block, rows
+    are gathered from both views when indexed, e.g. by SlidingWindows.x.
+    """
+
+    def __init__(self, data: np.ndarray, target: int, n_columns: int):
+        self.left = data[:, :target]
+        self.right = data[:, target + 1 : n_columns]
+        self.shape = (data.shape[0], n_columns - 1)
+        self.dtype = data.dtype
+        self.ndim = 2
+
+    @classmethod
+    def of(cls, data: np.ndarray, target: int, n_columns: int):
+        # a target at either end leaves a plain view
+        if target == n_columns - 1:
+            return data[:, :target]
+        if target == 0:
+            return data[:, 1:n_columns]
+        return cls(data, target, n_columns)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __getitem__(self, rows) -> np.ndarray:
+        return np.concatenate([self.left[rows], self.right[rows]], axis=-1)
+
+    def __array__(self, dtype=None) -> np.ndarray:
+        block = self[:]
+        return block if dtype is None else block.astype(dtype, copy=False)
+
+
+class ArrayDataset:
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        dtype: np.dtype = np.float32,
+        max_bytes: int = None,
+        reserve: int = 0,
+    ):
+        """
+        Initialize the ArrayDataset object.
+
+        Array-backed alternative to Dataset: the data is held in one contiguous 2D array
+        (column-major, so that every column is contiguous) plus a column index, instead of
+        a DataFrame. fill_nan, drop_nan and the feature additions work in place, sample is
+        a strided view and the windows of create_windows are views over the array.
+
+        Parameters
+        ----------
+            df (pd.DataFrame):
+                Input DataFrame containing the data, all columns must be numeric.
+
+            dtype (np.dtype, optional):
+                dtype of the array. Defaults to np.float32.
+
+            max_bytes (int, optional):
+                Memory budget of the dataset. Allocations that would exceed it raise a
+                MemoryError before anything is allocated. Defaults to None.
+
+            reserve (int, optional):
+                Number of extra columns to allocate up front for added features. Defaults to 0.
+        """
+        self.dtype = np.dtype(dtype)
+        self.max_bytes = max_bytes
+        self.index = df.index
+        self.columns = {c: i for i, c in enumerate(df.columns)}
+
+        self.data = self._allocate(len(df), len(df.columns) + reserve)
+        for i, c in enumerate(df.columns):
+            self.data[:, i] = df.iloc[:, i].to_numpy()
+
+    @property
+    def n_columns(self) -> int:
+        return len(self.columns)
+
+    @property
+    def column_names(self) -> list:
+        return sorted(self.columns, key=self.columns.get)
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        View of the used part of the array.
+        """
+        return self.data[:, : self.n_columns]
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.data[:, self.columns[column]]
+
+    def _check_budget(self, nbytes: int, what: str):
+        if self.max_bytes is None:
+            return
+        current = self.data.nbytes if hasattr(self, "data") else 0
+        if current + nbytes > self.max_bytes:
+            raise MemoryError(
+                f"{what} needs {_format_bytes(nbytes)} on top of {_format_bytes(current)}, "
+                f"exceeding max_bytes={_format_bytes(self.max_bytes)}"
+            )
+
+    def _allocate(self, n_rows: int, n_columns: int) -> np.ndarray:
+        self._check_budget(n_rows * n_columns * self.dtype.itemsize, "Allocation")
+        return np.empty((n_rows, n_columns), dtype=self.dtype, order="F")
+
+    def _new_columns(self, names: list) -> np.ndarray:
+        """
+        Register new columns and return the view to write them into, growing the
+        array geometrically when the reserved columns are used up.
+        """
+        duplicated = [n for n in names if n in self.columns]
+        if duplicated:
+            raise ValueError("Columns already exist: " + str(duplicated))
+
+        k = self.n_columns
+        if k + len(names) > self.data.shape[1] or not self.data.flags.f_contiguous:
+            capacity = max(k + len(names), 2 * self.data.shape[1])
+            grown = self._allocate(len(self), capacity)
+            grown[:, :k] = self.values
+            # the old array is released once the copy is done
+            self.data = grown
+
+        for i, name in enumerate(names):
+            self.columns[name] = k + i
+        return self.data[:, k : k + len(names)]
+
+    @profiled
+    def fill_nan(self, fields: list):
+        """
+        Fill missing values (NaN) in the specified fields/columns in place.
+
+        Like Dataset.fill_nan the fields are forward filled and the remaining NaN at the
+        start are filled with the mean of the forward filled column.
+
+        Parameters
+        ----------
+            fields (list):
+                List of fields/columns to fill missing values.
+
+        Returns
+        -------
+            None
+        """
+        for f in fields:
+            column = self[f]
+            missing = np.isnan(column)
+            if not missing.any():
+                continue
+            last = np.where(missing, 0, np.arange(len(column)))
+            np.maximum.accumulate(last, out=last)
+            column[:] = column[last]
+            leading = np.isnan(column)
+            if leading.any():
+                column[leading] = column[~leading].mean(dtype=np.float64)
+
+    @profiled
+    def drop_nan(self, fields: list):
+        """
+        Drop the specified columns in place, the following columns are shifted left.
+
+        Parameters
+        ----------
+            fields (list):
+                List of fields/columns to drop.
+
+        Returns
+        -------
+            None
+        """
+        drop = {self.columns[f] for f in fields}
+        keep = [c for c in self.column_names if self.columns[c] not in drop]
+        for i, c in enumerate(keep):
+            if self.columns[c] != i:
+                self.data[:, i] = self.data[:, self.columns[c]]
+            self.columns[c] = i
+        for f in fields:
+            del self.columns[f]
+
+    @profiled
+    def sample(self, n: int):
+        """
+        Sample every nth row, as a strided view without copying.
+
+        Parameters
+        ----------
+            n (int):
+                Sampling interval.
+
+        Returns
+        -------
+            None
+        """
+        self.data = self.data[::n]
+        self.index = self.index[::n]
+
+    @profiled
+    def compact(self):
+        """
+        Copy the used columns into a new contiguous array, releasing the reserved
+        columns and the rows skipped by sample.
+
+        Returns
+        -------
+            None
+        """
+        data = np.empty((len(self), self.n_columns), dtype=self.dtype, order="F")
+        data[:] = self.values
+        self.data = data
+
+    @profiled
+    def add_rolling_features(
+        self,
+        columns: list,
+        aggregations: list,
+        windows: list,
+        fill_value: float = 0,
+        engine: str = None,
+    ):
+        """
+        Add rolling aggregations like Dataset.add_rolling_features, written straight into the array.
+
+        Parameters
+        ----------
+            columns (list):
+                Columns to aggregate.
+
+            aggregations (list):
+                Aggregations to compute, names or callables as in Dataset.add_rolling_features.
+
+            windows (list):
+                Window sizes of the rolling windows.
+
+            fill_value (float, optional):
+                Value used for the incomplete windows at the start of the series. Defaults to 0.
+
+            engine (str, optional):
+                Engine passed to pandas rolling apply for callables. Defaults to None.
+
+        Returns
+        -------
+            None
+        """
+        source = pd.DataFrame({c: self[c] for c in columns})
+        names = [
+            f"rolling_{a if isinstance(a, str) else a.__name__}_{c}_{w}"
+            for w in windows
+            for a in aggregations
+            for c in columns
+        ]
+        out = self._new_columns(names)
+        _rolling_block(source, aggregations, windows, out, engine)
+        np.nan_to_num(out, copy=False, nan=fill_value)
+
+    @profiled
+    def add_last_t(self, data: str, step: int = 2):
+        """
+        Add lagged versions of a column, NaN where no earlier value exists.
+
+        Parameters
+        ----------
+            data (str):
+                Column name to create lagged versions of.
+
+            step (int, optional):
+                Number of lagged steps to add. Defaults to 2.
+
+        Returns
+        -------
+            None
+        """
+        out = self._new_columns([f"{data}_last_{i}_step" for i in range(1, step + 1)])
+        values = self[data]
+        for i in range(1, step + 1):
+            out[:i, i - 1] = np.nan
+            out[i:, i - 1] = values[:-i]
+
+    @profiled
+    def add_seasonal_feat(self, time_col=None):
+        """
+        Add the hour and week sine/cosine features of Dataset.add_seasonal_feat.
+
+        Parameters
+        ----------
+            time_col (optional):
+                Datetime values to extract seasonal features from. Defaults to the index.
+
+        Returns
+        -------
+            None
+        """
+        times = pd.DatetimeIndex(self.index if time_col is None else time_col)
+        hour = times.hour.to_numpy() / 23 * 2 * np.pi
+        week = times.isocalendar().week.to_numpy(dtype=np.float64) / 52 * 2 * np.pi
+        out = self._new_columns(["hour_sin", "hour_cos", "week_sin", "week_cos"])
+        out[:, 0] = np.sin(hour)
+        out[:, 1] = np.cos(hour)
+        out[:, 2] = np.sin(week)
+        out[:, 3] = np.cos(week)
+
+    def memory_usage(self) -> dict:
+        """
+        Report the memory footprint of the dataset.
+
+        Returns
+        -------
+            dict: Rows, used and allocated columns, dtype, used and allocated bytes and the budget.
+        """
+        base = self.data if self.data.base is None else self.data.base
+        used = len(self) * self.n_columns * self.dtype.itemsize
+        return {
+            "rows": len(self),
+            "columns": self.n_columns,
+            "allocated_columns": self.data.shape[1],
+            "dtype": str(self.dtype),
+            "used_bytes": used,
+            "allocated_bytes": base.nbytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Convert to a DataFrame, e.g. for plotting.
+
+        Returns
+        -------
+            pd.DataFrame: Copy of the used columns.
+        """
+        return pd.DataFrame(self.values, index=self.index, columns=self.column_names)
+
+    @profiled
+    def create_windows(
+        self,
+        window_size: int,
+        prediction_horizon: int,
+        test_split: float = 0.2,
+        val_split: float = 0.2,
+        univariate: bool = False,
+        target_col: str = "active_power_total",
+    ) -> tuple:
+        """
+        Create lazy train, validation and test windows like Dataset.create_windows.
+
+        The target and the exogenous columns around it are views of the array, no copy
+        of the data is made and the column order of the dataset is left unchanged.
+
+        Parameters
+        ----------
+            window_size (int):
+                 Size of the input window.
+
+            prediction_horizon (int):
+                 Number of steps to predict into the future.
+
+            test_split (float, optional):
+                Ratio of test data split. Defaults to 0.2.
+
+            val_split (float, optional):
+                 Ratio of validation data split. Defaults to 0.2.
+
+            univariate (bool, optional):
+                Flag indicating if the data is univariate. Defaults to False.
+
+            target_col (str, optional):
+                Name of the target column. Defaults to "active_power_total".
+
+        Returns
+        -------
+            tuple: Tuple containing train, val and test SlidingWindows, as well as feature names.
+        """
+        target = self[target_col]
+        exog = None if univariate else _ExogColumns.of(self.data, self.columns[target_col], self.n_columns)
+
+        n = len(self)
+        train_split = n - int(n * test_split) - int(n * val_split)
+        val_split = n - int(n * test_split)
+
+        train = SlidingWindows(target, exog, window_size, prediction_horizon, 0, train_split)
+        val = SlidingWindows(
+            target, exog, window_size, prediction_horizon, train_split - window_size, val_split
+        )
+        test = SlidingWindows(
+            target, exog, window_size, prediction_horizon, val_split - window_size, n
+        )
+
+        names = [f"lag_{i}" for i in range(1, window_size + 1)]
+        names.extend(c for c in self.column_names if c != target_col)
+
+        return train, val, test, names
+
+    @profiled
+    def create_dataset(
+        self,
+        window_size: int,
+        prediction_horizon: int,
+        test_split: float = 0.2,
+        val_split: float = 0.2,
+        univariate: bool = False,
+        target_col: str = "active_power_total",
+        shuffle: bool = False,
+        gap: int = 0,
+        random_state: int = None,
+    ) -> tuple:
+        """
+        Create a dataset for training and evaluation like Dataset.create_dataset.
+
+        The size of the materialized arrays is checked against max_bytes first.
+
+        Parameters
+        ----------
+            window_size (int):
+                 Size of the input window.
+
+            prediction_horizon (int):
+                 Number of steps to predict into the future.
+
+            test_split (float, optional):
+                Ratio of test data split. Defaults to 0.2.
+
+            val_split (float, optional):
+                 Ratio of validation data split. Defaults to 0.2.
+
+            univariate (bool, optional):
+                Flag indicating if the data is univariate. Defaults to False.
+
+            target_col (str, optional):
+                Name of the target column. Defaults to "active_power_total".
+
+            shuffle (bool, optional):
+                Shuffle the train and validation windows together. Defaults to False.
+
+            gap (int, optional):
+                Purge the training windows within gap positions of the first validation window,
+                before shuffling. Defaults to 0.
+
+            random_state (int, optional):
+                Seed of the shuffle. Defaults to None.
+
+        Returns
+        -------
+            tuple: Tuple containing train,val and test data and labels, as well as feature names.
+        """
+        train, val, test, names = self.create_windows(
+            window_size, prediction_horizon, test_split, val_split, univariate, target_col
+        )
+        train, val, test = _split_windows(train, val, test, shuffle, gap, random_state)
+        row_bytes = (train.n_features + prediction_horizon) * self.dtype.itemsize
+        n_windows = len(train) + len(val) + len(test)
+        self._check_budget(n_windows * row_bytes, "create_dataset")
+
+        return _materialize(train, val, test) + (names,)
@@ -0,0 +1,570 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset
+from .model import Model
+
+# columns of the Kelmarsh SCADA files used in the notebooks
+KELMARSH_COLUMNS = [
+    "Wind speed (m/s)",
+    "Wind speed, Standard deviation (m/s)",
+    "Wind speed, Minimum (m/s)",
+    "Wind speed, Maximum (m/s)",
+    "Wind direction (°)",
+    "Nacelle position (°)",
+    "Energy Export (kWh)",
+    "Power (kW)",
+    "Reactive power (kvar)",
+    "Rotor speed (RPM)",
+    "Generator RPM (RPM)",
+    "Nacelle ambient temperature (°C)",
+    "Blade angle (pitch position) A (°)",
+    "Blade angle (pitch position) B (°)",
+    "Blade angle (pitch position) C (°)",
+    "Lost Production to Curtailment (Total) (kWh)",
+    "Lost Production to Downtime (kWh)",
+    "Metal particle count counter",
+    "Front bearing temperature (°C)",
+    "Rear bearing temperature (°C)",
+]
+
+TARGET_COL = "Power (kW)"
+
+# libraries the package modules must only import when a feature needs them
+LAZY_DEPENDENCIES = (
+    "catboost",
+    "lightgbm",
+    "sklearn",
+    "optuna",
+    "matplotlib",
+    "tabulate",
+    "dask",
+    "xarray",
+)
+
+PACKAGE_MODULES = (
+    "dataset",
+    "array_dataset",
+    "dask_dataset",
+    "windows",
+    "pipeline",
+    "online",
+    "utils",
+    "metrics",
+    "profiling",
+    "model",
+    "cv",
+    "serving",
+    "kelmarsh_loader",
+    "kelmarsh_download",
+    "brazil_loader",
+    "benchmark",
+)
+
+# the package directory is registered under the package name, so the check works
+# whatever the checkout directory is called
+_IMPORT_SCRIPT = """
+import json, sys, time, types
+package = types.ModuleType({package!r})
+package.__path__ = [{path!r}]
+sys.modules[{package!r}] = package
+import numpy, pandas
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def synthetic_scada(
+    n_rows: int = 52560,
+    n_turbines: int = 1,
+    nan_ratio: float = 0.01,
+    seed: int = 0,
+    start: str = "2016-01-01",
+) -> pd.DataFrame:
+    """
+    Generate 10 minute SCADA data with the Kelmarsh column layout.
+
+    Wind speed is a diurnal AR(1) process, power follows the power curve of a 2 MW
+    turbine and the remaining columns are derived from both with noise. NaN are
+    inserted at random positions and as short outages, so the preprocessing steps
+    have the same work to do as on the real data.
+
+    Parameters
+    ----------
+        n_rows (int, optional):
+            Number of 10 minute records per turbine. Defaults to 52560 (one year).
+
+        n_turbines (int, optional):
+            Number of turbines. Defaults to 1.
+
+        nan_ratio (float, optional):
+            Share of missing values. Defaults to 0.01.
+
+        seed (int, optional):
+            Seed of the generator. Defaults to 0.
+
+        start (str, optional):
+            First timestamp. Defaults to "2016-01-01".
+
+    Returns
+    -------
+        pd.DataFrame: Data indexed by "# Date and time" for one turbine, or by
+        (turbine, "# Date and time") like kelmarsh_loader.load_scada for several.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=n_rows, freq="10min", name="# Date and time")
+    hour = index.hour.to_numpy() + index.minute.to_numpy() / 60
+
+    frames = []
+    for _ in range(n_turbines):
+        noise = rng.normal(0, 0.35, n_rows)
+        wind = np.empty(n_rows)
+        wind[0] = 7.0
+        for i in range(1, n_rows):
+            wind[i] = 7.0 + 0.98 * (wind[i - 1] - 7.0) + noise[i]
+        wind = np.clip(wind + 1.2 * np.sin((hour - 9) / 24 * 2 * np.pi), 0, 30)
+
+        power = 2050 * np.clip((wind - 3) / (12.5 - 3), 0, 1) ** 3
+        power[wind > 25] = 0
+        power = np.clip(power + rng.normal(0, 15, n_rows), -10, 2050)
+        direction = (200 + np.cumsum(rng.normal(0, 2, n_rows))) % 360
+        rotor = np.where(wind > 3, 6 + 8.5 * np.clip((wind - 3) / 9.5, 0, 1), 0.5)
+        pitch = np.where(wind > 12.5, (wind - 12.5) * 1.8, 0) + rng.normal(0, 0.1, n_rows)
+        temperature = 10 + 8 * np.sin((index.dayofyear.to_numpy() - 110) / 365 * 2 * np.pi)
+
+        data = {
+            "Wind speed (m/s)": wind,
+            "Wind speed, Standard deviation (m/s)": np.abs(rng.normal(0.1 * wind, 0.1)),
+            "Wind speed, Minimum (m/s)": np.clip(wind - np.abs(rng.normal(1.5, 0.5, n_rows)), 0, None),
+            "Wind speed, Maximum (m/s)": wind + np.abs(rng.normal(1.5, 0.5, n_rows)),
+            "Wind direction (°)": direction,
+            "Nacelle position (°)": (direction + rng.normal(0, 5, n_rows)) % 360,
+            "Energy Export (kWh)": np.clip(power, 0, None) / 6,
+            "Power (kW)": power,
+            "Reactive power (kvar)": 0.05 * power + rng.normal(0, 5, n_rows),
+            "Rotor speed (RPM)": rotor,
+            "Generator RPM (RPM)": rotor * 107.5,
+            "Nacelle ambient temperature (°C)": temperature + rng.normal(0, 1.5, n_rows),
+            "Blade angle (pitch position) A (°)": pitch,
+            "Blade angle (pitch position) B (°)": pitch + rng.normal(0, 0.05, n_rows),
+            "Blade angle (pitch position) C (°)": pitch + rng.normal(0, 0.05, n_rows),
+            "Lost Production to Curtailment (Total) (kWh)": np.where(rng.random(n_rows) < 0.01, 50.0, 0.0),
+            "Lost Production to Downtime (kWh)": np.where(rng.random(n_rows) < 0.005, 100.0, 0.0),
+            "Metal particle count counter": np.cumsum(rng.random(n_rows) < 0.001).astype(np.float64),
+            "Front bearing temperature (°C)": temperature + 15 + 0.005 * power + rng.normal(0, 1, n_rows),
+            "Rear bearing temperature (°C)": temperature + 12 + 0.004 * power + rng.normal(0, 1, n_rows),
+        }
+        values = np.column_stack([data[c] for c in KELMARSH_COLUMNS])
+
+        values[rng.random(values.shape) < nan_ratio / 2] = np.nan
+        # outages of up to 6 hours in which every column is missing
+        n_outages = int(n_rows * nan_ratio / 2 / 18) + 1
+        for start_row in rng.integers(0, n_rows, n_outages):
+            values[start_row : start_row + rng.integers(1, 37)] = np.nan
+
+        frames.append(pd.DataFrame(values, index=index, columns=KELMARSH_COLUMNS))
+
+    if n_turbines == 1:
+        return frames[0]
+    return pd.concat(frames, keys=list(range(1, n_turbines + 1)), names=["turbine"])
+
+
+def _measure(fn, setup, repeat: int) -> dict:
+    """
+    Time fn(setup()) repeat times and trace the peak memory of one extra run.
+    """
+    wall, cpu = [], []
+    for _ in range(repeat):
+        args = setup()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        fn(args)
+        wall.append(time.perf_counter() - wall_start)
+        cpu.append(time.process_time() - cpu_start)
+
+    # tracemalloc slows the run down, so the peak is measured separately
+    args = setup()
+    tracemalloc.start()
+    fn(args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "wall_s": float(np.min(wall)),
+        "wall_s_median": float(np.median(wall)),
+        "cpu_s": float(np.min(cpu)),
+        "peak_mb": peak / 2**20,
+    }
+
+
+def _metadata() -> dict:
+    meta = {
+        "timestamp": pd.Timestamp.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+    for module in ("catboost", "lightgbm", "sklearn"):
+        try:
+            meta[module] = __import__(module).__version__
+        except ImportError:
+            meta[module] = None
+    try:
+        meta["commit"] = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        meta["commit"] = None
+    return meta
+
+
+def run_benchmarks(
+    n_rows: int = 52560,
+    n_turbines: int = 1,
+    window_size: int = 144,
+    horizons: tuple = (1, 6, 144),
+    model_function: str = "cb",
+    params: dict = None,
+    repeat: int = 3,
+    output: str = None,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Time and memory-profile the Dataset and Model hot paths on synthetic SCADA data.
+
+    Every benchmark is run repeat times on a fresh copy of its input, the setup is not
+    timed. Dataset benchmarks are run on every turbine, so their cost grows with
+    n_turbines. Model benchmarks use the first turbine: one-shot training and prediction
+    on the multivariate windows of every horizon, recursive training on the univariate
+    one step ahead windows and recursive prediction up to every horizon. Peak memory is
+    traced with tracemalloc, which covers Python and NumPy allocations but not the
+    native memory of CatBoost or LightGBM.
+
+    Parameters
+    ----------
+        n_rows (int, optional):
+            Number of 10 minute records per turbine. Defaults to 52560 (one year).
+
+        n_turbines (int, optional):
+            Number of turbines. Defaults to 1.
+
+        window_size (int, optional):
+            Size of the input window. Defaults to 144.
+
+        horizons (tuple, optional):
+            Prediction horizons. Defaults to (1, 6, 144).
+
+        model_function (str, optional):
+            Model function to benchmark ("cb" or "lgb"). Defaults to "cb".
+
+        params (dict, optional):
+            Parameters of the model. Defaults to 100 iterations/estimators with a fixed seed.
+
+        repeat (int, optional):
+            Number of timed runs per benchmark, the fastest is reported. Defaults to 3.
+
+        output (str, optional):
+            JSON file to write the results and the environment to. Defaults to None.
+
+        seed (int, optional):
+            Seed of the synthetic data. Defaults to 0.
+
+    Returns
+    -------
+        pd.DataFrame: One row per benchmark with wall time, CPU time and peak traced memory.
+    """
+    if params is None:
+        params = (
+            {"iterations": 100, "random_seed": 0, "thread_count": -1, "allow_writing_files": False}
+            if model_function == "cb"
+            else {"n_estimators": 100, "random_state": 0}
+        )
+
+    data = synthetic_scada(n_rows, n_turbines, seed=seed)
+    turbines = [data] if n_turbines == 1 else [data.loc[t] for t in range(1, n_turbines + 1)]
+    filled = []
+    for df in turbines:
+        dataset = Dataset(df.copy())
+        dataset.fill_nan(KELMARSH_COLUMNS)
+        filled.append(dataset.df)
+
+    results = []
+
+    def bench(name, fn, setup, **info):
+        print("Running " + name + " " + str(info))
+        results.append({"benchmark": name, **info, **_measure(fn, setup, repeat)})
+
+    copies = lambda frames: lambda: [f.copy() for f in frames]
+    base = {"rows": n_rows, "turbines": n_turbines}
+
+    bench(
+        "Dataset.fill_nan",
+        lambda frames: [Dataset(df).fill_nan(KELMARSH_COLUMNS) for df in frames],
+        copies(turbines),
+        **base,
+    )
+    bench(
+        "Dataset.apply_rolling_window",
+        lambda frames: [
+            Dataset(df).apply_rolling_window(df, "Wind speed (m/s)", 4, np.mean) for df in frames
+        ],
+        copies(filled),
+        window=4,
+        **base,
+    )
+    bench(
+        "Dataset.add_last_t",
+        lambda frames: [Dataset(df).add_last_t(df, TARGET_COL, 6) for df in frames],
+        copies(filled),
+        step=6,
+        **base,
+    )
+
+    splits = {}
+    for horizon in horizons:
+
+        def create(frames, horizon=horizon):
+            return [
+                Dataset(df).create_dataset(df, window_size, horizon, target_col=TARGET_COL)
+                for df in frames
+            ]
+
+        bench(
+            "Dataset.create_dataset",
+            create,
+            lambda: filled,
+            window=window_size,
+            horizon=horizon,
+            **base,
+        )
+        splits[horizon] = Dataset(filled[0]).create_dataset(
+            filled[0], window_size, horizon, target_col=TARGET_COL
+        )
+
+    model_info = {"rows": n_rows, "model": model_function, "window": window_size}
+    trained = {}
+
+    def train(model, *data):
+        model.train(*data, verbose=0)
+        trained["model"] = model
+
+    for horizon in horizons:
+        train_x, val_x, test_x, train_y, val_y, test_y, _ = splits[horizon]
+        data = (train_x, train_y[:, -1], val_x, val_y[:, -1])
+
+        # a fresh Model per repeat, so the pool cache does not hide the quantization
+        bench(
+            "Model.train",
+            lambda model: train(model, *data),
+            lambda: Model(model_function, params),
+            mode="one_shot",
+            horizon=horizon,
+            train_windows=len(train_x),
+            **model_info,
+        )
+        model = trained["model"]
+        bench(
+            "Model.predict",
+            lambda _: model.predict(test_x),
+            lambda: None,
+            mode="one_shot",
+            horizon=horizon,
+            test_windows=len(test_x),
+            **model_info,
+        )
+
+    univariate = Dataset(filled[0]).create_dataset(
+        filled[0], window_size, max(horizons), target_col=TARGET_COL, univariate=True
+    )
+    train_x, val_x, test_x, train_y, val_y, test_y, _ = univariate
+    bench(
+        "Model.train",
+        lambda model: train(model, train_x, train_y[:, 0], val_x, val_y[:, 0]),
+        lambda: Model(model_function, params, "recursive"),
+        mode="recursive",
+        horizon=1,
+        train_windows=len(train_x),
+        **model_info,
+    )
+    recursive = trained["model"]
+    for horizon in horizons:
+        bench(
+            "Model.predict",
+            lambda _, horizon=horizon: recursive.predict(test_x, horizon),
+            lambda: None,
+            mode="recursive",
+            horizon=horizon,
+            test_windows=len(test_x),
+            **model_info,
+        )
+
+    results = pd.DataFrame(results)
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "meta": _metadata(),
+                    "config": {
+                        "n_rows": n_rows,
+                        "n_turbines": n_turbines,
+                        "window_size": window_size,
+                        "horizons": list(horizons),
+                        "model_function": model_function,
+                        "params": params,
+                        "repeat": repeat,
+                        "seed": seed,
+                    },
+                    "results": results.to_dict(orient="records"),
+                },
+                f,
+                indent=2,
+                default=str,
+            )
+    return results
+
+
+def check_imports(
+    modules: tuple = PACKAGE_MODULES,
+    budget_s: float = 0.25,
+    repeat: int = 3,
+) -> pd.DataFrame:
+    """
+    Check that importing the package modules stays cheap.
+
+    Every module is imported in a fresh interpreter after numpy and pandas, the import
+    must take less than budget_s and must not load any of LAZY_DEPENDENCIES.
+
+    Parameters
+    ----------
+        modules (tuple, optional):
+            Modules of the package to import. Defaults to all modules of the package.
+
+        budget_s (float, optional):
+            Import time budget per module in seconds. Defaults to 0.25.
+
+        repeat (int, optional):
+            Number of fresh imports per module, the fastest is compared. Defaults to 3.
+
+    Returns
+    -------
+        pd.DataFrame: Import time and loaded heavy dependencies per module.
+
+    Raises
+    ------
+        RuntimeError: If a module exceeds the budget or loads a heavy dependency.
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    package = __package__ or os.path.basename(package_dir)
+
+    rows = []
+    for module in modules:
+        script = _IMPORT_SCRIPT.format(
+            package=package, path=package_dir, module=package + "." + module, lazy=LAZY_DEPENDENCIES
+        )
+        runs = [
+            json.loads(
+                subprocess.run(
+                    [sys.executable, "-c", script], capture_output=True, text=True, check=True
+                ).stdout
+            )
+            for _ in range(repeat)
+        ]
+        rows.append(
+            {
+                "module": module,
+                "seconds": min(run["seconds"] for run in runs),
+                "loaded": runs[0]["loaded"],
+            }
+        )
+
+    results = pd.DataFrame(rows)
+    failed = results[(results["seconds"] > budget_s) | results["loaded"].map(bool)]
+    if len(failed):
+        raise RuntimeError(
+            f"Import budget of {budget_s}s exceeded or heavy dependencies loaded:\n"
+            + failed.to_string(index=False)
+        )
+    return results
+
+
+def compare(baseline: str, current: str) -> pd.DataFrame:
+    """
+    Compare two result files written by run_benchmarks.
+
+    Parameters
+    ----------
+        baseline (str):
+            Result file of the reference version.
+
+        current (str):
+            Result file of the version to check.
+
+    Returns
+    -------
+        pd.DataFrame: Wall time and peak memory of both runs with the current / baseline ratios.
+    """
+    frames = []
+    for path in (baseline, current):
+        with open(path) as f:
+            frames.append(pd.DataFrame(json.load(f)["results"]))
+
+    keys = [c for c in ("benchmark", "mode", "horizon") if c in frames[0] and c in frames[1]]
+    merged = frames[0].merge(frames[1], on=keys, suffixes=("_baseline", "_current"))
+    merged["wall_ratio"] = merged["wall_s_current"] / merged["wall_s_baseline"]
+    merged["peak_ratio"] = merged["peak_mb_current"] / merged["peak_mb_baseline"]
+    columns = keys + [
+        "wall_s_baseline",
+        "wall_s_current",
+        "wall_ratio",
+        "peak_mb_baseline",
+        "peak_mb_current",
+        "peak_ratio",
+    ]
+    return merged[columns]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Dataset and Model hot paths")
+    parser.add_argument("--rows", type=int, default=52560)
+    parser.add_argument("--turbines", type=int, default=1)
+    parser.add_argument("--window", type=int, default=144)
+    parser.add_argument("--horizons", type=int, nargs="+", default=[1, 6, 144])
+    parser.add_argument("--model", default="cb", choices=["cb", "lgb"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Result file of a previous run to compare against")
+    parser.add_argument("--imports", action="store_true", help="Only run the import budget check")
+    args = parser.parse_args()
+
+    if args.imports:
+        print(check_imports().to_string(index=False))
+        sys.exit(0)
+
+    results = run_benchmarks(
+        args.rows,
+        args.turbines,
+        args.window,
+        tuple(args.horizons),
+        args.model,
+        repeat=args.repeat,
+        output=args.output,
+    )
+    print(results.to_string(index=False))
+    if args.compare:
+        print(compare(args.compare, args.output).to_string(index=False))
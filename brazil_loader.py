@@ -0,0 +1,264 @@
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset
+
+TIME_DIM = "Time"
+
+
+def open_netcdf(path: str):
+    """
+    Open a UEBB/UEPS NetCDF file lazily.
+
+    Nothing but the coordinates is read until a selection is loaded, and loaded slices
+    are not cached.
+
+    Parameters
+    ----------
+        path (str):
+            Path of the NetCDF file.
+
+    Returns
+    -------
+        xr.Dataset: Lazy dataset of the file, to be closed by the caller.
+    """
+    import xarray as xr
+
+    return xr.open_dataset(path, chunks=None, cache=False)
+
+
+def list_variables(path: str) -> pd.DataFrame:
+    """
+    List the variables of a NetCDF file with their dimensions and units.
+
+    Only the metadata of the file is read.
+
+    Parameters
+    ----------
+        path (str):
+            Path of the NetCDF file.
+
+    Returns
+    -------
+        pd.DataFrame: Dimensions and units, indexed by variable name.
+    """
+    with open_netcdf(path) as ds:
+        return pd.DataFrame(
+            [
+                {"variable": name, "dims": var.dims, "units": var.attrs.get("units")}
+                for name, var in ds.data_vars.items()
+            ]
+        ).set_index("variable")
+
+
+def _project(ds, variables: list = None, turbine: float = 1.0, height=60.0) -> dict:
+    """
+    Select the variables, the turbine and the heights on the lazy dataset.
+
+    Reading a time slice then only reads those hyperslabs. Variables measured at several
+    heights get one column per height, named {variable}_{height}.
+
+    Parameters
+    ----------
+        ds (xr.Dataset):
+            Lazy dataset of open_netcdf.
+
+        variables (list, optional):
+            Variables to select, None for all. Defaults to None.
+
+        turbine (float, optional):
+            Turbine coordinate to select, None to keep the dimension. Defaults to 1.0.
+
+        height (float or list, optional):
+            Height coordinate or list of heights to select. Defaults to 60.0.
+
+    Returns
+    -------
+        dict: Lazy 1D DataArrays over time, keyed by column name.
+    """
+    ds = ds[list(variables)] if variables is not None else ds
+    if turbine is not None and "Turbine" in ds.dims:
+        ds = ds.sel(Turbine=turbine)
+
+    heights = height if isinstance(height, (list, tuple)) else [height]
+    arrays = {}
+    for name, var in ds.data_vars.items():
+        if height is not None and "Height" in var.dims:
+            for h in heights:
+                column = name if len(heights) == 1 else f"{name}_{h}"
+                arrays[column] = var.sel(Height=h)
+        else:
+            arrays[name] = var
+
+    for name, var in arrays.items():
+        extra = [d for d in var.dims if d != TIME_DIM]
+        if extra:
+            raise ValueError(f"Variable {name} still has the dimensions {extra}, select them first")
+    return {name: var.drop_vars([c for c in var.coords if c != TIME_DIM]) for name, var in arrays.items()}
+
+
+def _chunk_bounds(time: np.ndarray, chunk_rows: int, freq: str = None) -> list:
+    """
+    Compute the row boundaries of chunks of about chunk_rows rows.
+
+    With a freq the boundaries are moved back to the start of their resampling bin, so
+    that no bin is split between two chunks.
+
+    Parameters
+    ----------
+        time (np.ndarray):
+            Sorted timestamps of the rows.
+
+        chunk_rows (int):
+            Number of rows per chunk.
+
+        freq (str, optional):
+            Resampling frequency, e.g. "10min". Defaults to None.
+
+    Returns
+    -------
+        list: Start rows of the chunks followed by the number of rows.
+    """
+    bounds = list(range(0, len(time), chunk_rows))
+    if freq is not None:
+        starts = pd.DatetimeIndex(time[bounds]).floor(freq)
+        bounds = np.searchsorted(time, starts.values, side="left").tolist()
+    return sorted(set(bounds)) + [len(time)]
+
+
+def load_netcdf(
+    path: str,
+    variables: list = None,
+    turbine: float = 1.0,
+    height=60.0,
+    start=None,
+    end=None,
+    freq: str = None,
+    how="mean",
+    chunk_rows: int = 100000,
+    dtype: str = "float64",
+) -> pd.DataFrame:
+    """
+    Load the projected columns of a UEBB/UEPS NetCDF file chunk by chunk.
+
+    Variables, turbine and heights are selected on the lazy file, the rows between start
+    (inclusive) and end (exclusive) are read chunk_rows at a time. With a freq every
+    chunk is resampled on its own and the result is aligned to a regular grid of that
+    cadence, missing steps being NaN. Only the current chunk and the output are held in
+    memory.
+
+    Parameters
+    ----------
+        path (str):
+            Path of the NetCDF file.
+
+        variables (list, optional):
+            Variables to load, None for all. Defaults to None.
+
+        turbine (float, optional):
+            Turbine coordinate to select. Defaults to 1.0.
+
+        height (float or list, optional):
+            Height coordinate or list of heights to select. Defaults to 60.0.
+
+        start (str or pd.Timestamp, optional):
+            First time to load, inclusive. Defaults to None.
+
+        end (str or pd.Timestamp, optional):
+            Last time to load, exclusive. Defaults to None.
+
+        freq (str, optional):
+            Resampling frequency, e.g. "10min". Defaults to None.
+
+        how (str or dict, optional):
+            Resampling aggregation, or a dict of aggregations per column. Defaults to "mean".
+
+        chunk_rows (int, optional):
+            Number of rows read at a time. Defaults to 100000.
+
+        dtype (str, optional):
+            Data type of the columns. Defaults to "float64".
+
+    Returns
+    -------
+        pd.DataFrame: Projected columns indexed by time.
+    """
+    with open_netcdf(path) as ds:
+        time = ds[TIME_DIM].values
+        lo = 0 if start is None else np.searchsorted(time, pd.Timestamp(start).to_datetime64(), side="left")
+        hi = len(time) if end is None else np.searchsorted(time, pd.Timestamp(end).to_datetime64(), side="left")
+        arrays = _project(ds, variables, turbine, height)
+
+        frames = []
+        bounds = _chunk_bounds(time[lo:hi], chunk_rows, freq)
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            rows = slice(lo + a, lo + b)
+            chunk = pd.DataFrame(
+                {name: var.isel({TIME_DIM: rows}).values.astype(dtype) for name, var in arrays.items()},
+                index=pd.DatetimeIndex(time[rows], name=TIME_DIM),
+            )
+            if freq is not None:
+                chunk = chunk.resample(freq).agg(how)
+            frames.append(chunk)
+
+    if not frames:
+        return pd.DataFrame(columns=list(arrays), index=pd.DatetimeIndex([], name=TIME_DIM), dtype=dtype)
+    df = pd.concat(frames)
+    if freq is not None:
+        grid = pd.date_range(df.index[0], df.index[-1], freq=freq, name=TIME_DIM)
+        df = df.reindex(grid)
+    return df
+
+
+def load_dataset(
+    path: str,
+    variables: list = None,
+    turbine: float = 1.0,
+    height=60.0,
+    start=None,
+    end=None,
+    freq: str = None,
+    how="mean",
+    chunk_rows: int = 100000,
+    dtype: str = "float64",
+) -> Dataset:
+    """
+    Load the projected columns of a UEBB/UEPS NetCDF file into a Dataset.
+
+    Parameters
+    ----------
+        path (str):
+            Path of the NetCDF file.
+
+        variables (list, optional):
+            Variables to load, None for all. Defaults to None.
+
+        turbine (float, optional):
+            Turbine coordinate to select. Defaults to 1.0.
+
+        height (float or list, optional):
+            Height coordinate or list of heights to select. Defaults to 60.0.
+
+        start (str or pd.Timestamp, optional):
+            First time to load, inclusive. Defaults to None.
+
+        end (str or pd.Timestamp, optional):
+            Last time to load, exclusive. Defaults to None.
+
+        freq (str, optional):
+            Resampling frequency, e.g. "10min". Defaults to None.
+
+        how (str or dict, optional):
+            Resampling aggregation, or a dict of aggregations per column. Defaults to "mean".
+
+        chunk_rows (int, optional):
+            Number of rows read at a time. Defaults to 100000.
+
+        dtype (str, optional):
+            Data type of the columns. Defaults to "float64".
+
+    Returns
+    -------
+        Dataset: Dataset of the projected columns, see load_netcdf.
+    """
+    return Dataset(load_netcdf(path, variables, turbine, height, start, end, freq, how, chunk_rows, dtype))
@@ -0,0 +1,246 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset
+from .metrics import align_predictions
+from .utils import score_function
+from .windows import SlidingWindows
+
+# shared arrays attached once per worker process
+_SHARED = {}
+
+
+def rolling_origin_folds(
+    n_windows: int,
+    n_folds: int = 5,
+    val_size: int = None,
+    train_size: int = None,
+    gap: int = 0,
+) -> list:
+    """
+    Walk-forward folds over window positions.
+
+    The last n_folds * val_size windows are split into consecutive validation blocks,
+    every fold trains on the windows before its block. Folds are index ranges, no data
+    is copied.
+
+    Parameters
+    ----------
+        n_windows (int):
+            Number of windows of the series.
+
+        n_folds (int, optional):
+            Number of folds. Defaults to 5.
+
+        val_size (int, optional):
+            Windows per validation block. Defaults to n_windows // (n_folds + 1).
+
+        train_size (int, optional):
+            Windows per training range for a sliding origin, None for an expanding one
+            starting at the first window. Defaults to None.
+
+        gap (int, optional):
+            Windows left out between training and validation so that training labels do
+            not overlap validation labels. Defaults to 0.
+
+    Returns
+    -------
+        list: (train range, validation range) tuples.
+    """
+    val_size = val_size or n_windows // (n_folds + 1)
+    first_val = n_windows - n_folds * val_size
+    if first_val - gap < 1:
+        raise ValueError("Not enough windows for the requested folds")
+
+    folds = []
+    for k in range(n_folds):
+        val_start = first_val + k * val_size
+        train_stop = val_start - gap
+        train_start = 0 if train_size is None else max(train_stop - train_size, 0)
+        folds.append((range(train_start, train_stop), range(val_start, val_start + val_size)))
+    return folds
+
+
+def _share(array: np.ndarray) -> tuple:
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(spec: tuple) -> np.ndarray:
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    _SHARED.setdefault("handles", []).append(shm)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _init_worker(target_spec: tuple, exog_spec: tuple):
+    _SHARED["target"] = _attach(target_spec)
+    _SHARED["exog"] = None if exog_spec is None else _attach(exog_spec)
+
+
+def _fit_fold(task: dict) -> dict:
+    from .model import Model
+
+    windows = SlidingWindows(
+        _SHARED["target"], _SHARED["exog"], task["window_size"], task["prediction_horizon"]
+    )
+    train, val = task["train"], task["val"]
+    train_x, val_x = windows.x(slice(train.start, train.stop)), windows.x(slice(val.start, val.stop))
+    train_y, val_y = windows.y(slice(train.start, train.stop)), windows.y(slice(val.start, val.stop))
+    if task["y_index"] is not None:
+        train_y, val_y = train_y[:, task["y_index"]], val_y[:, task["y_index"]]
+
+    model = Model(task["model_function"], task["params"], task["prediction_type"])
+    multioutput = train_y.ndim > 1 and train_y.shape[1] > 1
+    model.train(train_x, train_y, val_x, val_y, multioutput, verbose=0)
+    pred = model.predict(val_x, task["horizon"])
+
+    mae, rmse, r_2 = score_function(*align_predictions(val_y, pred))
+    return {
+        "fold": task["fold"],
+        "train_windows": len(train),
+        "val_windows": len(val),
+        "MAE": mae,
+        "RMSE": rmse,
+        "R2": r_2,
+    }
+
+
+def cross_validate(
+    df: pd.DataFrame,
+    window_size: int,
+    prediction_horizon: int,
+    model_function: str = "cb",
+    params: dict = {},
+    prediction_type: str = "one_shot",
+    n_folds: int = 5,
+    val_size: int = None,
+    train_size: int = None,
+    gap: int = None,
+    univariate: bool = False,
+    target_col: str = "active_power_total",
+    y_index: int = -1,
+    horizon: int = 1,
+    n_workers: int = None,
+    threads_per_worker: int = None,
+) -> pd.DataFrame:
+    """
+    Rolling-origin (walk-forward) cross validation with folds trained in parallel.
+
+    The target and exogenous arrays are placed once in shared memory, every worker
+    process attaches to them and builds its fold windows as views, only the fold being
+    trained is materialized. Each worker trains a Model limited to threads_per_worker
+    through its thread_count / n_jobs parameter and
+    scores its validation block with utils.score_function.
+
+    Parameters
+    ----------
+        df (pd.DataFrame):
+            Input DataFrame containing the data.
+
+        window_size (int):
+            Size of the input window.
+
+        prediction_horizon (int):
+            Number of steps to predict into the future.
+
+        model_function (str, optional):
+            Model function to use ("cb" for CatBoost or "lgb" for LightGBM). Defaults to "cb".
+
+        params (dict, optional):
+            Parameters for the model function. Defaults to {}.
+
+        prediction_type (str, optional):
+            Type of prediction ("one_shot" or "recursive"). Defaults to "one_shot".
+
+        n_folds (int, optional):
+            Number of folds. Defaults to 5.
+
+        val_size (int, optional):
+            Windows per validation block. Defaults to n_windows // (n_folds + 1).
+
+        train_size (int, optional):
+            Windows per training range for a sliding origin, None for an expanding one. Defaults to None.
+
+        gap (int, optional):
+            Windows between training and validation, defaults to prediction_horizon - 1 which,
+            as in create_dataset, keeps training labels out of the validation block.
+
+        univariate (bool, optional):
+            Flag indicating if the data is univariate. Defaults to False.
+
+        target_col (str, optional):
+            Name of the target column. Defaults to "active_power_total".
+
+        y_index (int, optional):
+            Horizon column to train and score on, None to keep all. Defaults to -1.
+
+        horizon (int, optional):
+            Horizon passed to Model.predict (recursive models). Defaults to 1.
+
+        n_workers (int, optional):
+            Number of worker processes. Defaults to min(n_folds, cpu count).
+
+        threads_per_worker (int, optional):
+            Threads of each worker's model. Defaults to cpu count // n_workers.
+
+    Returns
+    -------
+        pd.DataFrame: MAE, RMSE and R2 per fold, followed by their mean and std.
+    """
+    cpus = os.cpu_count() or 1
+    n_workers = n_workers or min(n_folds, cpus)
+    threads_per_worker = threads_per_worker or max(1, cpus // n_workers)
+    gap = prediction_horizon - 1 if gap is None else gap
+
+    windows, _, _, _ = Dataset(df).create_windows(
+        df, window_size, prediction_horizon, 0, 0, univariate, target_col
+    )
+    folds = rolling_origin_folds(len(windows), n_folds, val_size, train_size, gap)
+
+    params = dict(params)
+    params["thread_count" if model_function == "cb" else "n_jobs"] = threads_per_worker
+    tasks = [
+        {
+            "fold": k,
+            "train": train,
+            "val": val,
+            "window_size": window_size,
+            "prediction_horizon": prediction_horizon,
+            "model_function": model_function,
+            "params": params,
+            "prediction_type": prediction_type,
+            "y_index": y_index,
+            "horizon": horizon,
+        }
+        for k, (train, val) in enumerate(folds)
+    ]
+
+    shared = []
+    try:
+        target_shm, target_spec = _share(windows.target)
+        shared.append(target_shm)
+        exog_spec = None
+        if windows.exog is not None:
+            exog_shm, exog_spec = _share(np.ascontiguousarray(windows.exog))
+            shared.append(exog_shm)
+
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(target_spec, exog_spec),
+        ) as executor:
+            results = list(executor.map(_fit_fold, tasks))
+    finally:
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+
+    scores = pd.DataFrame(results).set_index("fold")
+    summary = scores[["MAE", "RMSE", "R2"]].agg(["mean", "std"])
+    return pd.concat([scores, summary])
@@ -0,0 +1,560 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset
+from .kelmarsh_loader import load_scada
+from .profiling import profiled
+from .windows import SlidingWindows
+
+# dask is imported by the methods that build task graphs, importing the module stays cheap
+
+
+def _partition_apply(part: pd.DataFrame, method: str, *args) -> pd.DataFrame:
+    """
+    Run a pandas Dataset transform on one partition (including its overlap rows).
+    """
+    dataset = Dataset(part.copy())
+    if method in ("apply_rolling_window", "add_last_t"):
+        getattr(dataset, method)(dataset.df, *args)
+    else:
+        getattr(dataset, method)(*args)
+    return dataset.df
+
+
+def _fill_stats(part: pd.DataFrame, fields: list) -> pd.DataFrame:
+    """
+    Per field: sum and count of the partition forward filled on its own, the number of
+    leading NaN (which the previous partitions fill) and the last valid value.
+    """
+    rows = []
+    for f in fields:
+        column = part[f]
+        valid = column.notna().to_numpy()
+        filled = column.ffill()
+        lead = int(valid.argmax()) if valid.any() else len(column)
+        last = column.to_numpy()[valid][-1] if valid.any() else np.nan
+        rows.append((filled.sum(), filled.count(), lead, last))
+    return pd.DataFrame(rows, index=fields, columns=["sum", "count", "lead", "last"])
+
+
+def _fill_partition(part: pd.DataFrame, fills: dict, partition_info=None) -> pd.DataFrame:
+    k = partition_info["number"] if partition_info else 0
+    part = part.copy()
+    for f, (carries, mean) in fills.items():
+        part[f] = part[f].ffill().fillna(carries[k]).fillna(mean)
+    return part
+
+
+def _sample_partition(part: pd.DataFrame, n: int, offsets: list, partition_info=None) -> pd.DataFrame:
+    offset = offsets[partition_info["number"]] if partition_info else 0
+    return part.iloc[(-offset) % n :: n]
+
+
+class PartitionWindows:
+    def __init__(
+        self,
+        sources: list,
+        window_size: int,
+        prediction_horizon: int,
+        univariate: bool = False,
+        target_col: str = "active_power_total",
+        batch_size: int = None,
+    ):
+        """
+        Stream of (X, y) windows produced partition by partition.
+
+        Every partition is computed on its own and the last window_size +
+        prediction_horizon - 1 rows are carried over to the next one, so windows
+        crossing a partition boundary are produced exactly once and only one partition
+        (plus the carried rows) is in memory. Re-iterable, e.g. by Model.train_batches.
+
+        Parameters
+        ----------
+            sources (list):
+                (dask DataFrame, partition lengths, first row, end row) tuples, windows are
+                built over the rows [first row, end row) of every source.
+
+            window_size (int):
+                Size of the input window.
+
+            prediction_horizon (int):
+                Number of steps to predict into the future.
+
+            univariate (bool, optional):
+                Flag indicating if the data is univariate. Defaults to False.
+
+            target_col (str, optional):
+                Name of the target column. Defaults to "active_power_total".
+
+            batch_size (int, optional):
+                Split the windows of a partition into batches of this size, None for one
+                batch per partition. Defaults to None.
+        """
+        self.sources = sources
+        self.window_size = window_size
+        self.prediction_horizon = prediction_horizon
+        self.univariate = univariate
+        self.target_col = target_col
+        self.batch_size = batch_size
+
+    def __len__(self) -> int:
+        span = self.window_size + self.prediction_horizon - 1
+        return sum(max(stop - start - span, 0) for _, _, start, stop in self.sources)
+
+    @property
+    def n_batches(self) -> int:
+        """
+        Number of (X, y) batches a pass yields, computed from the partition lengths.
+        """
+        span = self.window_size + self.prediction_horizon - 1
+        n = 0
+        for _, lengths, start, stop in self.sources:
+            # windows start in [start, stop - span), a partition yields those that end in it
+            first = start
+            for end in np.cumsum(lengths):
+                last = min(stop, end) - span
+                if last > first:
+                    n += 1 if self.batch_size is None else -(-(last - first) // self.batch_size)
+                    first = last
+                if end >= stop:
+                    break
+        return n
+
+    def _windows(self, chunk: pd.DataFrame, start: int, stop: int) -> SlidingWindows:
+        exog_cols = [c for c in chunk.columns if c != self.target_col]
+        target = chunk[self.target_col].to_numpy()
+        exog = None if self.univariate else chunk[exog_cols].to_numpy()
+        return SlidingWindows(
+            target, exog, self.window_size, self.prediction_horizon, start, stop
+        )
+
+    def __iter__(self):
+        span = self.window_size + self.prediction_horizon - 1
+        for ddf, lengths, start, stop in self.sources:
+            offsets = np.concatenate([[0], np.cumsum(lengths)])
+            carry = None
+            for k in range(len(lengths)):
+                part_start, part_stop = offsets[k], offsets[k + 1]
+                if part_stop <= start:
+                    continue
+                if part_start >= stop:
+                    break
+
+                part = ddf.get_partition(k).compute()
+                chunk = part if carry is None else pd.concat([carry, part])
+                chunk_start = part_stop - len(chunk)
+
+                windows = self._windows(
+                    chunk, max(start - chunk_start, 0), min(stop, part_stop) - chunk_start
+                )
+                if len(windows):
+                    if self.batch_size is None:
+                        yield windows.x(), windows.y()
+                    else:
+                        yield from windows.batches(self.batch_size)
+                carry = chunk.iloc[len(chunk) - min(span, len(chunk)) :]
+
+
+class DaskDataset:
+    def __init__(self, df, npartitions: int = None, lengths: list = None):
+        """
+        Initialize the DaskDataset object.
+
+        Partitioned, out-of-core alternative to Dataset for multi-year, multi-turbine data.
+        The transforms stay lazy and run the pandas Dataset code on every partition, with
+        the rows of the previous partition that the rolling windows and lags reach back to
+        (map_overlap), so the results equal those of Dataset on the whole series.
+        create_dataset produces the windows partition by partition.
+
+        Partitions must be at least as long as the largest rolling window or lag.
+
+        Parameters
+        ----------
+            df (dd.DataFrame or pd.DataFrame):
+                Input data of one series, sorted by time. A pandas DataFrame is split into npartitions.
+
+            npartitions (int, optional):
+                Number of partitions of a pandas DataFrame. Defaults to None (1).
+
+            lengths (list, optional):
+                Rows per partition if known, computed on first use otherwise. Defaults to None.
+
+        Example
+        -------
+            dataset = DaskDataset.from_scada_cache("data/kelmarsh/cache", turbine=2, columns=columns)
+            dataset.fill_nan(columns)
+            dataset.add_rolling_features(["Wind speed (m/s)"], ["mean", "std"], [6, 36])
+            train, val, test, names = dataset.create_dataset(144, 6, target_col="Power (kW)")
+            model.train_batches(train, val)
+        """
+        if isinstance(df, pd.DataFrame):
+            import dask.dataframe as dd
+
+            df = dd.from_pandas(df, npartitions=npartitions or 1, sort=False)
+        self.df = df
+        self._lengths = None if lengths is None else list(lengths)
+
+    @classmethod
+    def from_scada_cache(
+        cls,
+        cache_path: str,
+        turbine: int = 2,
+        columns: list = None,
+        start=None,
+        end=None,
+        partition_rows: int = 52560,
+    ) -> "DaskDataset":
+        """
+        Partitioned dataset over the columnar SCADA cache of kelmarsh_loader.build_cache.
+
+        Every partition lazily loads partition_rows rows (one year of 10 minute data by
+        default) with load_scada, nothing is read until a partition is computed.
+
+        Parameters
+        ----------
+            cache_path (str):
+                Directory written by build_cache.
+
+            turbine (int, optional):
+                Turbine number. Defaults to 2.
+
+            columns (list, optional):
+                Columns to load, None for all. Defaults to None.
+
+            start (optional):
+                First timestamp (inclusive). Defaults to None.
+
+            end (optional):
+                Last timestamp (exclusive). Defaults to None.
+
+            partition_rows (int, optional):
+                Rows per partition. Defaults to 52560.
+
+        Returns
+        -------
+            DaskDataset: The partitioned dataset.
+        """
+        import dask.dataframe as dd
+        from dask import delayed
+
+        turbine_path = Path(cache_path) / str(turbine)
+        with open(turbine_path / "meta.json") as f:
+            columns = columns or json.load(f)["columns"]
+        time = np.load(turbine_path / "time.npy", mmap_mode="r")
+        lo = 0 if start is None else np.searchsorted(time, pd.Timestamp(start).value, side="left")
+        hi = len(time) if end is None else np.searchsorted(time, pd.Timestamp(end).value, side="left")
+
+        bounds = list(range(lo, hi, partition_rows)) + [hi]
+        timestamp = lambda i: None if i >= len(time) else pd.Timestamp(int(time[i]))
+        parts = [
+            delayed(load_scada)(cache_path, turbine, columns, timestamp(a), timestamp(b))
+            for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+        meta = load_scada(cache_path, turbine, columns, timestamp(lo), timestamp(lo))
+        lengths = np.diff(bounds).tolist()
+        return cls(dd.from_delayed(parts, meta=meta, verify_meta=False), lengths=lengths)
+
+    @property
+    def lengths(self) -> list:
+        """
+        Number of rows of every partition.
+        """
+        if self._lengths is None:
+            self._lengths = self.df.map_partitions(len).compute().tolist()
+        return self._lengths
+
+    def __len__(self) -> int:
+        return sum(self.lengths)
+
+    def _map_overlap(self, before: int, method: str, *args):
+        meta = _partition_apply(self.df._meta_nonempty, method, *args).iloc[:0]
+        self.df = self.df.map_overlap(
+            _partition_apply, before, 0, method, *args, meta=meta, align_dataframes=False
+        )
+
+    @profiled
+    def fill_nan(self, fields: list):
+        """
+        Forward fill the specified fields across partitions, remaining NaN (at the start
+        of the series) are filled with the mean of the forward filled column.
+
+        One pass over the data collects the last valid value of every partition and the
+        sums for the mean, the filling itself stays lazy and only needs its own partition,
+        also when whole partitions are NaN (e.g. a long sensor outage).
+
+        Parameters
+        ----------
+            fields (list):
+                List of fields/columns to fill missing values.
+
+        Returns
+        -------
+            None
+        """
+        import dask
+        from dask import delayed
+
+        fields = list(fields)
+        stats = dask.compute(*[delayed(_fill_stats)(part, fields) for part in self.df.to_delayed()])
+
+        fills = {}
+        for f in fields:
+            per_partition = pd.DataFrame([s.loc[f] for s in stats]).reset_index(drop=True)
+            # value carried into partition k: the last valid value of partitions before k
+            carries = per_partition["last"].ffill().shift(1)
+            carried = carries.notna() * per_partition["lead"]
+            total = per_partition["sum"].sum() + (carries.fillna(0) * carried).sum()
+            count = per_partition["count"].sum() + carried.sum()
+            fills[f] = (carries.tolist(), total / count if count else np.nan)
+
+        self.df = self.df.map_partitions(_fill_partition, fills, meta=self.df._meta, align_dataframes=False)
+
+    @profiled
+    def drop_nan(self, fields: list):
+        """
+        Drop columns in the specified fields/columns of the DataFrame.
+
+        Parameters
+        ----------
+            fields (list):
+                List of fields/columns to drop.
+
+        Returns
+        -------
+            None
+        """
+        self.df = self.df.drop(columns=fields)
+
+    @profiled
+    def sample(self, n: int):
+        """
+        Sample every nth row of the whole series, across partition boundaries.
+
+        Parameters
+        ----------
+            n (int):
+                Sampling interval.
+
+        Returns
+        -------
+            None
+        """
+        offsets = np.concatenate([[0], np.cumsum(self.lengths)[:-1]]).tolist()
+        self._lengths = [len(range((-o) % n, length, n)) for o, length in zip(offsets, self.lengths)]
+        self.df = self.df.map_partitions(
+            _sample_partition, n, offsets, meta=self.df._meta, align_dataframes=False
+        )
+
+    @profiled
+    def apply_rolling_window(self, data: str, roll_time: int, window_function: callable):
+        """
+        Apply a rolling window function to a column, see Dataset.apply_rolling_window.
+        Every partition is computed with the last roll_time - 1 rows of the previous one.
+        Unlike Dataset.apply_rolling_window there is no df argument, the partitioned
+        DataFrame of the dataset is transformed.
+
+        Parameters
+        ----------
+            data (str):
+                Column name containing the data to apply the rolling window function.
+
+            roll_time (int):
+                Window size for the rolling window.
+
+            window_function (callable):
+                Callable function to apply as the rolling window function.
+
+        Returns
+        -------
+            None
+        """
+        if not callable(window_function):
+            raise ValueError("window_function must be a callable function")
+        self._map_overlap(roll_time - 1, "apply_rolling_window", data, roll_time, window_function)
+
+    @profiled
+    def add_rolling_features(
+        self,
+        columns: list,
+        aggregations: list,
+        windows: list,
+        fill_value: float = 0,
+        engine: str = None,
+    ):
+        """
+        Add rolling aggregations for every combination of column, aggregation and window
+        length, see Dataset.add_rolling_features. Every partition is computed with the
+        last max(windows) - 1 rows of the previous one.
+
+        Parameters
+        ----------
+            columns (list):
+                Columns to aggregate.
+
+            aggregations (list):
+                Aggregation names or callables.
+
+            windows (list):
+                Window sizes of the rolling windows.
+
+            fill_value (float, optional):
+                Value used for the incomplete windows at the start of the series. Defaults to 0.
+
+            engine (str, optional):
+                Engine passed to pandas rolling apply for callables. Defaults to None.
+
+        Returns
+        -------
+            None
+        """
+        self._map_overlap(
+            max(windows) - 1, "add_rolling_features", columns, aggregations, windows, fill_value, engine
+        )
+
+    @profiled
+    def add_last_t(self, data: str, step: int = 2):
+        """
+        Add lagged versions of a column, see Dataset.add_last_t. Every partition is
+        computed with the last step rows of the previous one. Unlike Dataset.add_last_t
+        there is no df argument, the partitioned DataFrame of the dataset is transformed.
+
+        Parameters
+        ----------
+            data (str):
+                Column name to create lagged versions of.
+
+            step (int, optional):
+                Number of lagged steps to add. Defaults to 2.
+
+        Returns
+        -------
+            None
+        """
+        self._map_overlap(step, "add_last_t", data, step)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Compute the whole DataFrame, for data that fits in memory.
+        """
+        return self.df.compute()
+
+    def _splits(self, window_size: int, test_split: float, val_split: float) -> list:
+        n = len(self)
+        train_split = n - int(n * test_split) - int(n * val_split)
+        val_split = n - int(n * test_split)
+        return [(0, train_split), (train_split - window_size, val_split), (val_split - window_size, n)]
+
+    @profiled
+    def create_dataset(
+        self,
+        window_size: int,
+        prediction_horizon: int,
+        test_split: float = 0.2,
+        val_split: float = 0.2,
+        univariate: bool = False,
+        target_col: str = "active_power_total",
+        batch_size: int = None,
+    ) -> tuple:
+        """
+        Create train, validation and test window streams, produced partition by partition.
+
+        The splits are those of Dataset.create_dataset, each split is a PartitionWindows
+        stream of (X_batch, y_batch) tuples, e.g. for Model.train_batches.
+
+        Parameters
+        ----------
+            window_size (int):
+                Size of the input window.
+
+            prediction_horizon (int):
+                Number of steps to predict into the future.
+
+            test_split (float, optional):
+                Ratio of test data split. Defaults to 0.2.
+
+            val_split (float, optional):
+                Ratio of validation data split. Defaults to 0.2.
+
+            univariate (bool, optional):
+                Flag indicating if the data is univariate. Defaults to False.
+
+            target_col (str, optional):
+                Name of the target column. Defaults to "active_power_total".
+
+            batch_size (int, optional):
+                Windows per batch, None for one batch per partition. Defaults to None.
+
+        Returns
+        -------
+            tuple: Tuple containing train, val and test PartitionWindows, as well as feature names.
+        """
+        return fleet_dataset(
+            [self], window_size, prediction_horizon, test_split, val_split, univariate, target_col, batch_size
+        )
+
+
+def fleet_dataset(
+    datasets: list,
+    window_size: int,
+    prediction_horizon: int,
+    test_split: float = 0.2,
+    val_split: float = 0.2,
+    univariate: bool = False,
+    target_col: str = "active_power_total",
+    batch_size: int = None,
+) -> tuple:
+    """
+    Window streams over several series, e.g. one DaskDataset per turbine.
+
+    Every series is split in time like Dataset.create_dataset and windows never cross
+    from one series into the next. The series must have the same columns.
+
+    Parameters
+    ----------
+        datasets (list):
+            DaskDataset per series.
+
+        window_size (int):
+            Size of the input window.
+
+        prediction_horizon (int):
+            Number of steps to predict into the future.
+
+        test_split (float, optional):
+            Ratio of test data split. Defaults to 0.2.
+
+        val_split (float, optional):
+            Ratio of validation data split. Defaults to 0.2.
+
+        univariate (bool, optional):
+            Flag indicating if the data is univariate. Defaults to False.
+
+        target_col (str, optional):
+            Name of the target column. Defaults to "active_power_total".
+
+        batch_size (int, optional):
+            Windows per batch, None for one batch per partition. Defaults to None.
+
+    Returns
+    -------
+        tuple: Tuple containing train, val and test PartitionWindows, as well as feature names.
+    """
+    splits = [[], [], []]
+    for dataset in datasets:
+        for sources, (start, stop) in zip(
+            splits, dataset._splits(window_size, test_split, val_split)
+        ):
+            sources.append((dataset.df, dataset.lengths, start, stop))
+
+    streams = tuple(
+        PartitionWindows(
+            sources, window_size, prediction_horizon, univariate, target_col, batch_size
+        )
+        for sources in splits
+    )
+    names = [f"lag_{i}" for i in range(1, window_size + 1)]
+    names.extend(c for c in datasets[0].df.columns if c != target_col)
+    return streams + (names,)
@@ -2,6 +2,106 @@ import pandas as pd
 import numpy as np
 import random
 
+from .windows import SlidingWindows
+from .profiling import profiled
+
+# NumPy reductions which have a native (cythonized) pandas rolling counterpart
+_NATIVE_ROLLING = {
+    np.mean: ("mean", {}),
+    np.sum: ("sum", {}),
+    np.min: ("min", {}),
+    np.max: ("max", {}),
+    np.median: ("median", {}),
+    np.std: ("std", {"ddof": 0}),
+    np.var: ("var", {"ddof": 0}),
+}
+
+_NAMED_ROLLING = ("mean", "std", "var", "min", "max", "sum", "median")
+
+# named std and var are population statistics like np.std and np.var, so that every
+# rolling_std_{column}_{window} column holds the same values whichever way it is built
+_NAMED_KWARGS = {"std": {"ddof": 0}, "var": {"ddof": 0}}
+
+
+def _rolling_aggregate(rolling, aggregation, engine: str = None, raw: bool = True):
+    """
+    Compute one aggregation over a pandas Rolling object, preferring the built-in kernels.
+    """
+    if callable(aggregation):
+        if aggregation in _NATIVE_ROLLING:
+            method, kwargs = _NATIVE_ROLLING[aggregation]
+            return getattr(rolling, method)(**kwargs)
+        return rolling.apply(aggregation, raw=raw, engine=engine)
+    if aggregation in _NAMED_ROLLING:
+        return getattr(rolling, aggregation)(**_NAMED_KWARGS.get(aggregation, {}))
+    if aggregation.startswith("quantile_"):
+        return rolling.quantile(float(aggregation[len("quantile_") :]))
+    raise ValueError(f"Unknown rolling aggregation: {aggregation}")
+
+
+def _rolling_block(
+    df: pd.DataFrame, aggregations: list, windows: list, out: np.ndarray, engine: str = None
+) -> list:
+    """
+    Write every aggregation x window of all columns of df into the preallocated out
+    array and return the names of the written columns.
+    """
+    names = []
+    k = 0
+    for roll_time in windows:
+        rolling = df.rolling(window=roll_time)
+        for aggregation in aggregations:
+            result = _rolling_aggregate(rolling, aggregation, engine)
+            agg_name = aggregation if isinstance(aggregation, str) else aggregation.__name__
+            out[:, k : k + df.shape[1]] = result.to_numpy(dtype=np.float64)
+            names.extend(f"rolling_{agg_name}_{c}_{roll_time}" for c in df.columns)
+            k += df.shape[1]
+    return names
+
+
+def _split_windows(
+    train: SlidingWindows,
+    val: SlidingWindows,
+    test: SlidingWindows,
+    shuffle: bool = False,
+    gap: int = 0,
+    random_state: int = None,
+) -> tuple:
+    """
+    Select the train, validation and test windows as index permutations over one set of windows.
+
+    Train and validation windows are positions of a single SlidingWindows object over both
+    ranges. gap purges the training windows within gap positions of the first validation
+    window, at the chronological boundary and before shuffling. Shuffling then permutes the
+    remaining positions and splits them again with the original ratio.
+    """
+    base = SlidingWindows(
+        train.target, train.exog, train.window_size, train.prediction_horizon, train.start, val.stop
+    )
+    train_pos = np.arange(len(train))
+    val_pos = np.arange(len(val)) + (val.start - base.start)
+
+    if gap and len(val_pos):
+        train_pos = train_pos[train_pos < val_pos[0] - gap]
+    if not len(train_pos):
+        raise ValueError(f"No training windows left with gap={gap}, {len(train)} windows before the purge")
+
+    if shuffle:
+        rng = np.random if random_state is None else np.random.RandomState(random_state)
+        candidates = rng.permutation(np.concatenate([train_pos, val_pos]))
+        split_index = int(len(candidates) * len(train_pos) / (len(train_pos) + len(val_pos)))
+        train_pos, val_pos = candidates[:split_index], candidates[split_index:]
+
+    return base.subset(train_pos), base.subset(val_pos), test.subset(np.arange(len(test)))
+
+
+def _materialize(train, val, test) -> tuple:
+    """
+    Materialize the (X, y) arrays of the three splits.
+    """
+    return train.x(), val.x(), test.x(), train.y(), val.y(), test.y()
+
+
 class Dataset:
     def __init__(self, df: pd.DataFrame):
         """
@@ -14,6 +114,7 @@ class Dataset:
         """
         self.df = df
 
+    @profiled
     def fill_nan(self, fields: list):
         """
         Fill missing values (NaN) in the specified fields/columns of the DataFrame.
@@ -31,6 +132,7 @@ class Dataset:
             self.df[f] = self.df[f].ffill()
             self.df[f] = self.df[f].fillna(self.df[f].mean())
 
+    @profiled
     def drop_nan(self, fields: list):
         """
         Drop columns in the specified fields/columns of the DataFrame.
@@ -46,6 +148,7 @@ class Dataset:
         """
         self.df = self.df.drop(columns=fields)
 
+    @profiled
     def sample(self, n: int):
         """
         Sample every nth row from the DataFrame.
@@ -61,11 +164,14 @@ class Dataset:
         """
         self.df = self.df.iloc[::n, :]
 
+    @profiled
     def apply_rolling_window(
         self, df: pd.DataFrame, data: str, roll_time: int, window_function: callable
     ) :
         """
         Apply a rolling window function to the specified data column in the DataFrame.
+        NumPy reductions with a native pandas rolling counterpart (np.mean, np.std, ...)
+        are computed with the built-in kernel instead of calling the function per window.
 
         Parameters
         ----------
@@ -87,12 +193,84 @@ class Dataset:
         if not callable(window_function):
             raise ValueError("window_function must be a callable function")
 
-        df[f"rolling_{window_function.__name__}_{data}_{roll_time}"] = (
-            df[data].rolling(window=roll_time).apply(window_function)
+        name = f"rolling_{window_function.__name__}_{data}_{roll_time}"
+        df[name] = _rolling_aggregate(
+            df[data].rolling(window=roll_time), window_function, raw=False
         )
-        df.fillna(0, inplace=True)
+        df[name] = df[name].fillna(0)
+
+    @profiled
+    def add_rolling_features(
+        self,
+        columns: list,
+        aggregations: list,
+        windows: list,
+        fill_value: float = 0,
+        engine: str = None,
+    ):
+        """
+        Add rolling aggregations for every combination of column, aggregation and window length.
+
+        Named aggregations use the built-in pandas rolling kernels and are computed for
+        all columns at once, the new columns are added to the DataFrame in a single block.
+        Column names follow apply_rolling_window: rolling_{aggregation}_{column}_{window}.
+
+        Parameters
+        ----------
+            columns (list): 
+                Columns to aggregate.
+
+            aggregations (list): 
+                Aggregations to compute. Either names ("mean", "std", "var", "min", "max", "sum",
+                "median", "quantile_<q>" e.g. "quantile_0.9") or callables applied to the raw
+                NumPy array of every window. "std" and "var" use ddof=0 like np.std and np.var,
+                which produce the same column names.
+
+            windows (list): 
+                Window sizes of the rolling windows.
+
+            fill_value (float, optional): 
+                Value used for the incomplete windows at the start of the series. Defaults to 0.
+
+            engine (str, optional): 
+                Engine passed to pandas rolling apply for callables ("cython" or "numba"). Defaults to None.
+
+        Returns
+        -------
+            None
+        """
+        block = np.empty(
+            (len(self.df), len(columns) * len(aggregations) * len(windows)), dtype=np.float64
+        )
+        names = _rolling_block(self.df[columns], aggregations, windows, block, engine)
+        np.nan_to_num(block, copy=False, nan=fill_value)
+        self.df = pd.concat(
+            [self.df, pd.DataFrame(block, index=self.df.index, columns=names)], axis=1
+        )
+
+    @profiled
+    def apply_pipeline(self, pipeline, fit: bool = True):
+        """
+        Replace the DataFrame with the output of a FeaturePipeline.
+
+        Parameters
+        ----------
+            pipeline (FeaturePipeline): 
+                Feature engineering plan to run.
 
+            fit (bool, optional): 
+                Fit the pipeline on the DataFrame first, set to False to replay an already
+                fitted pipeline on new data. Defaults to True.
 
+        Returns
+        -------
+            None
+        """
+        if fit:
+            pipeline.fit(self.df)
+        self.df = pipeline.transform(self.df)
+
+    @profiled
     def add_last_t(self, df: pd.DataFrame, data: str, step: int = 2):
         """
         Add lagged versions of a column to the DataFrame.
@@ -116,6 +294,7 @@ class Dataset:
             df[f"{data}_last_{i}_step"] = df[data].shift(i)
             df[f"{data}_last_{i}_step"].fillna(0)
 
+    @profiled
     def add_seasonal_feat(self, df: pd.DataFrame, time_col):
         """
         Add seasonal features based on a time column.
@@ -137,7 +316,135 @@ class Dataset:
         df["week_sin"] = np.sin((time_col.week / 52) * 2 * np.pi)
         df["week_cos"] = np.cos((time_col.week / 52) * 2 * np.pi)
 
-    def create_dataset(
+    @profiled
+    def create_windows(
+        self,
+        df: pd.DataFrame,
+        window_size: int,
+        prediction_horizon: int,
+        test_split: float = 0.2,
+        val_split: float = 0.2,
+        univariate: bool = False,
+        target_col: str = "active_power_total",
+    ) -> tuple:
+        """
+        Create lazy train, validation and test windows without materializing them.
+
+        The target column is converted to one contiguous array and every split is a
+        strided view over it, the exogenous block is gathered by index only when
+        the windows are materialized.
+
+        Parameters
+        ----------
+            df (pd.DataFrame):
+                 Input DataFrame containing the data.
+
+            window_size (int):
+                 Size of the input window.
+
+            prediction_horizon (int):
+                 Number of steps to predict into the future.
+
+            test_split (float, optional): 
+                Ratio of test data split. Defaults to 0.2.
+
+            val_split (float, optional):
+                 Ratio of validation data split. Defaults to 0.2.
+
+            univariate (bool, optional): 
+                Flag indicating if the data is univariate. Defaults to False.
+                
+            target_col (str, optional): 
+                Name of the target column. Defaults to "active_power_total".
+
+        Returns
+        -------
+            tuple: Tuple containing train, val and test SlidingWindows, as well as feature names.
+        """
+        exog_cols = [c for c in df.columns if c != target_col]
+        target = df[target_col].to_numpy()
+        exog = None if univariate else df[exog_cols].to_numpy()
+
+        train_split = len(df) - int(len(df) * test_split) - int(len(df) * val_split)
+        val_split = len(df) - int(len(df) * test_split)
+
+        train = SlidingWindows(target, exog, window_size, prediction_horizon, 0, train_split)
+        val = SlidingWindows(
+            target, exog, window_size, prediction_horizon, train_split - window_size, val_split
+        )
+        test = SlidingWindows(
+            target, exog, window_size, prediction_horizon, val_split - window_size, len(df)
+        )
+
+        names = [f"lag_{i}" for i in range(1, window_size + 1)]
+        names.extend(exog_cols)
+
+        return train, val, test, names
+
+    @profiled
+    def stream_dataset(
+        self,
+        df: pd.DataFrame,
+        window_size: int,
+        prediction_horizon: int,
+        test_split: float = 0.2,
+        val_split: float = 0.2,
+        univariate: bool = False,
+        target_col: str = "active_power_total",
+        batch_size: int = 4096,
+        max_batch_bytes: int = None,
+    ) -> tuple:
+        """
+        Create train, validation and test mini-batch streams instead of dense matrices.
+
+        Uses the same splits as create_dataset, but each split is a re-iterable
+        stream of (X_batch, y_batch) tuples so that only one batch is held in memory.
+
+        Parameters
+        ----------
+            df (pd.DataFrame):
+                 Input DataFrame containing the data.
+
+            window_size (int):
+                 Size of the input window.
+
+            prediction_horizon (int):
+                 Number of steps to predict into the future.
+
+            test_split (float, optional): 
+                Ratio of test data split. Defaults to 0.2.
+
+            val_split (float, optional):
+                 Ratio of validation data split. Defaults to 0.2.
+
+            univariate (bool, optional): 
+                Flag indicating if the data is univariate. Defaults to False.
+                
+            target_col (str, optional): 
+                Name of the target column. Defaults to "active_power_total".
+
+            batch_size (int, optional):
+                Number of windows per batch. Defaults to 4096.
+
+            max_batch_bytes (int, optional):
+                Memory ceiling for a single (X, y) batch, lowers the batch size if needed. Defaults to None.
+
+        Returns
+        -------
+            tuple: Tuple containing train, val and test WindowBatches, as well as feature names.
+        """
+        train, val, test, names = self.create_windows(
+            df, window_size, prediction_horizon, test_split, val_split, univariate, target_col
+        )
+        return (
+            train.batches(batch_size, max_batch_bytes),
+            val.batches(batch_size, max_batch_bytes),
+            test.batches(batch_size, max_batch_bytes),
+            names,
+        )
+
+    @profiled
+    def split_windows(
         self,
         df: pd.DataFrame,
         window_size: int,
@@ -147,9 +454,15 @@ class Dataset:
         univariate: bool = False,
         target_col: str = "active_power_total",
         shuffle: bool = False,
+        gap: int = 0,
+        random_state: int = None,
     ) -> tuple:
         """
-        Create a dataset for training and evaluation.
+        Create the splits of create_dataset as lazy selections of window positions.
+
+        Shuffling and purging only permute and filter window positions, no row is copied
+        until x, y or batches of a split is called, so training code can gather the
+        shuffled rows one batch at a time.
 
         Parameters
         ----------
@@ -174,78 +487,96 @@ class Dataset:
             target_col (str, optional): 
                 Name of the target column. Defaults to "active_power_total".
 
+            shuffle (bool, optional):
+                Shuffle the train and validation windows together. Defaults to False.
+
+            gap (int, optional):
+                Purge the training windows within gap positions of the first validation window.
+                Labels of two windows overlap below prediction_horizon positions, labels and lags
+                below window_size + prediction_horizon positions. The purge is applied at the
+                chronological boundary before shuffling, a ValueError is raised if no training
+                window is left. Defaults to 0.
+
+            random_state (int, optional):
+                Seed of the shuffle, None to use the global NumPy random state. Defaults to None.
+
         Returns
         -------
-            tuple: Tuple containing train,val and test data and labels, as well as feature names.
+            tuple: Tuple containing train, val and test WindowSubset, as well as feature names.
         """
+        train, val, test, names = self.create_windows(
+            df, window_size, prediction_horizon, test_split, val_split, univariate, target_col
+        )
+        return _split_windows(train, val, test, shuffle, gap, random_state) + (names,)
 
-        def create_xy(df: pd.DataFrame) -> tuple:  # TODO: Vectorize
-            X = []
-            y = []
-            for i in range(0, len(df)):
-                if (
-                    len(df[(i + window_size) : (i + window_size + prediction_horizon)])
-                    < prediction_horizon
-                ):
-                    break
-                X.append(df[target_col][i : (i + window_size)])
-                y.append(
-                    df[target_col][
-                        (i + window_size) : (i + window_size + prediction_horizon)
-                    ]
-                )
-            X = np.array(X)
-
-            if not univariate:
-                X = np.concatenate(
-                    (
-                        X,
-                        df.iloc[window_size-1 : len(X) + window_size-1, :]
-                        .copy()
-                        .drop(target_col, axis=1),# target col appears as the highest lag
-                    ),
-                    axis=1,
-                )
-            y = np.array(y)
-            return X, y
-        
+    @profiled
+    def create_dataset(
+        self,
+        df: pd.DataFrame,
+        window_size: int,
+        prediction_horizon: int,
+        test_split: float = 0.2,
+        val_split: float = 0.2,
+        univariate: bool = False,
+        target_col: str = "active_power_total",
+        shuffle: bool = False,
+        gap: int = 0,
+        random_state: int = None,
+    ) -> tuple:
+        """
+        Create a dataset for training and evaluation.
 
+        The splits are selected as in split_windows and materialized once, the labels
+        keep all prediction_horizon columns also when shuffled.
 
-        train_split = len(df) - int(len(df) * test_split) - int(len(df) * val_split)
-        val_split = len(df) - int(len(df) * test_split)
-        train_df = df[:train_split]
-        val_df = df[train_split - window_size : val_split]
-        test_df = df[val_split - window_size :]
+        Parameters
+        ----------
+            df (pd.DataFrame):
+                 Input DataFrame containing the data.
 
-        train_x, train_y = create_xy(train_df)
-        val_x, val_y = create_xy(val_df)
-        test_x, test_y = create_xy(test_df)
+            window_size (int):
+                 Size of the input window.
 
-        if shuffle:
-            train_val_split = len(train_df)/ (len(train_df) + len(val_df))
-            combined_x = np.concatenate([train_x, val_x], axis=0)
+            prediction_horizon (int):
+                 Number of steps to predict into the future.
 
-            # Combine train_y and val_y into a single numpy array
-            combined_y = np.concatenate([train_y[:,-1], val_y[:,-1]], axis=0)
+            test_split (float, optional): 
+                Ratio of test data split. Defaults to 0.2.
 
-            # Combine the features and labels into a single numpy array
-            combined_data = np.column_stack((combined_x, combined_y))
+            val_split (float, optional):
+                 Ratio of validation data split. Defaults to 0.2.
 
-            # Shuffle the combined dataset
-            np.random.shuffle(combined_data)
+            univariate (bool, optional): 
+                Flag indicating if the data is univariate. Defaults to False.
+                
+            target_col (str, optional): 
+                Name of the target column. Defaults to "active_power_total".
 
-            # Split the combined dataset back into train and validation sets
-            split_index = int(len(combined_data) * train_val_split)
-            shuffled_train_data = combined_data[:split_index]
-            shuffled_val_data = combined_data[split_index:]
+            shuffle (bool, optional):
+                Shuffle the train and validation windows together. Defaults to False.
 
-            # Extract shuffled_train_x, shuffled_train_y, shuffled_val_x, shuffled_val_y
-            train_x = shuffled_train_data[:, :-1]
-            train_y = shuffled_train_data[:, -1]
-            val_x = shuffled_val_data[:, :-1]
-            val_y = shuffled_val_data[:, -1]
+            gap (int, optional):
+                Purge the training windows within gap positions of the first validation window,
+                before shuffling. Defaults to 0.
 
-        names = [f"lag_{i}" for i in range(1, window_size + 1)]
-        names.extend(list(df.copy().drop(target_col, axis=1).columns))
+            random_state (int, optional):
+                Seed of the shuffle. Defaults to None.
+
+        Returns
+        -------
+            tuple: Tuple containing train,val and test data and labels, as well as feature names.
+        """
+        train, val, test, names = self.split_windows(
+            df,
+            window_size,
+            prediction_horizon,
+            test_split,
+            val_split,
+            univariate,
+            target_col,
+            shuffle,
+            gap,
+            random_state,
+        )
 
-        return train_x, val_x, test_x, train_y, val_y, test_y, names
+        return _materialize(train, val, test) + (names,)
@@ -1,43 +1,158 @@
 import requests
 import os
 import hashlib
+import threading
+import time
+import zlib
 
 from pathlib import Path
 from zipfile import ZipFile
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
+from .kelmarsh_loader import SCADA_PATTERN
 
-def download_file(url,outfile):
+
+class DownloadProgress:
+    # thread-safe byte counter printing the overall progress and throughput
+
+    def __init__(self, total_bytes=0):
+        self.total_bytes = total_bytes
+        self.downloaded = 0
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def update(self, n_bytes):
+        with self.lock:
+            self.downloaded = self.downloaded + n_bytes
+            report = self.report()
+        print(report, end='\r')
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        rate = self.downloaded / (1024*1024) / max(elapsed, 1e-9)
+        return (str(round(self.downloaded/(1024*1024),2)) + ' / '
+                + str(round(self.total_bytes/(1024*1024),2)) + ' MB downloaded, '
+                + str(round(rate,2)) + ' MB/s')
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.start
+        return {'bytes': self.downloaded, 'seconds': elapsed,
+                'mb_per_s': self.downloaded / (1024*1024) / max(elapsed, 1e-9)}
+
+
+def create_session(pool_size=4):
+    # requests session with a connection pool shared by all download threads
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=3)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _checksum_marker(outfile):
+    return outfile + '.md5'
+
+
+def is_verified(outfile, md5):
+    # check a file against its md5 without reading it again, using the marker written
+    # after the download, files without a valid marker are hashed once
+
+    marker = _checksum_marker(outfile)
+    if not os.path.exists(outfile):
+        return False
+
+    stat = os.stat(outfile)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if f.read().split() == [md5, str(stat.st_size), str(stat.st_mtime_ns)]:
+                return True
+
+    with open(outfile, 'rb') as f_check:
+        file_hash = hashlib.md5()
+        while chunk := f_check.read(1024*1024):
+            file_hash.update(chunk)
+    if file_hash.hexdigest() != md5:
+        return False
+
+    _write_marker(outfile, md5)
+    return True
+
+
+def _write_marker(outfile, md5):
+    stat = os.stat(outfile)
+    with open(_checksum_marker(outfile), 'w') as f:
+        f.write(' '.join([md5, str(stat.st_size), str(stat.st_mtime_ns)]))
+
+
+def download_file(url,outfile,session=None,md5=None,progress=None,chunk_size=1024*1024):
     # download a file from the web based on its url
-    
-    get_response = requests.get(url,stream=True)
-    
-    chunk_number = 0
-    with open(outfile, 'wb') as f:
-        
-        for chunk in get_response.iter_content(chunk_size=1024*1024):
-            
-            chunk_number = chunk_number + 1
-            
-            print(str(chunk_number) + ' MB downloaded', end='\r')
-            
-            if chunk: # filter out keep-alive new chunks
-                f.write(chunk)  
+    #
+    # the data is written to outfile.part and renamed once complete, an existing .part
+    # file is resumed with an HTTP Range request. The md5 is updated while streaming,
+    # so the file is not read again to verify it.
+
+    session = session or requests
+    part = outfile + '.part'
+
+    file_hash = hashlib.md5()
+    offset = 0
+    if os.path.exists(part):
+        # hash the partial data once to continue the checksum
+        with open(part, 'rb') as f_part:
+            while chunk := f_part.read(chunk_size):
+                file_hash.update(chunk)
+                offset = offset + len(chunk)
+
+    headers = {'Range': 'bytes=' + str(offset) + '-'} if offset else {}
+    with session.get(url, stream=True, headers=headers) as get_response:
+
+        if get_response.status_code == 416:
+            # the partial file already holds everything
+            pass
+
+        else:
+            get_response.raise_for_status()
+
+            if offset and get_response.status_code != 206:
+                # server ignored the range, start from zero
+                file_hash = hashlib.md5()
+                offset = 0
+
+            with open(part, 'ab' if offset else 'wb') as f:
 
+                for chunk in get_response.iter_content(chunk_size=chunk_size):
 
-def download_zenodo_data(record_id,outfile_path):
+                    if chunk: # filter out keep-alive new chunks
+                        f.write(chunk)
+                        file_hash.update(chunk)
+                        if progress is not None:
+                            progress.update(len(chunk))
+
+    if md5 is not None and file_hash.hexdigest() != md5:
+        os.remove(part)
+        raise IOError('Checksum mismatch for ' + outfile)
+
+    os.replace(part, outfile)
+    _write_marker(outfile, file_hash.hexdigest())
+
+
+def download_zenodo_data(record_id,outfile_path,max_workers=4,url_zenodo=r'https://zenodo.org/api/records/'):
     # download data from zenodo based on the zenodo record_id
     #
     # outputs:
     # 1. record_details.json, which details the zenodo api details
     # 2. all files available for the record_id
-    
-    
-    url_zenodo = r'https://zenodo.org/api/records/'
+    #
+    # files are downloaded by max_workers threads sharing one pooled session, verified
+    # files are skipped and interrupted downloads resumed. Returns the throughput summary.
+
+    session = create_session(max_workers)
 
     record_id = str(record_id)
     
-    r = requests.get(url_zenodo + record_id)
+    r = session.get(url_zenodo + record_id)
     
     r_json = r.json()
     
@@ -63,51 +178,38 @@ def download_zenodo_data(record_id,outfile_path):
         f.write(r.content)
 
         
-    # download all files
-    files = r_json['files']
-    for f in files:
-        
-        url_file = f['links']['self']
+    # collect the files which are missing or fail the checksum
+    todo = []
+    for f in r_json['files']:
         
-        file_name = f['key']
-                
-        outfile = outfile_path + file_name
-        
-        
-        # check if file exists
-        if os.path.exists(outfile):
-            
-            
-            # if it does check the checksum is correct
-            with open(outfile, 'rb') as f_check:
-                file_hash = hashlib.md5()
-                while chunk := f_check.read(8192):
-                    file_hash.update(chunk)
-        
-            if f['checksum'][4:]==file_hash.hexdigest():
-                print('File already exists: ' + file_name)
-            
-            
-            # download if the checksum isn't correct
-            else:
-                
-                print('Downloading: ' + file_name)
-                print('File size: ' + str(round(f['size']/(1024*1024),2)) + 'MB')       
-
-                download_file(url_file,outfile)
-
-                print('Saved to: ' + outfile + '\n')
-        
-        
-        # download if the file doesn't exist
+        outfile = outfile_path + f['key']
+
+        if is_verified(outfile, f['checksum'][4:]):
+            print('File already exists: ' + f['key'])
         else:
-            
-            print('\nDownloading: ' + file_name)
-            print('File size: ' + str(round(f['size']/(1024*1024),2)) + 'MB')       
+            todo.append(f)
+
+    total = sum(f['size'] for f in todo)
+    print('Downloading ' + str(len(todo)) + ' files, ' + str(round(total/(1024*1024),2)) + 'MB')
 
-            download_file(url_file,outfile)
+    # resumed bytes are not counted as downloaded in this run
+    progress = DownloadProgress(total - sum(
+        os.path.getsize(outfile_path + f['key'] + '.part')
+        for f in todo if os.path.exists(outfile_path + f['key'] + '.part')
+    ))
 
-            print('Saved to: ' + outfile + '\n')
+    def download(f):
+        download_file(f['links']['self'], outfile_path + f['key'], session=session,
+                      md5=f['checksum'][4:], progress=progress)
+        return f['key']
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for file_name in executor.map(download, todo):
+            print('\nSaved to: ' + outfile_path + file_name)
+
+    summary = progress.summary()
+    print('\n' + progress.report() + ' in ' + str(round(summary['seconds'],2)) + 's')
+    return summary
 
 def download_asset_data(asset="kelmarsh",outfile_path="data/kelmarsh/"):
     # simplify downloading of know open data assets from zenodo
@@ -122,14 +224,62 @@ def download_asset_data(asset="kelmarsh",outfile_path="data/kelmarsh/"):
     download_zenodo_data(record_id,outfile_path)
 
 
-def extract_all_data(path="data/kelmarsh/"):
+def _member_selected(name, turbines=None, years=None):
+    # SCADA members are filtered by turbine and year, other members only pass without filters
+
+    match = SCADA_PATTERN.match(os.path.basename(name))
+    if match is None:
+        return turbines is None and years is None
+    if turbines is not None and int(match['turbine']) not in turbines:
+        return False
+    if years is not None and int(match['start'][:4]) not in years:
+        return False
+    return True
+
+
+def _is_extracted(info, target):
+    # compare an extracted file with its zip member by size first and CRC second
+
+    if not os.path.isfile(target) or os.path.getsize(target) != info.file_size:
+        return False
+    crc = 0
+    with open(target, 'rb') as f:
+        while chunk := f.read(1024*1024):
+            crc = zlib.crc32(chunk, crc)
+    return crc == info.CRC
+
+
+def extract_archive(file, path, turbines=None, years=None):
+    """
+    Extract the selected members of one zip file, skipping members already extracted
+    """
+    extracted = []
+    with ZipFile(file) as zipfile:
+        for info in zipfile.infolist():
+            if info.is_dir() or not _member_selected(info.filename, turbines, years):
+                continue
+            if _is_extracted(info, os.path.join(path, info.filename)):
+                continue
+            zipfile.extract(info, path)
+            extracted.append(info.filename)
+    return extracted
+
+
+def extract_all_data(path="data/kelmarsh/", turbines=None, years=None, max_workers=4):
     """
     Get all zip files in path and extract them
+
+    Only SCADA files of the given turbines and years are extracted when filters are
+    given, members that are already extracted with matching size and CRC are skipped
+    and the archives are extracted in parallel.
     """
     print("Extracting compressed data files")
     
-    zipFiles = Path(path).rglob('*.zip')
-    
-    for file in zipFiles:
-        with ZipFile(file) as zipfile:
-            zipfile.extractall(path)
\ No newline at end of file
+    zipFiles = list(Path(path).rglob('*.zip'))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda file: extract_archive(file, path, turbines, years), zipFiles)
+        extracted = [name for names in results for name in names]
+
+    print('Extracted ' + str(len(extracted)) + ' files')
+    return extracted
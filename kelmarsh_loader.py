@@ -0,0 +1,191 @@
+import json
+import os
+import re
+from pathlib import Path
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+
+CSV_PARAMS = {"index_col": "# Date and time", "parse_dates": True, "skiprows": 9}
+
+SCADA_PATTERN = re.compile(
+    r"Turbine_Data_(?P<farm>[A-Za-z]+)_(?P<turbine>\d+)_(?P<start>\d{4}-\d{2}-\d{2})_-_(?P<end>\d{4}-\d{2}-\d{2})"
+)
+
+
+def find_scada_files(path="data/kelmarsh/"):
+    """
+    Find the extracted SCADA CSVs under path, grouped by turbine number and sorted by date
+    """
+    files = {}
+    for file in sorted(Path(path).rglob("Turbine_Data_*.csv")):
+        match = SCADA_PATTERN.match(file.name)
+        if match:
+            files.setdefault(int(match["turbine"]), []).append(file)
+    for turbine in files:
+        files[turbine].sort(key=lambda f: SCADA_PATTERN.match(f.name)["start"])
+    return files
+
+
+def read_scada_csv(source, columns=None):
+    """
+    Read one SCADA CSV (a path or an open file) with the data provider's parameters,
+    parsing only the requested columns
+    """
+    if columns is None:
+        return pd.read_csv(source, **CSV_PARAMS)
+    df = pd.read_csv(source, usecols=[CSV_PARAMS["index_col"]] + list(columns), **CSV_PARAMS)
+    return df[list(columns)]
+
+
+def find_scada_members(path="data/kelmarsh/", turbine=2, years=None):
+    """
+    Find the SCADA CSVs of a turbine inside the downloaded zip files, as
+    (zip file, member name) pairs sorted by date
+    """
+    members = []
+    for file in sorted(Path(path).rglob("*.zip")):
+        with ZipFile(file) as zipfile:
+            for name in zipfile.namelist():
+                match = SCADA_PATTERN.match(os.path.basename(name))
+                if match is None or int(match["turbine"]) != turbine:
+                    continue
+                if years is None or int(match["start"][:4]) in years:
+                    members.append((file, name, match["start"]))
+    members.sort(key=lambda m: m[2])
+    return [(file, name) for file, name, _ in members]
+
+
+def read_scada_zip(path="data/kelmarsh/", turbine=2, columns=None, years=None):
+    """
+    Read the SCADA data of a turbine straight out of the zip files without extracting
+    them, parsing only the requested columns
+    """
+    frames = []
+    for file, name in find_scada_members(path, turbine, years):
+        with ZipFile(file) as zipfile, zipfile.open(name) as member:
+            frames.append(read_scada_csv(member, columns))
+    df = pd.concat(frames)
+    return df[~df.index.duplicated(keep="last")].sort_index()
+
+
+def _source_state(files):
+    return {f.name: [f.stat().st_size, f.stat().st_mtime] for f in files}
+
+
+def build_cache(
+    path="data/kelmarsh/", cache_path=None, turbines=None, columns=None, dtype="float64"
+):
+    """
+    Convert the extracted SCADA CSVs once into a columnar cache of memory-mapped arrays
+
+    Every turbine gets a directory holding one .npy file per numeric column, the sorted
+    timestamps and a meta.json. Turbines whose CSVs did not change since the last build
+    are skipped, so it is cheap to call before every load. Columns missing from an up to
+    date cache are parsed on their own and added next to the cached ones, a cache whose
+    CSVs changed is rebuilt with its previous columns. Non-numeric columns are not cached,
+    they are reported and remembered so that asking for them again does not parse the CSVs.
+    """
+    cache_path = Path(cache_path or os.path.join(path, "cache"))
+    scada_files = find_scada_files(path)
+
+    for turbine, files in scada_files.items():
+        if turbines is not None and turbine not in turbines:
+            continue
+
+        turbine_path = cache_path / str(turbine)
+        meta_file = turbine_path / "meta.json"
+        state = _source_state(files)
+        read = None if columns is None else list(columns)
+        meta = None
+        if meta_file.exists():
+            with open(meta_file) as f:
+                meta = json.load(f)
+            if meta["sources"] != state or meta["dtype"] != dtype:
+                # the CSVs changed, the previously cached columns are rebuilt as well
+                if meta["complete"]:
+                    read = None
+                elif read is not None:
+                    read = list(dict.fromkeys(meta["columns"] + meta.get("dropped", []) + read))
+                meta = None
+
+        if meta is not None:
+            known = set(meta["columns"]) | set(meta.get("dropped", []))
+            if meta["complete"] or (read is not None and set(read) <= known):
+                continue
+            # only the columns that are not cached yet are parsed
+            read = None if read is None else [c for c in read if c not in known]
+
+        print("Caching turbine " + str(turbine))
+        df = pd.concat([read_scada_csv(f, read) for f in files])
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+        if meta is not None:
+            df = df.drop(columns=[c for c in df.columns if c in known])
+        numeric = df.select_dtypes(include="number")
+        dropped = [c for c in df.columns if c not in numeric.columns]
+        if dropped:
+            print("Not caching the non-numeric columns of turbine " + str(turbine) + ": " + str(dropped))
+
+        turbine_path.mkdir(parents=True, exist_ok=True)
+        time = numeric.index.values.astype("datetime64[ns]").view(np.int64)
+        if meta is None:
+            names, dropped_before = [], []
+            np.save(turbine_path / "time.npy", time)
+        else:
+            names, dropped_before = list(meta["columns"]), meta.get("dropped", [])
+            if not np.array_equal(np.load(turbine_path / "time.npy", mmap_mode="r"), time):
+                raise ValueError("Timestamps of turbine " + str(turbine) + " differ from its cache")
+        for column in numeric.columns:
+            np.save(turbine_path / f"col_{len(names)}.npy", numeric[column].to_numpy(dtype=dtype))
+            names.append(column)
+
+        with open(meta_file, "w") as f:
+            json.dump(
+                {
+                    "columns": names,
+                    "dropped": sorted(set(dropped_before) | set(dropped)),
+                    "complete": read is None,
+                    "index_name": df.index.name,
+                    "dtype": dtype,
+                    "sources": state,
+                },
+                f,
+            )
+
+    return cache_path
+
+
+def load_scada(cache_path, turbine=2, columns=None, start=None, end=None):
+    """
+    Load SCADA data from the columnar cache
+
+    Only the requested columns are opened (memory-mapped) and only the rows between
+    start (inclusive) and end (exclusive) are read, found by binary search on the
+    timestamps. A single turbine returns a DataFrame indexed by time, a list of
+    turbines returns one DataFrame indexed by (turbine, time).
+    """
+    if isinstance(turbine, (list, tuple)):
+        frames = [load_scada(cache_path, t, columns, start, end) for t in turbine]
+        return pd.concat(frames, keys=list(turbine), names=["turbine"])
+
+    turbine_path = Path(cache_path) / str(turbine)
+    with open(turbine_path / "meta.json") as f:
+        meta = json.load(f)
+
+    time = np.load(turbine_path / "time.npy", mmap_mode="r")
+    lo = 0 if start is None else np.searchsorted(time, pd.Timestamp(start).value, side="left")
+    hi = len(time) if end is None else np.searchsorted(time, pd.Timestamp(end).value, side="left")
+
+    position = {c: i for i, c in enumerate(meta["columns"])}
+    columns = meta["columns"] if columns is None else columns
+    missing = [c for c in columns if c not in position]
+    if missing:
+        raise KeyError("Columns not in cache: " + str(missing))
+
+    data = {
+        c: np.array(np.load(turbine_path / f"col_{position[c]}.npy", mmap_mode="r")[lo:hi])
+        for c in columns
+    }
+    index = pd.DatetimeIndex(np.array(time[lo:hi]).view("datetime64[ns]"), name=meta["index_name"])
+    return pd.DataFrame(data, index=index)
@@ -0,0 +1,238 @@
+import numpy as np
+import pandas as pd
+
+
+def _metrics(n, m2, abs_err, sq_err, err, abs_true, ape, sape, n_ape) -> dict:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "MAE": abs_err / n,
+            "RMSE": np.sqrt(sq_err / n),
+            # a constant y_true scores 1 if predicted exactly and 0 otherwise, as in sklearn
+            "R2": np.where(m2 > 0, 1 - sq_err / m2, np.where(sq_err > 0, 0.0, 1.0)),
+            "Bias": err / n,
+            "MAPE": np.where(n_ape > 0, ape / n_ape, np.nan),
+            "WAPE": abs_err / abs_true,
+            "sMAPE": np.where(n_ape > 0, sape / n_ape, np.nan),
+        }
+
+
+def align_predictions(y_true, y_pred, y_index: int = -1) -> tuple:
+    """
+    True and predicted values as (n, columns) arrays of the scored columns.
+
+    Multi-horizon predictions are scored against every column of y_true, single column
+    predictions (recursive prediction or a model trained on one horizon) against the
+    column y_index of y_true.
+
+    Parameters
+    ----------
+        y_true (np.ndarray):
+            True values, of shape (n,) or (n, H).
+
+        y_pred (np.ndarray):
+            Predicted values, of shape (n,), (n, 1) or (n, H).
+
+        y_index (int, optional):
+            Column of y_true that single column predictions are scored against. Defaults to -1.
+
+    Returns
+    -------
+        tuple: y_true and y_pred of the same (n, columns) shape.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    y_true = y_true.reshape(len(y_true), -1)
+    y_pred = y_pred.reshape(len(y_pred), -1)
+    if y_pred.shape[1] == 1 and y_true.shape[1] > 1:
+        y_true = y_true[:, [y_index]]
+    if y_true.shape != y_pred.shape:
+        raise ValueError(f"Predictions of shape {y_pred.shape} do not match the targets of shape {y_true.shape}")
+    return y_true, y_pred
+
+
+class MetricAccumulator:
+    def __init__(self, eps: float = 1e-8):
+        """
+        Streaming regression metrics for every horizon column at once.
+
+        The accumulator keeps per-column sums (absolute, squared and signed errors,
+        percentage errors) and the running mean and sum of squared deviations of the
+        true values, so update is one vectorized pass over a batch, memory does not grow
+        with the number of batches and accumulators of parallel workers can be merged.
+
+        MAPE only uses the true values with |y| > eps, as wind power is often 0. WAPE
+        (sum of absolute errors over sum of |y|) and sMAPE are also reported.
+
+        Parameters
+        ----------
+            eps (float, optional):
+                Threshold below which true values are left out of MAPE and sMAPE. Defaults to 1e-8.
+
+        Example
+        -------
+            acc = MetricAccumulator()
+            for batch_x, batch_y in test_batches:
+                acc.update(batch_y, model.predict(batch_x))
+            acc.result()
+        """
+        self.eps = eps
+        self.n_outputs = None
+
+    def _init(self, n_outputs: int):
+        self.n_outputs = n_outputs
+        self.n = 0
+        zeros = lambda: np.zeros(n_outputs)
+        self.abs_err, self.sq_err, self.err = zeros(), zeros(), zeros()
+        self.abs_true, self.ape, self.sape = zeros(), zeros(), zeros()
+        self.n_ape = np.zeros(n_outputs, dtype=np.int64)
+        self.mean, self.m2 = zeros(), zeros()
+
+    def update(self, y_true, y_pred) -> "MetricAccumulator":
+        """
+        Add a batch of true and predicted values.
+
+        Parameters
+        ----------
+            y_true (np.ndarray):
+                True values, of shape (n,) or (n, H).
+
+            y_pred (np.ndarray):
+                Predicted values of the same number of elements.
+
+        Returns
+        -------
+            MetricAccumulator: The accumulator itself.
+        """
+        y_true = np.asarray(y_true, dtype=np.float64)
+        y_true = y_true.reshape(len(y_true), -1)
+        y_pred = np.asarray(y_pred, dtype=np.float64).reshape(y_true.shape)
+        if self.n_outputs is None:
+            self._init(y_true.shape[1])
+        elif y_true.shape[1] != self.n_outputs:
+            raise ValueError(f"Expected {self.n_outputs} output columns, got {y_true.shape[1]}")
+        if not len(y_true):
+            return self
+
+        err = y_pred - y_true
+        abs_err = np.abs(err)
+        abs_true = np.abs(y_true)
+        valid = abs_true > self.eps
+
+        batch_n = len(y_true)
+        batch_mean = y_true.mean(axis=0)
+        batch_m2 = np.square(y_true - batch_mean).sum(axis=0)
+        self._merge_moments(batch_n, batch_mean, batch_m2)
+
+        self.abs_err += abs_err.sum(axis=0)
+        self.sq_err += np.square(err).sum(axis=0)
+        self.err += err.sum(axis=0)
+        self.abs_true += abs_true.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.ape += np.where(valid, abs_err / abs_true, 0).sum(axis=0)
+            self.sape += np.where(valid, 2 * abs_err / (abs_true + np.abs(y_pred)), 0).sum(axis=0)
+        self.n_ape += valid.sum(axis=0)
+        return self
+
+    def _merge_moments(self, n: int, mean: np.ndarray, m2: np.ndarray):
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / total
+        self.m2 = self.m2 + m2 + np.square(delta) * self.n * n / total
+        self.n = total
+
+    def merge(self, other: "MetricAccumulator") -> "MetricAccumulator":
+        """
+        Add the state of another accumulator, e.g. of a parallel worker.
+
+        Parameters
+        ----------
+            other (MetricAccumulator):
+                Accumulator over other rows of the same outputs.
+
+        Returns
+        -------
+            MetricAccumulator: The accumulator itself.
+        """
+        if other.n_outputs is None or not other.n:
+            return self
+        if self.n_outputs is None:
+            self._init(other.n_outputs)
+        elif other.n_outputs != self.n_outputs:
+            raise ValueError("Cannot merge accumulators with different numbers of outputs")
+
+        self._merge_moments(other.n, other.mean, other.m2)
+        for name in ("abs_err", "sq_err", "err", "abs_true", "ape", "sape", "n_ape"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    @classmethod
+    def combine(cls, accumulators: list) -> "MetricAccumulator":
+        """
+        Merge a list of accumulators into a new one.
+        """
+        combined = cls(accumulators[0].eps if accumulators else 1e-8)
+        for acc in accumulators:
+            combined.merge(acc)
+        return combined
+
+    def result(self) -> pd.DataFrame:
+        """
+        Metrics of every horizon column.
+
+        Returns
+        -------
+            pd.DataFrame: One row per output column (1 to H) with MAE, RMSE, R2, Bias, MAPE, WAPE and sMAPE.
+        """
+        if self.n_outputs is None or not self.n:
+            raise ValueError("MetricAccumulator has not seen any values")
+        metrics = _metrics(
+            self.n,
+            self.m2,
+            self.abs_err,
+            self.sq_err,
+            self.err,
+            self.abs_true,
+            self.ape,
+            self.sape,
+            self.n_ape,
+        )
+        return pd.DataFrame(metrics, index=pd.RangeIndex(1, self.n_outputs + 1, name="horizon"))
+
+    def summary(self, multioutput: str = "uniform_average") -> dict:
+        """
+        Metrics over all horizon columns, in the dict format of utils.experiment_results.
+
+        Parameters
+        ----------
+            multioutput (str, optional):
+                "uniform_average" averages the per-column metrics like sklearn and
+                utils.score_function, "raw_flatten" scores all values as one series.
+                Defaults to "uniform_average".
+
+        Returns
+        -------
+            dict: MAE, RMSE, R2, Bias, MAPE, WAPE and sMAPE.
+        """
+        if multioutput == "uniform_average":
+            return self.result().mean().to_dict()
+        if multioutput != "raw_flatten":
+            raise ValueError(f"Unknown multioutput: {multioutput}")
+        if self.n_outputs is None or not self.n:
+            raise ValueError("MetricAccumulator has not seen any values")
+
+        # pool the per-column moments of the true values into the moments of all values
+        n = self.n * self.n_outputs
+        mean = self.mean.mean()
+        m2 = self.m2.sum() + self.n * np.square(self.mean - mean).sum()
+        metrics = _metrics(
+            n,
+            m2,
+            self.abs_err.sum(),
+            self.sq_err.sum(),
+            self.err.sum(),
+            self.abs_true.sum(),
+            self.ape.sum(),
+            self.sape.sum(),
+            self.n_ape.sum(),
+        )
+        return {name: float(value) for name, value in metrics.items()}
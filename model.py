@@ -1,13 +1,180 @@
 import numpy as np
 import pandas as pd
-from lightgbm import LGBMRegressor
-from sklearn.multioutput import MultiOutputRegressor
-from catboost import CatBoostRegressor
-from .utils import score_function
-import matplotlib.pyplot as plt
-from sklearn.metrics import  mean_squared_error,mean_absolute_error
-from catboost import  EShapCalcType, EFeaturesSelectionAlgorithm
-import optuna
+from .metrics import MetricAccumulator, align_predictions
+from .profiling import profile, profiled
+from .utils import downsample, score_function
+from concurrent.futures import ThreadPoolExecutor
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import copy
+import hashlib
+
+# parameter names of the number of trees and the library defaults
+_ITERATION_KEYS = {
+	"cb": ("iterations", "num_boost_round", "n_estimators", "num_trees"),
+	"lgb": ("n_estimators", "num_iterations", "num_boost_round", "num_trees"),
+}
+_DEFAULT_ITERATIONS = {"cb": 1000, "lgb": 100}
+
+# CatBoost, LightGBM, sklearn, Optuna and matplotlib are imported when a feature
+# first needs them, so that importing the module stays cheap for inference workers
+_ESTIMATORS = {"cb": ("catboost", "CatBoostRegressor"), "lgb": ("lightgbm", "LGBMRegressor")}
+
+
+def _estimator(backend: str):
+	"""
+	Regressor class of a backend ("cb" or "lgb"), importing its library on first use.
+	"""
+	module, name = _ESTIMATORS[backend]
+	return getattr(importlib.import_module(module), name)
+
+
+def _is_estimator(model, backend: str) -> bool:
+	"""
+	isinstance check against a backend's regressor without importing its library.
+	"""
+	module, name = _ESTIMATORS[backend]
+	return module in sys.modules and isinstance(model, getattr(sys.modules[module], name))
+
+
+class _ObliviousTreeEvaluator:
+	"""
+	Vectorized NumPy evaluator of a CatBoost model with float features only.
+
+	CatBoost trees are oblivious: every level of a tree uses one (feature, border)
+	split, so the leaf of a tree is the bit pattern of its split results. All splits
+	of all trees are compared at once against the float32 input, which avoids the
+	Pool construction of CatBoostRegressor.predict for single rows and small batches.
+	"""
+
+	@classmethod
+	def from_model(cls, model: "CatBoostRegressor") -> "_ObliviousTreeEvaluator":
+		with tempfile.TemporaryDirectory() as tmp:
+			path = os.path.join(tmp, "model.json")
+			model.save_model(path, format="json")
+			with open(path) as f:
+				return cls(json.load(f))
+
+	def __init__(self, state: dict):
+		float_features = state["features_info"]["float_features"]
+		trees = state["oblivious_trees"]
+		depth = max(len(tree["splits"]) for tree in trees)
+		self.dimension = len(trees[0]["leaf_values"]) >> len(trees[0]["splits"])
+
+		# trees shallower than the deepest one are padded with splits that are never
+		# true (border +inf), which leaves their leaf index unchanged
+		feats = np.zeros((len(trees), depth), dtype=np.intp)
+		borders = np.full((len(trees), depth), np.inf, dtype=np.float32)
+		nan_max = np.zeros((len(trees), depth), dtype=bool)
+		leaf_values = np.zeros((len(trees), 1 << depth, self.dimension))
+		for t, tree in enumerate(trees):
+			for level, split in enumerate(tree["splits"]):
+				if split["split_type"] != "FloatFeature":
+					raise ValueError("Only models with float features can be compiled")
+				info = float_features[split["float_feature_index"]]
+				feats[t, level] = info["flat_feature_index"]
+				borders[t, level] = split["border"]
+				nan_max[t, level] = info.get("nan_value_treatment") == "AsTrue"
+			values = np.reshape(tree["leaf_values"], (-1, self.dimension))
+			leaf_values[t, : len(values)] = values
+
+		self.feats = feats.reshape(-1)
+		self.borders = borders.reshape(-1)
+		self.nan_max = nan_max.reshape(-1) if nan_max.any() else None
+		self.shape = (len(trees), depth)
+		self.powers = 1 << np.arange(depth)
+		self.leaf_offsets = np.arange(len(trees)) << depth
+		self.leaf_values = leaf_values.reshape(-1, self.dimension)
+		scale, bias = state.get("scale_and_bias", [1, [0] * self.dimension])
+		self.scale = scale
+		self.bias = np.array(bias, dtype=np.float64)
+		self.n_features = max(info["flat_feature_index"] for info in float_features) + 1
+
+	def predict(self, X: np.ndarray) -> np.ndarray:
+		values = np.asarray(X)[:, self.feats]
+		bits = values > self.borders
+		if self.nan_max is not None:
+			bits |= np.isnan(values) & self.nan_max
+		leaves = bits.reshape(len(X), *self.shape) @ self.powers + self.leaf_offsets
+		pred = self.leaf_values[leaves].sum(axis=1) * self.scale + self.bias
+		return pred[:, 0] if self.dimension == 1 else pred
+
+
+def _fast_predictor(model) -> tuple:
+	"""
+	Feature count and low-latency predict function of a fitted regressor.
+	"""
+	if _is_estimator(model, "cb"):
+		return len(model.feature_names_), _ObliviousTreeEvaluator.from_model(model).predict
+	if _is_estimator(model, "lgb"):
+		booster = model.booster_
+		return model.n_features_, lambda X: booster.predict(X, num_threads=1)
+	if isinstance(model, _ObliviousTreeEvaluator):
+		return model.n_features, model.predict
+	if hasattr(model, "num_feature"):
+		# lightgbm.Booster of a fast loaded model
+		return model.num_feature(), lambda X: model.predict(X, num_threads=1)
+	return getattr(model, "n_features_in_", None), model.predict
+
+
+def _multi_target_params(params: dict) -> dict:
+	"""
+	CatBoost params with a multi-target objective, MultiRMSE unless one is set.
+	"""
+	if str(params.get("loss_function", "")).startswith("Multi"):
+		return params
+	params = {**params, "loss_function": "MultiRMSE"}
+	params.pop("eval_metric", None)
+	return params
+
+
+class _HorizonModels:
+	"""
+	One regressor per horizon column behaving like a single multi-output regressor:
+	predict returns one column per horizon, feature importances are averaged.
+	"""
+
+	def __init__(self, estimators: list):
+		self.estimators_ = estimators
+
+	def predict(self, X: np.ndarray) -> np.ndarray:
+		return np.column_stack([estimator.predict(X) for estimator in self.estimators_])
+
+	@property
+	def feature_importances_(self) -> np.ndarray:
+		importances = [
+			estimator.feature_importances_ if hasattr(estimator, "feature_importances_") else estimator.feature_importance()
+			for estimator in self.estimators_
+		]
+		return np.mean(importances, axis=0)
+
+
+class _PruningCallback:
+	"""
+	CatBoost training callback reporting a validation metric to an Optuna trial and
+	stopping the training once the pruner flags the trial. The metric must be computed
+	on the eval set, i.e. be the loss_function or the eval_metric of the model.
+	"""
+
+	def __init__(self, trial, metric: str = "MAE", report_every: int = 50):
+		self.trial = trial
+		self.metric = metric
+		self.report_every = report_every
+		self.pruned = False
+
+	def after_iteration(self, info) -> bool:
+		if info.iteration % self.report_every:
+			return True
+		value = info.metrics["validation"][self.metric][-1]
+		self.trial.report(value, info.iteration)
+		self.pruned = self.trial.should_prune()
+		return not self.pruned
 
 
 class Model:
@@ -16,6 +183,7 @@ class Model:
 		model_function: str = "cb",
 		params: dict = {},
 		prediction_type: str = "one_shot",
+		cache_dir: str = None,
 	) -> None:
 		"""
 		Initialize the Model object.
@@ -31,6 +199,10 @@ class Model:
 			prediction_type (str, optional):
 				 Type of prediction ("one_shot" or "recursive"). Defaults to "one_shot".
 
+			cache_dir (str, optional):
+				 Directory in which quantized CatBoost training pools are saved and reused
+				 across runs. Defaults to None (cached in memory only).
+
 
 		Attributes
 		----------
@@ -42,13 +214,123 @@ class Model:
 				Type of prediction ("one_shot" or "recursive")
 			model : object
 				Trained model object
+			feature_names : list
+				Feature names of the training data, as returned by create_dataset
+			selected_features : list
+				Indices of the features chosen by feat_select
+			pipeline : FeaturePipeline
+				Feature pipeline the training data was built with
 		"""
-		self.model_function = (
-			CatBoostRegressor if model_function == "cb" else LGBMRegressor
-		)
+		self.backend = "cb" if model_function == "cb" else "lgb"
 		self.params = params
 		self.prediction_type = prediction_type
+		self.cache_dir = cache_dir
+		self.feature_names = None
+		self.selected_features = None
+		self.pipeline = None
+		self._pools = {}
+
+	@property
+	def model_function(self):
+		"""
+		Regressor class of the model, CatBoostRegressor or LGBMRegressor.
+		"""
+		return getattr(self, "_model_function", None) or _estimator(self.backend)
+
+	@model_function.setter
+	def model_function(self, value):
+		# accepts a backend name ("cb" or "lgb") or a regressor class, as the attribute did
+		if isinstance(value, str):
+			self.backend = "cb" if value == "cb" else "lgb"
+			self._model_function = None
+		else:
+			self.backend = "cb" if value.__module__.startswith("catboost") else "lgb"
+			self._model_function = value
+
+	def _new_model(self, params: dict):
+		"""
+		Regressor with the given params. CatBoost does not write its catboost_info
+		training logs into the working directory unless params set a train_dir.
+		"""
+		if self.backend == "cb" and "train_dir" not in params:
+			params = {"allow_writing_files": False, **params}
+		return self.model_function(**params)
+
+	@profiled
+	def build_pools(
+		self,
+		train_x: np.ndarray,
+		train_y: np.ndarray,
+		val_x: np.ndarray,
+		val_y: np.ndarray,
+	) -> tuple:
+		"""
+		Build the quantized CatBoost training and validation pools once per data.
+
+		Pools are cached by a hash of the arrays and the quantization parameters, so
+		train, every hyp_op trial and feat_select reuse the same quantized data. With a
+		cache_dir they are also saved in CatBoost's binary format and loaded by later runs.
+
+		Parameters
+		----------
+			train_x (np.ndarray):
+				 Training input data.
+
+			train_y (np.ndarray):
+				 Training target data.
+
+			val_x (np.ndarray):
+				 Validation input data.
+
+			val_y (np.ndarray):
+				 Validation target data.
+
+		Returns
+		-------
+			tuple: 
+				Quantized training and validation Pools.
+		"""
+		from catboost import Pool
+
+		quantize_keys = ("border_count", "feature_border_type", "per_float_feature_quantization", "nan_mode")
+		quantize_params = {k: v for k, v in self.params.items() if k in quantize_keys}
+		digest = hashlib.blake2b(repr(sorted(quantize_params.items())).encode(), digest_size=16)
+		for a in (train_x, train_y, val_x, val_y):
+			a = np.ascontiguousarray(a)
+			digest.update(repr((a.shape, a.dtype.str)).encode())
+			digest.update(a.data)
+		key = digest.hexdigest()
+
+		if key in self._pools:
+			return self._pools[key]
+
+		paths = None
+		if self.cache_dir is not None:
+			os.makedirs(self.cache_dir, exist_ok=True)
+			paths = [
+				os.path.join(self.cache_dir, f"{key}_{name}")
+				for name in ("train.bin", "val.bin", "borders.tsv")
+			]
+
+		if paths and all(os.path.exists(p) for p in paths):
+			train_pool = Pool("quantized://" + paths[0])
+			val_pool = Pool("quantized://" + paths[1])
+		else:
+			train_pool = Pool(train_x, train_y)
+			train_pool.quantize(**quantize_params)
+			with tempfile.TemporaryDirectory() as tmp:
+				borders = paths[2] if paths else os.path.join(tmp, "borders.tsv")
+				train_pool.save_quantization_borders(borders)
+				val_pool = Pool(val_x, val_y)
+				val_pool.quantize(input_borders=borders)
+			if paths:
+				train_pool.save(paths[0])
+				val_pool.save(paths[1])
+
+		self._pools[key] = (train_pool, val_pool)
+		return train_pool, val_pool
 
+	@profiled
 	def train(
 		self,
 		train_x: pd.DataFrame,
@@ -57,10 +339,17 @@ class Model:
 		val_y: pd.DataFrame,
 		multioutput: bool = False,
 		verbose: int = 500,
+		multioutput_strategy: str = "auto",
+		early_stopping_rounds: int = None,
+		n_jobs: int = None,
 	) -> None:
 		"""
 		Train the model.
 
+		Multi-horizon targets (multioutput) are trained either natively, as a single
+		CatBoost model with the MultiRMSE objective, or as one model per horizon column
+		trained in parallel threads, each with early stopping on its own val_y column.
+
 		Parameters
 		----------
 			train_x (pd.DataFrame):
@@ -81,17 +370,326 @@ class Model:
 			verbose (int, optional):
 				 Verbosity level during training. Defaults to 500.
 
+			multioutput_strategy (str, optional):
+				 "native" (CatBoost only), "per_horizon" or "auto", which is native for
+				 CatBoost and per horizon for LightGBM. Defaults to "auto".
+
+			early_stopping_rounds (int, optional):
+				 Rounds without improvement on the validation set after which training stops.
+				 Defaults to None, i.e. the params' value, or 50 for multioutput models.
+
+			n_jobs (int, optional):
+				 Thread budget shared by the per horizon models. Defaults to the thread
+				 count in params, or the cpu count.
+
 		Returns
 		-------
 			None
 		"""
+		params = dict(self.params)
+		if early_stopping_rounds is None and multioutput:
+			early_stopping_rounds = 50
+		if early_stopping_rounds is not None:
+			stopping_key = "early_stopping_rounds" if self.backend == "cb" else "early_stopping_round"
+			if "early_stopping_rounds" not in params and "early_stopping_round" not in params:
+				params[stopping_key] = early_stopping_rounds
+
 		if multioutput:
-			self.model = MultiOutputRegressor(self.model_function())
-			self.model.fit(train_x, train_y, verbose=verbose)
+			if multioutput_strategy == "auto":
+				multioutput_strategy = "native" if self.backend == "cb" else "per_horizon"
+			if multioutput_strategy == "native":
+				if self.backend != "cb":
+					raise ValueError("Native multioutput training is only supported by CatBoost")
+				params = _multi_target_params(params)
+				train_pool, val_pool = self.build_pools(train_x, train_y, val_x, val_y)
+				self.model = self._new_model(params)
+				self.model.fit(train_pool, eval_set=val_pool, verbose=verbose)
+			elif multioutput_strategy == "per_horizon":
+				self.model = self._train_per_horizon(train_x, train_y, val_x, val_y, params, verbose, n_jobs)
+			else:
+				raise ValueError(f"Unknown multioutput strategy: {multioutput_strategy}")
+		elif self.backend == "cb":
+			train_pool, val_pool = self.build_pools(train_x, train_y, val_x, val_y)
+			self.model = self._new_model(params)
+			self.model.fit(train_pool, eval_set=val_pool, verbose=verbose)
 		else:
-			self.model = self.model_function(**self.params)
+			self.model = self._new_model(params)
 			self.model.fit(train_x, train_y, eval_set=(val_x, val_y), verbose=verbose)
 
+	def _train_per_horizon(
+		self,
+		train_x: np.ndarray,
+		train_y: np.ndarray,
+		val_x: np.ndarray,
+		val_y: np.ndarray,
+		params: dict,
+		verbose: int,
+		n_jobs: int = None,
+		init_models: list = None,
+	) -> _HorizonModels:
+		"""
+		Fit one model per horizon column in parallel threads within a thread budget,
+		continuing from init_models if given.
+
+		The features are binned once for all horizons. CatBoost computes the borders on
+		the pools of the first horizon (cached by build_pools) and quantizes the pools of
+		the other horizons with them while fitting, without caching them. Warm starts fit
+		on the raw arrays, as the pools must be quantized with the borders of init_models.
+		LightGBM horizons train lightgbm.Boosters on label-swapped subsets of one binned
+		Dataset.
+		"""
+		thread_key = "thread_count" if self.backend == "cb" else "n_jobs"
+		train_y, val_y = np.asarray(train_y), np.asarray(val_y)
+		n_outputs = train_y.shape[1]
+		budget = n_jobs or params.get(thread_key) or os.cpu_count() or 1
+		if budget < 0:
+			budget = os.cpu_count() or 1
+		workers = max(1, min(n_outputs, budget))
+		params = {**params, thread_key: max(1, budget // workers)}
+
+		with tempfile.TemporaryDirectory() as tmp:
+			if self.backend == "cb" and init_models is not None:
+
+				def data(h):
+					return (train_x, train_y[:, h]), (val_x, val_y[:, h])
+
+			elif self.backend == "cb":
+				from catboost import Pool
+
+				borders = os.path.join(tmp, "borders.tsv")
+				pools = self.build_pools(train_x, train_y[:, 0], val_x, val_y[:, 0])
+				pools[0].save_quantization_borders(borders)
+
+				def data(h):
+					if h == 0:
+						return pools
+					# the other horizons only live while their model is fitted
+					horizon_pools = Pool(train_x, train_y[:, h]), Pool(val_x, val_y[:, h])
+					for pool in horizon_pools:
+						pool.quantize(input_borders=borders)
+					return horizon_pools
+
+			else:
+				import lightgbm
+
+				params = {k: v for k, v in params.items() if k not in ("silent", "importance_type", "class_weight")}
+				params.setdefault("objective", "regression")
+				if "verbose" not in params and "verbosity" not in params:
+					params["verbose"] = -1
+				train_set = lightgbm.Dataset(train_x, params=params, free_raw_data=False).construct()
+				val_set = lightgbm.Dataset(val_x, reference=train_set, free_raw_data=False).construct()
+				rows, val_rows = np.arange(len(train_y)), np.arange(len(val_y))
+
+				def data(h):
+					# subsets copy the binned features, only the label is new
+					horizon_train = train_set.subset(rows).construct()
+					horizon_train.set_label(train_y[:, h])
+					horizon_val = val_set.subset(val_rows).construct()
+					horizon_val.set_label(val_y[:, h])
+					return horizon_train, horizon_val
+
+			def fit(h):
+				with profile("Model.train.horizon", "Model", horizon=h):
+					train_data, val_data = data(h)
+					init_model = None if init_models is None else init_models[h]
+					if self.backend == "cb" and init_model is not None:
+						model = self._new_model(params)
+						model.fit(*train_data, eval_set=val_data, verbose=verbose, init_model=init_model)
+						return model
+					if self.backend == "cb":
+						model = self._new_model(params)
+						model.fit(train_data, eval_set=val_data, verbose=verbose)
+						return model
+					return lightgbm.train(
+						params,
+						train_data,
+						valid_sets=[val_data],
+						init_model=getattr(init_model, "booster_", init_model),
+						callbacks=[lightgbm.log_evaluation(verbose or 0)],
+					)
+
+			# the boosting libraries release the GIL, so threads train the models in parallel
+			with ThreadPoolExecutor(max_workers=workers) as executor:
+				return _HorizonModels(list(executor.map(fit, range(n_outputs))))
+
+	@profiled
+	def update(
+		self,
+		train_x: np.ndarray,
+		train_y: np.ndarray,
+		val_x: np.ndarray,
+		val_y: np.ndarray,
+		iterations: int = None,
+		verbose: int = 500,
+		n_jobs: int = None,
+	) -> None:
+		"""
+		Warm start: continue boosting the trained (or loaded) model on new data.
+
+		New trees are added on top of the existing ones (init_model), e.g. fitted on the
+		data of the last month, instead of retraining on the whole history. Per horizon
+		models are continued in parallel on their own columns.
+
+		Parameters
+		----------
+			train_x (np.ndarray):
+				 New training input data.
+
+			train_y (np.ndarray):
+				 New training target data, with the columns the model was trained on.
+
+			val_x (np.ndarray):
+				 Validation input data.
+
+			val_y (np.ndarray):
+				 Validation target data.
+
+			iterations (int, optional):
+				 Number of trees to add. Defaults to the number in params.
+
+			verbose (int, optional):
+				 Verbosity level during training. Defaults to 500.
+
+			n_jobs (int, optional):
+				 Thread budget shared by per horizon models. Defaults to None.
+
+		Returns
+		-------
+			None
+		"""
+		estimators = self.model.estimators_ if isinstance(self.model, _HorizonModels) else [self.model]
+		if any(isinstance(estimator, _ObliviousTreeEvaluator) for estimator in estimators):
+			raise ValueError("Models loaded with fast=True cannot be updated")
+
+		params = dict(self.params)
+		if iterations is not None:
+			params["iterations" if self.backend == "cb" else "n_estimators"] = iterations
+
+		multioutput = np.ndim(train_y) > 1 and np.shape(train_y)[1] > 1
+		if multioutput and "early_stopping_rounds" not in params and "early_stopping_round" not in params:
+			params["early_stopping_rounds" if self.backend == "cb" else "early_stopping_round"] = 50
+		if multioutput and self.backend == "cb":
+			params = _multi_target_params(params)
+
+		if isinstance(self.model, _HorizonModels):
+			self.model = self._train_per_horizon(
+				train_x, train_y, val_x, val_y, params, verbose, n_jobs, self.model.estimators_
+			)
+		else:
+			model = self._new_model(params)
+			model.fit(train_x, train_y, eval_set=(val_x, val_y), verbose=verbose, init_model=self.model)
+			self.model = model
+
+		# the cached evaluator of prepare_inference belongs to the previous trees
+		if hasattr(self, "_fast_predict"):
+			del self._fast_predict
+
+	def save(self, path: str, feature_names: list = None, pipeline=None) -> None:
+		"""
+		Save the model to a directory.
+
+		The booster is written in the backend's own format (CatBoost .cbm and the JSON
+		tree dump read by the fast load path, LightGBM model text), one file per horizon
+		for per horizon models. model.json holds the backend, params, prediction type,
+		feature names, the indices selected by feat_select and the feature pipeline.
+
+		Parameters
+		----------
+			path (str):
+				 Output directory.
+
+			feature_names (list, optional):
+				 Feature names from create_dataset, stored as self.feature_names. Defaults to None.
+
+			pipeline (FeaturePipeline, optional):
+				 Fitted feature pipeline of the data, stored as self.pipeline. Defaults to None.
+
+		Returns
+		-------
+			None
+		"""
+		if feature_names is not None:
+			self.feature_names = list(feature_names)
+		if pipeline is not None:
+			self.pipeline = pipeline
+		estimators = self.model.estimators_ if isinstance(self.model, _HorizonModels) else [self.model]
+		if any(isinstance(estimator, _ObliviousTreeEvaluator) for estimator in estimators):
+			raise ValueError("Models loaded with fast=True cannot be saved")
+
+		os.makedirs(path, exist_ok=True)
+		files = []
+		for h, estimator in enumerate(estimators):
+			name = f"booster_{h}" if isinstance(self.model, _HorizonModels) else "booster"
+			if self.backend == "cb":
+				estimator.save_model(os.path.join(path, name + ".cbm"))
+				estimator.save_model(os.path.join(path, name + ".json"), format="json")
+			else:
+				booster = getattr(estimator, "booster_", estimator)
+				booster.save_model(os.path.join(path, name + ".txt"))
+			files.append(name)
+
+		state = {
+			"backend": self.backend,
+			"params": self.params,
+			"prediction_type": self.prediction_type,
+			"per_horizon": isinstance(self.model, _HorizonModels),
+			"files": files,
+			"feature_names": self.feature_names,
+			"selected_features": self.selected_features,
+			"pipeline": None if self.pipeline is None else self.pipeline.to_dict(),
+		}
+		with open(os.path.join(path, "model.json"), "w") as f:
+			json.dump(state, f, indent=2, default=str)
+
+	@classmethod
+	def load(cls, path: str, fast: bool = False) -> "Model":
+		"""
+		Load a model saved with save.
+
+		Parameters
+		----------
+			path (str):
+				 Directory written by save.
+
+			fast (bool, optional):
+				 Fast path for inference workers: CatBoost trees are loaded into the NumPy
+				 evaluator of predict_fast without importing CatBoost and prepare_inference
+				 is run. The model can predict but not be updated or saved. LightGBM models
+				 are always loaded as a lightgbm.Booster. Defaults to False.
+
+		Returns
+		-------
+			Model: The loaded model, with prediction_type, feature_names, selected_features and pipeline restored.
+		"""
+		with open(os.path.join(path, "model.json")) as f:
+			state = json.load(f)
+
+		model = cls(state["backend"], state["params"], state["prediction_type"])
+		model.feature_names = state["feature_names"]
+		model.selected_features = state["selected_features"]
+		if state["pipeline"] is not None:
+			from .pipeline import FeaturePipeline
+
+			model.pipeline = FeaturePipeline.from_dict(state["pipeline"])
+
+		estimators = []
+		for name in state["files"]:
+			file = os.path.join(path, name)
+			if model.backend == "cb" and fast:
+				with open(file + ".json") as f:
+					estimators.append(_ObliviousTreeEvaluator(json.load(f)))
+			elif model.backend == "cb":
+				estimators.append(model.model_function().load_model(file + ".cbm"))
+			else:
+				import lightgbm
+
+				estimators.append(lightgbm.Booster(model_file=file + ".txt"))
+		model.model = _HorizonModels(estimators) if state["per_horizon"] else estimators[0]
+		if fast:
+			model.prepare_inference()
+		return model
+
+	@profiled
 	def predict(self, X: pd.DataFrame, horizon: int = 1) -> np.ndarray:
 		"""
 		Make predictions using the trained model depending on prediction type.
@@ -114,19 +712,309 @@ class Model:
 			forecast = self.model.predict(X)
 			return forecast
 		elif self.prediction_type == "recursive":
-			forecast = []
-			recursive_x = X.copy()
-
-			for _ in range(horizon):
-				pred = self.model.predict(recursive_x)
-				recursive_x[:, :-1] = recursive_x[:, 1:]
-				recursive_x[:, -1] = pred
-
-			forecast = np.array(pred)
+			forecast = self.predict_trajectory(X, horizon)[:, -1]
 			return forecast
 		else:
 			print("Prediction type not recognized")
 
+	@profiled
+	def predict_trajectory(
+		self,
+		X: np.ndarray,
+		horizon: int = 1,
+		future_exog: np.ndarray = None,
+		chunk_size: int = None,
+	) -> np.ndarray:
+		"""
+		Recursively predict every step up to the horizon in a single pass.
+
+		The lags and the predictions are kept in one (n_samples, window + horizon) buffer
+		and step k reads the window starting at column k, so no columns are shifted
+		between steps. For multivariate data the lags must be the first columns of X
+		(as in create_dataset) and the exogenous columns of the following steps are
+		taken from future_exog.
+
+		Parameters
+		----------
+			X (np.ndarray): 
+				Input data for prediction, lags followed by exogenous features.
+			horizon (int, optional): 
+				Number of steps to predict into the future. Defaults to 1.
+			future_exog (np.ndarray, optional): 
+				Known exogenous features of shape (n_samples, horizon - 1, n_exog), where
+				future_exog[:, k - 1] is used for step k. None for univariate data. Defaults to None.
+			chunk_size (int, optional): 
+				Number of samples predicted at once to bound the memory. Defaults to all samples.
+
+		Returns
+		-------
+			np.ndarray: 
+				Predicted trajectory of shape (n_samples, horizon).
+		"""
+		X = np.asarray(X)
+		n_exog = 0 if future_exog is None else future_exog.shape[2]
+		window = X.shape[1] - n_exog
+		if n_exog and future_exog.shape[1] < horizon - 1:
+			raise ValueError("future_exog must cover horizon - 1 steps")
+
+		chunk_size = chunk_size or max(len(X), 1)
+		trajectory = np.empty((len(X), horizon))
+		for start in range(0, len(X), chunk_size):
+			stop = min(start + chunk_size, len(X))
+			buffer = np.empty((stop - start, window + horizon))
+			buffer[:, :window] = X[start:stop, :window]
+			if n_exog:
+				inputs = np.array(X[start:stop], dtype=np.float64)
+
+			for k in range(horizon):
+				if n_exog:
+					if k:
+						inputs[:, :window] = buffer[:, k : k + window]
+						inputs[:, window:] = future_exog[start:stop, k - 1]
+					pred = self.model.predict(inputs)
+				else:
+					pred = self.model.predict(buffer[:, k : k + window])
+				buffer[:, window + k] = np.reshape(pred, -1)
+
+			trajectory[start:stop] = buffer[:, window:]
+		return trajectory
+
+	@profiled
+	def prepare_inference(self, max_batch: int = 64) -> None:
+		"""
+		Prepare the trained model for low-latency predictions with predict_fast.
+
+		The feature count is locked, a float32 contiguous input buffer is allocated
+		once and a cached evaluator is built: a compiled NumPy evaluator for CatBoost
+		models, the single-threaded booster for LightGBM models, one of them per horizon
+		for per horizon multioutput models.
+
+		Parameters
+		----------
+			max_batch (int, optional): 
+				Number of rows the reusable input buffer holds, it grows if a larger
+				batch is passed. Defaults to 64.
+
+		Returns
+		-------
+			None
+		"""
+		if isinstance(self.model, _HorizonModels):
+			predictors = [_fast_predictor(estimator) for estimator in self.model.estimators_]
+			self.n_features = predictors[0][0]
+			self._fast_predict = lambda X: np.column_stack([predict(X) for _, predict in predictors])
+		else:
+			self.n_features, self._fast_predict = _fast_predictor(self.model)
+		self._buffer = np.empty((max_batch, self.n_features or 0), dtype=np.float32)
+
+	def predict_fast(self, X: np.ndarray) -> np.ndarray:
+		"""
+		One-shot prediction through the cached evaluator of prepare_inference.
+
+		Parameters
+		----------
+			X (np.ndarray): 
+				A single row (1D) or a small batch (2D) with the features in training order.
+
+		Returns
+		-------
+			np.ndarray: 
+				Predicted values, one per row.
+		"""
+		X = np.asarray(X)
+		if X.ndim == 1:
+			X = X[np.newaxis, :]
+		if self.n_features is not None and X.shape[1] != self.n_features:
+			raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+		if len(X) > len(self._buffer):
+			self._buffer = np.empty((len(X), X.shape[1]), dtype=np.float32)
+		buffer = self._buffer[: len(X)]
+		buffer[:] = X
+		return self._fast_predict(buffer)
+
+	def benchmark_inference(
+		self, X: np.ndarray, batch_size: int = 1, n_calls: int = 1000
+	) -> pd.DataFrame:
+		"""
+		Measure the per-call latency of predict and predict_fast.
+
+		Parameters
+		----------
+			X (np.ndarray): 
+				Input rows, the first batch_size rows are predicted in every call.
+			batch_size (int, optional): 
+				Number of rows per call. Defaults to 1.
+			n_calls (int, optional): 
+				Number of timed calls per method. Defaults to 1000.
+
+		Returns
+		-------
+			pd.DataFrame: 
+				Mean, median and 99th percentile latency in microseconds per method, and the
+				maximum absolute difference of their predictions.
+		"""
+		if not hasattr(self, "_fast_predict"):
+			self.prepare_inference(max(batch_size, 64))
+
+		batch = np.ascontiguousarray(X[:batch_size])
+		methods = {
+			"predict": lambda: self.model.predict(batch),
+			"predict_fast": lambda: self.predict_fast(batch),
+		}
+		rows = []
+		for name, method in methods.items():
+			method()
+			latencies = np.empty(n_calls)
+			for i in range(n_calls):
+				start = time.perf_counter()
+				method()
+				latencies[i] = time.perf_counter() - start
+			latencies *= 1e6
+			rows.append([latencies.mean(), np.median(latencies), np.percentile(latencies, 99)])
+
+		latency = pd.DataFrame(rows, index=list(methods), columns=["mean_us", "p50_us", "p99_us"])
+		diff = np.reshape(self.predict_fast(batch), -1) - np.reshape(self.model.predict(batch), -1)
+		latency["max_abs_diff"] = [0.0, np.abs(diff).max()]
+		return latency
+
+	@profiled
+	def train_batches(
+		self,
+		train_batches,
+		val_batches,
+		y_index: int = -1,
+		verbose: int = 500,
+		n_batches: int = None,
+		n_val_batches: int = 1,
+	) -> None:
+		"""
+		Train the model on a stream of mini-batches, e.g. from Dataset.stream_dataset.
+
+		Every batch continues boosting from the model fitted on the previous batches
+		(init_model), so only a single batch is held in memory. The number of trees in
+		params (iterations / n_estimators, or the library default) is the budget of the
+		whole stream and is split evenly across the batches, so the final model has as
+		many trees as a model trained once on all data.
+
+		Parameters
+		----------
+			train_batches (iterable):
+				 Iterable of (X_batch, y_batch) training tuples.
+
+			val_batches (iterable):
+				 Iterable of (X_batch, y_batch) validation tuples.
+
+			y_index (int, optional):
+				 Column of y_batch to train on, None to keep all columns. The default -1 trains
+				 a single output model on the last horizon. Defaults to -1.
+
+			verbose (int, optional):
+				 Verbosity level during training. Defaults to 500.
+
+			n_batches (int, optional):
+				 Number of training batches the tree budget is split over. Defaults to
+				 train_batches.n_batches or len(train_batches), it is required for streams
+				 without a length such as generators.
+
+			n_val_batches (int, optional):
+				 Number of leading validation batches concatenated into the evaluation set
+				 used for early stopping, None for all of them. Defaults to 1.
+
+		Returns
+		-------
+			None
+		"""
+		if n_batches is None:
+			n_batches = getattr(train_batches, "n_batches", None)
+		if n_batches is None:
+			if not hasattr(train_batches, "__len__"):
+				raise ValueError("n_batches is required for training streams without a length")
+			n_batches = len(train_batches)
+		n_batches = max(n_batches, 1)
+
+		val_x, val_y = [], []
+		for i, (batch_x, batch_y) in enumerate(val_batches):
+			if n_val_batches is not None and i >= n_val_batches:
+				break
+			val_x.append(batch_x)
+			val_y.append(batch_y if y_index is None else batch_y[:, y_index])
+		val_x, val_y = np.concatenate(val_x), np.concatenate(val_y)
+
+		tree_key = next(
+			(k for k in _ITERATION_KEYS[self.backend] if k in self.params), _ITERATION_KEYS[self.backend][0]
+		)
+		budget = self.params.get(tree_key, _DEFAULT_ITERATIONS[self.backend])
+
+		self.model = None
+		for i, (batch_x, batch_y) in enumerate(train_batches):
+			if y_index is not None:
+				batch_y = batch_y[:, y_index]
+			# even split of the budget, the first batches take the remainder
+			trees = budget // n_batches + (i < budget % n_batches)
+			if trees < 1:
+				break
+			model = self._new_model({**self.params, tree_key: trees})
+			model.fit(
+				batch_x,
+				batch_y,
+				eval_set=(val_x, val_y),
+				verbose=verbose,
+				init_model=self.model,
+			)
+			self.model = model
+
+	@profiled
+	def predict_batches(self, batches, horizon: int = 1) -> np.ndarray:
+		"""
+		Make predictions for a stream of (X_batch, y_batch) tuples.
+
+		Parameters
+		----------
+			batches (iterable): 
+				Iterable of (X_batch, y_batch) tuples, y_batch is ignored.
+			horizon (int, optional): 
+				Number of steps to predict into the future. Defaults to 1.
+
+		Returns
+		-------
+			np.ndarray: 
+				Predicted values of all batches.
+		"""
+		return np.concatenate([self.predict(batch_x, horizon) for batch_x, _ in batches])
+
+	@profiled
+	def score_batches(self, batches, horizon: int = 1, y_index: int = -1, per_horizon: bool = False):
+		"""
+		Calculate MAE, RMSE and R2 over a stream of (X_batch, y_batch) tuples in a single pass.
+
+		Parameters
+		----------
+			batches (iterable): 
+				Iterable of (X_batch, y_batch) tuples.
+			horizon (int, optional): 
+				Number of steps to predict into the future. Defaults to 1.
+			y_index (int, optional):
+				 Column of y_batch to score against, None to keep all columns. Defaults to -1.
+			per_horizon (bool, optional):
+				 Return the MetricAccumulator with the metrics of every scored column instead. Defaults to False.
+
+		Returns
+		-------
+			tuple: 
+				MAE, RMSE and R2 over all batches, or the MetricAccumulator if per_horizon is set.
+		"""
+		accumulator = MetricAccumulator()
+		for batch_x, batch_y in batches:
+			if y_index is not None:
+				batch_y = batch_y[:, y_index]
+			accumulator.update(batch_y, self.predict(batch_x, horizon))
+
+		if per_horizon:
+			return accumulator
+		scores = accumulator.summary()
+		return scores["MAE"], scores["RMSE"], scores["R2"]
+
+	@profiled
 	def model_summarizer(
 		self,
 		val_x: pd.DataFrame,
@@ -139,6 +1027,11 @@ class Model:
 		feat_steps: int = 15,
 		feat_names: list = None,
 		horizon: int = 1,
+		output_dir: str = None,
+		max_points: int = 2000,
+		downsample_method: str = "lttb",
+		concurrent: bool = True,
+		y_index: int = -1,
 	) -> tuple:
 		"""
 		Generate a summary of the model's performance.
@@ -161,7 +1054,7 @@ class Model:
 				 Flag indicating if plots should be generated. Defaults to True.
 
 			plot_steps (int, optional):
-				 Number of steps to include in the plots. Defaults to 2000.
+				 Number of steps to include in the plots, None for the whole series. Defaults to 2000.
 
 			feat_importance (bool, optional):
 				 Flag indicating if feature importance should be calculated and plotted. Defaults to True.
@@ -175,59 +1068,87 @@ class Model:
 			horizon (int, optional):
 				 Number of steps to predict into the future. Defaults to 1.
 
+			output_dir (str, optional):
+				 Headless mode: write scores.csv, predictions.png and feature_importance.png
+				 to this directory instead of showing the figures. Defaults to None.
+
+			max_points (int, optional):
+				 Number of points each plotted series is downsampled to. Defaults to 2000.
+
+			downsample_method (str, optional):
+				 Shape preserving downsampling of the plotted series ("lttb", "minmax" or None). Defaults to "lttb".
+
+			concurrent (bool, optional):
+				 Predict the validation and test data in parallel threads. Defaults to True.
+
+			y_index (int, optional):
+				 Column of multi-horizon targets that single column predictions (recursive
+				 prediction or a single horizon model) are scored against. Defaults to -1.
+
 		Returns
 		-------
 			tuple: 
 				Tuple containing scores (MAE, RMSE, R2) and feature importances (if enabled).
+				The metrics of several horizon columns are averaged.
 		"""
-		val_pred, test_pred = self.predict(val_x, horizon), self.predict(
-			test_x, horizon
-		)
+		if concurrent:
+			with ThreadPoolExecutor(max_workers=2) as executor:
+				val_future = executor.submit(self.predict, val_x, horizon)
+				test_future = executor.submit(self.predict, test_x, horizon)
+				val_pred, test_pred = val_future.result(), test_future.result()
+		else:
+			val_pred, test_pred = self.predict(val_x, horizon), self.predict(test_x, horizon)
 
-		val_pred, test_pred = val_pred.reshape(-1), test_pred.reshape(-1)
+		val_y, val_pred = align_predictions(val_y, val_pred, y_index)
+		test_y, test_pred = align_predictions(test_y, test_pred, y_index)
 
-		val_mae, val_rmse, val_r2 = score_function(val_y, val_pred)
-		test_mae, test_rmse, test_r2 = score_function(test_y, test_pred)
+		# the metrics of the horizon columns are averaged, as in utils.score_function
+		val_scores = MetricAccumulator().update(val_y, val_pred).summary()
+		test_scores = MetricAccumulator().update(test_y, test_pred).summary()
 
-		scores = pd.DataFrame(
-			np.array([[val_mae, val_rmse, val_r2], [test_mae, test_rmse, test_r2]])
-		)
-		scores.columns = ["MAE", "RMSE", "R2"]
+		scores = pd.DataFrame([val_scores, test_scores])[["MAE", "RMSE", "R2"]]
 		scores.index = ["Validation", "Test"]
 		print(scores)
 
+		if output_dir is not None:
+			os.makedirs(output_dir, exist_ok=True)
+			scores.to_csv(os.path.join(output_dir, "scores.csv"))
+
+		def new_figure(**kwargs):
+			# headless figures are drawn without pyplot, so no GUI backend is needed
+			if output_dir is not None:
+				from matplotlib.figure import Figure
+
+				return Figure(**kwargs)
+			import matplotlib.pyplot as plt
+
+			return plt.figure(**kwargs)
+
+		def finish(fig, name):
+			fig.tight_layout()
+			if output_dir is not None:
+				fig.savefig(os.path.join(output_dir, name))
+			else:
+				import matplotlib.pyplot as plt
+
+				plt.show()
+
 		if plots:
-			_, axs = plt.subplots(2, 1, figsize=(10, 8))
-
-			# Plot the validation predictions
-			axs[0].plot(
-				range(plot_steps),
-				val_pred[:plot_steps],
-				label="Predictions",
-				color="red",
-			)
-			axs[0].plot(
-				range(plot_steps), val_y[:plot_steps], label="True", color="black"
-			)
-			axs[0].set_title("Validation Predictions")
-			axs[0].legend()
-
-			# Plot the test predictions
-			axs[1].plot(
-				range(plot_steps),
-				test_pred[:plot_steps],
-				label="Predictions",
-				color="red",
-			)
-			axs[1].plot(
-				range(plot_steps), test_y[:plot_steps], label="True", color="black"
-			)
-			axs[1].set_title("Test Predictions")
-			axs[1].legend()
+			fig = new_figure(figsize=(10, 8))
+			axs = fig.subplots(2, 1)
+			for ax, true, pred, title in (
+				(axs[0], val_y, val_pred, "Validation Predictions"),
+				(axs[1], test_y, test_pred, "Test Predictions"),
+			):
+				# multi horizon labels are plotted at their last horizon
+				true = np.asarray(true).reshape(len(true), -1)[:plot_steps, -1]
+				pred = np.asarray(pred).reshape(len(pred), -1)[:plot_steps, -1]
+				ax.plot(*downsample(pred, max_points, downsample_method), label="Predictions", color="red")
+				ax.plot(*downsample(true, max_points, downsample_method), label="True", color="black")
+				ax.set_title(title)
+				ax.legend()
+			finish(fig, "predictions.png")
 
-			# Adjust the layout and display the plot
-			plt.tight_layout()
-			plt.show()
 		importances = None
 		if feat_importance:
 			# Get feature importances
@@ -235,30 +1156,33 @@ class Model:
 				importances = self.model.feature_importances_
 			elif hasattr(self.model, "get_feature_importance"):
 				importances = self.model.get_feature_importance()
+			elif hasattr(self.model, "feature_importance"):
+				importances = self.model.feature_importance()
 			else:
 				print("Model does not have feature importance attribute")
 			
 			if importances is not None:
 				# Sort indices from most to least important and get corresponding names
 				indices = np.argsort(importances)[::-1]
+				if feat_names is None:
+					feat_names = [str(i) for i in range(len(importances))]
 				names = [feat_names[i] for i in indices]
+				feat_steps = min(feat_steps, len(importances))
 
-				# Create plot
-				plt.figure(figsize=(10, 8))
-
-				# Create plot title
-				plt.title("Feature Importance")
+				# Create plot with title
+				fig = new_figure(figsize=(10, 8))
+				ax = fig.subplots()
+				ax.set_title("Feature Importance")
 
-				# Add bars
-				plt.bar(range(feat_steps), importances[indices][:feat_steps])
+				# Add bars and feature names as x-axis labels
+				ax.bar(range(feat_steps), importances[indices][:feat_steps])
+				ax.set_xticks(range(feat_steps))
+				ax.set_xticklabels(names[:feat_steps], rotation=90)
 
-				# Add feature names as x-axis labels
-				plt.xticks(range(feat_steps), names[:feat_steps], rotation=90)
-
-				# Show plot
-				plt.show()
+				finish(fig, "feature_importance.png")
 		return scores, importances
 	
+	@profiled
 	def hyp_op(
 			self,
 			val_x: pd.DataFrame,
@@ -267,7 +1191,12 @@ class Model:
 			train_y: pd.DataFrame,
 			horizon: int = 1,
 			trial = 30,
-			task_type = 'GPU'
+			task_type = 'CPU',
+			n_jobs: int = 1,
+			threads_per_trial: int = None,
+			prune: bool = True,
+			storage: str = None,
+			study_name: str = "hyp_op",
 		) -> tuple:
 		"""
 			Perform hyperparameter optimization for a machine learning model using Optuna.
@@ -279,49 +1208,103 @@ class Model:
 				train_y (pd.DataFrame): Training dataset labels.
 				horizon (int, optional): Prediction horizon for the model. Default is 1.
 				trial (int, optional): Number of optimization trials. Default is 30.
-				task_type (str, optional): Task type for CatBoost ('CPU' or 'GPU'). Default is 'GPU'.
+				task_type (str, optional): Task type for CatBoost ('CPU' or 'GPU'). Default is 'CPU'.
+				n_jobs (int, optional): Number of trials run in parallel. Default is 1.
+				threads_per_trial (int, optional): CatBoost thread_count of each trial. Default splits the cores evenly over n_jobs.
+				prune (bool, optional): Stop unpromising trials early based on the intermediate validation MAE (CPU only). Default is True.
+				storage (str, optional): Optuna storage URL, e.g. 'sqlite:///hyp_op.db', to persist and resume the study. Default is None (in memory).
+				study_name (str, optional): Name of the study in the storage. Default is 'hyp_op'.
 
 			Returns:
-				tuple: A tuple containing the best hyperparameters (dict) and the corresponding best RMSE (float).
+				tuple: A tuple containing the best hyperparameters (dict) and the corresponding best MAE (float).
 
 			This function uses Optuna to perform hyperparameter optimization for a CatBoost machine learning model.
 			It searches for the best hyperparameters within the specified parameter ranges and training settings.
 
-			The optimization objective is to minimize the Root Mean Squared Error (RMSE) on the validation dataset.
-			The best hyperparameters and their corresponding RMSE are returned as a tuple.
+			The optimization objective is to minimize the Mean Absolute Error (MAE) on the validation dataset,
+			the trials are trained with MAE as eval_metric so the pruner compares the same metric.
+			The best hyperparameters and their corresponding MAE are returned as a tuple.
+			A ValueError is raised if no trial completes, e.g. when every trial is pruned.
+			When a storage is given, completed trials of an interrupted search are loaded and only the remaining ones are run.
+			The model of the best trial is kept as the trained model.
 
 			Example:
-				best_params, best_rmse = hyp_op(val_x, val_y, train_x, train_y, horizon=2, trial=50, task_type='GPU')
+				best_params, best_mae = hyp_op(val_x, val_y, train_x, train_y, horizon=2, trial=50, n_jobs=4, storage='sqlite:///hyp_op.db')
 				print("Best Hyperparameters:", best_params)
-				print("Best RMSE:", best_rmse)
+				print("Best MAE:", best_mae)
 		"""
+		import optuna
 
-		def objective(trial):
-			params = {
+		if threads_per_trial is None:
+			threads_per_trial = max(1, (os.cpu_count() or 1) // n_jobs)
+		prune = prune and task_type == 'CPU' # CatBoost callbacks are not supported on GPU
+
+		def trial_params(trial):
+			return {
 				"iterations": 1000,
 				"learning_rate": trial.suggest_float("learning_rate", 1e-3, 0.1, log=True),
 				"depth": trial.suggest_int("depth", 1, 10),
 				# "colsample_bylevel": trial.suggest_float("colsample_bylevel", 0.05, 1.0), # requires task type CPU
 				"min_data_in_leaf": trial.suggest_int("min_data_in_leaf", 1, 100),
+				"eval_metric": "MAE",
 				'task_type': task_type,
-				'thread_count':-1
+				'thread_count': threads_per_trial
 			}
 
-			self.model = self.model_function(**params)
-			self.model.fit(train_x, train_y,eval_set=(val_x, val_y), silent=True)
+		train_pool, val_pool = self.build_pools(train_x, train_y, val_x, val_y)
+		best = {"value": np.inf, "model": None, "number": None}
+		lock = threading.Lock()
 
-			val_pred = self.predict(val_x, horizon)
-			rmse = mean_absolute_error(val_y, val_pred.reshape(-1))
+		def objective(trial):
+			with profile("Model.hyp_op.trial", "Model", trial=trial.number):
+				model = self._new_model(trial_params(trial))
+				callback = _PruningCallback(trial) if prune else None
+				model.fit(
+					train_pool, eval_set=val_pool, silent=True,
+					callbacks=[callback] if callback else None
+				)
+				if callback and callback.pruned:
+					raise optuna.TrialPruned()
 
-			return rmse
-		study = optuna.create_study(direction='minimize')
-		study.optimize(objective, n_trials=30)
+				candidate = copy.copy(self)
+				candidate.model = model
+				val_pred = candidate.predict(val_x, horizon)
+				mae = score_function(*align_predictions(val_y, val_pred))[0]
+
+			with lock:
+				if mae < best["value"]:
+					best.update(value=mae, model=model, number=trial.number)
+			return mae
+
+		pruner = optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=100) if prune else None
+		study = optuna.create_study(
+			direction='minimize', pruner=pruner, storage=storage,
+			study_name=study_name if storage else None, load_if_exists=storage is not None
+		)
+		finished = [
+			t for t in study.trials
+			if t.state in (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+		]
+		study.optimize(objective, n_trials=max(trial - len(finished), 0), n_jobs=n_jobs)
+
+		if not any(t.state == optuna.trial.TrialState.COMPLETE for t in study.trials):
+			raise ValueError(
+				f"None of the {len(study.trials)} trials of the study completed (all pruned or failed), "
+				"run more trials or set prune=False"
+			)
+		if best["number"] == study.best_trial.number:
+			self.model = best["model"]
+		else:
+			# best trial comes from a resumed session, refit it once
+			self.model = self._new_model(trial_params(optuna.trial.FixedTrial(study.best_params)))
+			self.model.fit(train_pool, eval_set=val_pool, silent=True)
 
 		print('Best hyperparameters:', study.best_params)
-		print('Best RMSE:', study.best_value)
+		print('Best MAE:', study.best_value)
 		return study.best_params, study.best_value
 
 
+	@profiled
 	def feat_select(self,
       val_x: pd.DataFrame,
       val_y: pd.DataFrame,
@@ -353,11 +1336,15 @@ class Model:
 			summary = feat_select(val_x, val_y, train_x, train_y, num_feats=15, num_steps=4, plot=True)
 			print(summary)
     	"""
-		self.model = self.model_function(**self.params)
+		from catboost import EFeaturesSelectionAlgorithm, EShapCalcType
+
+		train_pool, val_pool = self.build_pools(train_x, train_y, val_x, val_y)
+		# select_features creates its per step directories even without writing files
+		params = self.params if "train_dir" in self.params else {**self.params, "train_dir": tempfile.mkdtemp()}
+		self.model = self._new_model(params)
 		summary = self.model.select_features(
-				X= train_x,
-				y= train_y,
-				eval_set=(val_x, val_y),
+				X= train_pool,
+				eval_set=val_pool,
 				features_for_select=list(range(train_x.shape[1])),
 				num_features_to_select=num_feats,
 				steps=num_steps,
@@ -367,5 +1354,8 @@ class Model:
 				logging_level='Silent',
 				plot=plot
 				)
+		self.selected_features = [int(i) for i in summary["selected_features"]]
+		if params is not self.params:
+			shutil.rmtree(params["train_dir"], ignore_errors=True)
 
 		return summary
\ No newline at end of file
@@ -0,0 +1,283 @@
+import math
+import operator
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .pipeline import FeaturePipeline
+
+
+class _RingBuffer:
+    def __init__(self, size: int):
+        """
+        Fixed size buffer of the last values of a series, empty slots are NaN.
+        """
+        self.values = np.full(size, np.nan)
+        self.pos = 0
+
+    def push(self, x: float) -> float:
+        old = self.values[self.pos]
+        self.values[self.pos] = x
+        self.pos = (self.pos + 1) % len(self.values)
+        return old
+
+    def last(self, i: int) -> float:
+        """
+        Value pushed i steps ago, 0 being the latest.
+        """
+        return self.values[(self.pos - 1 - i) % len(self.values)]
+
+    def ordered(self, out: np.ndarray):
+        """
+        Write the buffer from oldest to latest into out.
+        """
+        n = len(self.values) - self.pos
+        out[:n] = self.values[self.pos :]
+        out[n:] = self.values[: self.pos]
+
+
+class _RollingState:
+    def __init__(self, window: int):
+        """
+        Windowed aggregates of one series updated in O(1) per push: sum, mean, std and
+        var from a running sum and Welford's mean and sum of squared deviations, min and
+        max from monotonic deques. Median and quantiles are not maintained incrementally,
+        they sort the window buffer and cost O(window) per value.
+        """
+        self.buffer = _RingBuffer(window)
+        self.window = window
+        self.nans = window
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.t = 0
+        # (position, value) pairs with increasing values for min, decreasing for max
+        self.min_deque = deque()
+        self.max_deque = deque()
+
+    def push(self, x: float):
+        old = self.buffer.push(x)
+        if math.isnan(old):
+            self.nans -= 1
+        else:
+            self.sum -= old
+            n = self.window - self.nans - 1
+            if n:
+                delta = old - self.mean
+                self.mean -= delta / n
+                self.m2 -= delta * (old - self.mean)
+            else:
+                self.mean = self.m2 = 0.0
+        if math.isnan(x):
+            self.nans += 1
+        else:
+            self.sum += x
+            n = self.window - self.nans
+            delta = x - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (x - self.mean)
+
+        expired = self.t - self.window
+        for queue, keep in ((self.min_deque, operator.lt), (self.max_deque, operator.gt)):
+            if queue and queue[0][0] <= expired:
+                queue.popleft()
+            if not math.isnan(x):
+                while queue and not keep(queue[-1][1], x):
+                    queue.pop()
+                queue.append((self.t, x))
+        self.t += 1
+
+        if self.buffer.pos == 0 and not self.nans:
+            # recompute once per window to stop the running sums from drifting
+            values = self.buffer.values
+            self.sum = float(values.sum())
+            self.mean = self.sum / self.window
+            self.m2 = float(((values - self.mean) ** 2).sum())
+
+    def value(self, aggregation: str) -> float:
+        if self.nans:
+            return np.nan
+        if aggregation == "sum":
+            return self.sum
+        if aggregation == "mean":
+            return self.sum / self.window
+        if aggregation in ("std", "var"):
+            # population statistics (ddof=0) like the offline rolling std and var, a
+            # constant window has no variance whatever cancellation is left in m2
+            constant = self.min_deque[0][1] == self.max_deque[0][1]
+            var = 0.0 if constant else max(self.m2, 0.0) / self.window
+            return math.sqrt(var) if aggregation == "std" else var
+        if aggregation == "min":
+            return self.min_deque[0][1]
+        if aggregation == "max":
+            return self.max_deque[0][1]
+        values = self.buffer.values
+        if aggregation == "median":
+            return float(np.median(values))
+        return float(np.quantile(values, float(aggregation[len("quantile_") :])))
+
+
+class OnlineFeatureState:
+    def __init__(
+        self,
+        pipeline: FeaturePipeline,
+        columns: list,
+        window_size: int,
+        target_col: str = "active_power_total",
+        univariate: bool = False,
+    ):
+        """
+        Incremental feature state for one turbine fed one record at a time.
+
+        Keeps the last observed value of every fill_nan field, ring buffers for the
+        add_last_t lags and the target window, and running rolling aggregates, so that
+        update costs O(1) in the length of the history. The emitted vector is the X row
+        that create_dataset would build for the window ending at the record, given the
+        output of the same fitted pipeline on the full history.
+
+        Parameters
+        ----------
+            pipeline (FeaturePipeline):
+                Fitted feature pipeline the model was trained with.
+
+            columns (list):
+                Raw input columns in the order of the training DataFrame.
+
+            window_size (int):
+                Size of the input window used in create_dataset.
+
+            target_col (str, optional):
+                Name of the target column. Defaults to "active_power_total".
+
+            univariate (bool, optional):
+                Flag indicating if the data is univariate. Defaults to False.
+        """
+        if not pipeline.fitted:
+            raise ValueError("OnlineFeatureState requires a fitted FeaturePipeline")
+
+        self.pipeline = pipeline
+        self.window_size = window_size
+        self.target_col = target_col
+        self.univariate = univariate
+
+        self.fill_values = {}
+        dropped = set()
+        for step in pipeline.steps:
+            if step["op"] == "fill_nan":
+                self.fill_values.update(step["means"])
+            elif step["op"] == "drop_nan":
+                dropped.update(step["fields"])
+
+        self.last_values = {}
+        self.rolling = {}
+        self.lags = {}
+        derived = []
+        for step in pipeline.steps:
+            if step["op"] == "add_seasonal_feat":
+                derived.extend(["hour_sin", "hour_cos", "week_sin", "week_cos"])
+            elif step["op"] == "add_rolling_features":
+                for w in step["windows"]:
+                    for c in step["columns"]:
+                        self.rolling.setdefault((c, w), _RollingState(w))
+                    for a in step["aggregations"]:
+                        derived.extend(f"rolling_{a}_{c}_{w}" for c in step["columns"])
+            elif step["op"] == "add_last_t":
+                self.lags[step["data"]] = max(step["step"], self.lags.get(step["data"], 0))
+                derived.extend(f"{step['data']}_last_{i}_step" for i in range(1, step["step"] + 1))
+        self.lags = {data: _RingBuffer(size) for data, size in self.lags.items()}
+
+        self.names = [c for c in columns if c not in dropped]
+        self.names.extend(n for n in derived if n not in dropped)
+        self.exog_names = [] if univariate else [n for n in self.names if n != target_col]
+
+        self.target = _RingBuffer(window_size)
+        self.n_seen = 0
+        self.feature_vector = np.empty(window_size + len(self.exog_names))
+
+    def update(self, record, timestamp=None) -> np.ndarray:
+        """
+        Add one new record and return the feature vector ending at it.
+
+        Parameters
+        ----------
+            record (dict or pd.Series):
+                Raw values of the record keyed by column name.
+
+            timestamp (pd.Timestamp, optional):
+                Time of the record, defaults to record.name for a pd.Series.
+
+        Returns
+        -------
+            np.ndarray: Feature vector in create_dataset order (lags followed by exogenous
+            features), or None while fewer than window_size records have been seen. The
+            array is reused between calls, copy it to keep it.
+        """
+        if timestamp is None and isinstance(record, pd.Series):
+            timestamp = record.name
+
+        values = {}
+        for name in self.names:
+            if name in record:
+                values[name] = float(record[name])
+        for field, mean in self.fill_values.items():
+            x = float(record[field])
+            if math.isnan(x):
+                x = self.last_values.get(field, mean)
+            else:
+                self.last_values[field] = x
+            values[field] = x
+
+        pushed = set()
+        for step in self.pipeline.steps:
+            if step["op"] == "add_seasonal_feat":
+                ts = pd.Timestamp(timestamp if step["time_col"] is None else record[step["time_col"]])
+                hour = ts.hour / 23 * 2 * np.pi
+                week = ts.isocalendar()[1] / 52 * 2 * np.pi
+                values["hour_sin"], values["hour_cos"] = np.sin(hour), np.cos(hour)
+                values["week_sin"], values["week_cos"] = np.sin(week), np.cos(week)
+            elif step["op"] == "add_rolling_features":
+                for w in step["windows"]:
+                    for c in step["columns"]:
+                        state = self.rolling[(c, w)]
+                        if (c, w) not in pushed:
+                            state.push(values[c])
+                            pushed.add((c, w))
+                        for a in step["aggregations"]:
+                            x = state.value(a)
+                            values[f"rolling_{a}_{c}_{w}"] = step["fill_value"] if math.isnan(x) else x
+            elif step["op"] == "add_last_t":
+                # the lag buffers still hold the previous records at this point
+                buffer = self.lags[step["data"]]
+                for i in range(1, step["step"] + 1):
+                    values[f"{step['data']}_last_{i}_step"] = buffer.last(i - 1)
+        for data, buffer in self.lags.items():
+            buffer.push(values[data])
+
+        self.target.push(values[self.target_col])
+        self.n_seen += 1
+        if self.n_seen < self.window_size:
+            return None
+
+        self.target.ordered(self.feature_vector[: self.window_size])
+        for k, name in enumerate(self.exog_names):
+            self.feature_vector[self.window_size + k] = values[name]
+        return self.feature_vector
+
+    def warm_up(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Feed historical raw records, e.g. the last day before going live.
+
+        Parameters
+        ----------
+            df (pd.DataFrame):
+                Raw records in time order.
+
+        Returns
+        -------
+            np.ndarray: Feature vector of the last record.
+        """
+        vector = None
+        for timestamp, row in df.iterrows():
+            vector = self.update(row, timestamp)
+        return vector
@@ -0,0 +1,309 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from .dataset import _NAMED_ROLLING, _rolling_block
+from .profiling import profiled
+
+
+class FeaturePipeline:
+    def __init__(self, steps: list = None):
+        """
+        Initialize the FeaturePipeline object.
+
+        The pipeline records the feature engineering steps of Dataset (fill_nan, drop_nan,
+        add_seasonal_feat, add_rolling_features, add_last_t) as a plan instead of running
+        them one by one. transform computes all derived columns into one preallocated block
+        and concatenates it to the input once, and the fitted plan can be saved and replayed
+        on new data at inference time.
+
+        Parameters
+        ----------
+            steps (list, optional):
+                Serialized steps, as returned by to_dict. Defaults to None.
+
+        Example
+        -------
+            pipeline = FeaturePipeline().fill_nan(use_columns).add_seasonal_feat()
+            pipeline.add_rolling_features(["Wind speed (m/s)"], ["mean"], [4])
+            dataset.apply_pipeline(pipeline)
+            pipeline.save("features.json")
+        """
+        self.steps = [dict(step) for step in steps] if steps else []
+
+    def fill_nan(self, fields: list) -> "FeaturePipeline":
+        """
+        Forward fill the fields and fill the remaining NaN with the mean learned in fit.
+
+        Parameters
+        ----------
+            fields (list):
+                List of fields/columns to fill missing values.
+
+        Returns
+        -------
+            FeaturePipeline: The pipeline itself.
+        """
+        self.steps.append({"op": "fill_nan", "fields": list(fields), "means": None})
+        return self
+
+    def drop_nan(self, fields: list) -> "FeaturePipeline":
+        """
+        Drop the given columns.
+
+        Parameters
+        ----------
+            fields (list):
+                List of fields/columns to drop.
+
+        Returns
+        -------
+            FeaturePipeline: The pipeline itself.
+        """
+        self.steps.append({"op": "drop_nan", "fields": list(fields)})
+        return self
+
+    def add_seasonal_feat(self, time_col: str = None) -> "FeaturePipeline":
+        """
+        Add the hour and week sine/cosine features of Dataset.add_seasonal_feat.
+
+        Parameters
+        ----------
+            time_col (str, optional):
+                Name of a datetime column, None to use the index. Defaults to None.
+
+        Returns
+        -------
+            FeaturePipeline: The pipeline itself.
+        """
+        self.steps.append({"op": "add_seasonal_feat", "time_col": time_col})
+        return self
+
+    def add_rolling_features(
+        self, columns: list, aggregations: list, windows: list, fill_value: float = 0
+    ) -> "FeaturePipeline":
+        """
+        Add rolling aggregations like Dataset.add_rolling_features.
+
+        Parameters
+        ----------
+            columns (list):
+                Columns to aggregate.
+
+            aggregations (list):
+                Names of the aggregations, callables are not supported since the plan must be serializable.
+
+            windows (list):
+                Window sizes of the rolling windows.
+
+            fill_value (float, optional):
+                Value used for the incomplete windows at the start of the series. Defaults to 0.
+
+        Returns
+        -------
+            FeaturePipeline: The pipeline itself.
+        """
+        for aggregation in aggregations:
+            if not isinstance(aggregation, str) or not (
+                aggregation in _NAMED_ROLLING or aggregation.startswith("quantile_")
+            ):
+                raise ValueError(f"Pipeline aggregations must be named, got: {aggregation}")
+
+        self.steps.append(
+            {
+                "op": "add_rolling_features",
+                "columns": list(columns),
+                "aggregations": list(aggregations),
+                "windows": [int(w) for w in windows],
+                "fill_value": fill_value,
+            }
+        )
+        return self
+
+    def add_last_t(self, data: str, step: int = 2) -> "FeaturePipeline":
+        """
+        Add lagged versions of a column like Dataset.add_last_t.
+
+        Parameters
+        ----------
+            data (str):
+                Column name to create lagged versions of.
+
+            step (int, optional):
+                Number of lagged steps to add. Defaults to 2.
+
+        Returns
+        -------
+            FeaturePipeline: The pipeline itself.
+        """
+        self.steps.append({"op": "add_last_t", "data": data, "step": int(step)})
+        return self
+
+    @property
+    def fitted(self) -> bool:
+        """
+        Whether every fill_nan step has learned its fill values.
+        """
+        return all(s["means"] is not None for s in self.steps if s["op"] == "fill_nan")
+
+    @profiled
+    def fit(self, df: pd.DataFrame) -> "FeaturePipeline":
+        """
+        Learn the fill values of the fill_nan steps.
+
+        Parameters
+        ----------
+            df (pd.DataFrame):
+                Training data.
+
+        Returns
+        -------
+            FeaturePipeline: The pipeline itself.
+        """
+        for step in self.steps:
+            if step["op"] == "fill_nan":
+                step["means"] = {f: float(df[f].ffill().mean()) for f in step["fields"]}
+        return self
+
+    @profiled
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run the fitted plan on a DataFrame.
+
+        Parameters
+        ----------
+            df (pd.DataFrame):
+                Input data with the raw columns.
+
+        Returns
+        -------
+            pd.DataFrame: New DataFrame with the kept input columns followed by all derived columns.
+        """
+        if not self.fitted:
+            raise ValueError("FeaturePipeline must be fitted before transform")
+
+        filled = {}
+        dropped = set()
+        for step in self.steps:
+            if step["op"] == "fill_nan":
+                for f in step["fields"]:
+                    filled[f] = df[f].ffill().fillna(step["means"][f])
+            elif step["op"] == "drop_nan":
+                dropped.update(step["fields"])
+
+        block = np.empty((len(df), self.n_derived()), dtype=np.float64)
+        names = []
+
+        def column(name):
+            if name in names:
+                return block[:, names.index(name)]
+            if name in filled:
+                return filled[name].to_numpy(dtype=np.float64)
+            return df[name].to_numpy(dtype=np.float64)
+
+        for step in self.steps:
+            k = len(names)
+            if step["op"] == "add_seasonal_feat":
+                times = pd.DatetimeIndex(df.index if step["time_col"] is None else df[step["time_col"]])
+                hour = times.hour.to_numpy() / 23 * 2 * np.pi
+                week = times.isocalendar().week.to_numpy(dtype=np.float64) / 52 * 2 * np.pi
+                block[:, k : k + 4] = np.column_stack(
+                    (np.sin(hour), np.cos(hour), np.sin(week), np.cos(week))
+                )
+                names.extend(["hour_sin", "hour_cos", "week_sin", "week_cos"])
+            elif step["op"] == "add_rolling_features":
+                source = pd.DataFrame(
+                    {c: column(c) for c in step["columns"]}, index=df.index, copy=False
+                )
+                width = len(step["columns"]) * len(step["aggregations"]) * len(step["windows"])
+                out = block[:, k : k + width]
+                names.extend(_rolling_block(source, step["aggregations"], step["windows"], out))
+                np.nan_to_num(out, copy=False, nan=step["fill_value"])
+            elif step["op"] == "add_last_t":
+                values = column(step["data"])
+                for i in range(1, step["step"] + 1):
+                    block[:i, k + i - 1] = np.nan
+                    block[i:, k + i - 1] = values[:-i]
+                names.extend(f"{step['data']}_last_{i}_step" for i in range(1, step["step"] + 1))
+
+        base = df.drop(columns=[c for c in df.columns if c in dropped])
+        base = base.assign(**{f: v for f, v in filled.items() if f not in dropped})
+        keep = [i for i, n in enumerate(names) if n not in dropped]
+        derived = pd.DataFrame(block[:, keep], index=df.index, columns=[names[i] for i in keep])
+        return pd.concat([base, derived], axis=1)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fit the pipeline on a DataFrame and transform it.
+
+        Parameters
+        ----------
+            df (pd.DataFrame):
+                Training data.
+
+        Returns
+        -------
+            pd.DataFrame: Transformed data.
+        """
+        return self.fit(df).transform(df)
+
+    def n_derived(self) -> int:
+        """
+        Number of columns the plan derives.
+        """
+        n = 0
+        for step in self.steps:
+            if step["op"] == "add_seasonal_feat":
+                n += 4
+            elif step["op"] == "add_rolling_features":
+                n += len(step["columns"]) * len(step["aggregations"]) * len(step["windows"])
+            elif step["op"] == "add_last_t":
+                n += step["step"]
+        return n
+
+    def to_dict(self) -> dict:
+        """
+        Serialize the plan and its fitted state.
+        """
+        return {"steps": [dict(step) for step in self.steps]}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "FeaturePipeline":
+        """
+        Rebuild a pipeline serialized with to_dict.
+        """
+        return cls(state["steps"])
+
+    def save(self, path: str):
+        """
+        Save the plan and its fitted state as JSON.
+
+        Parameters
+        ----------
+            path (str):
+                Output file.
+
+        Returns
+        -------
+            None
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "FeaturePipeline":
+        """
+        Load a pipeline saved with save.
+
+        Parameters
+        ----------
+            path (str):
+                JSON file written by save.
+
+        Returns
+        -------
+            FeaturePipeline: The loaded pipeline.
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
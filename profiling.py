@@ -0,0 +1,254 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# profiler receiving the spans, None while profiling is disabled
+_active = None
+
+
+def _shapes(values) -> list:
+    shapes = []
+    for value in values:
+        if hasattr(value, "shape"):
+            shapes.append(list(value.shape))
+        elif isinstance(value, tuple) and any(hasattr(v, "shape") for v in value):
+            shapes.extend(list(v.shape) for v in value if hasattr(v, "shape"))
+    return shapes
+
+
+class Profiler:
+    def __init__(self, memory: bool = True):
+        """
+        Collect the stages of Dataset, ArrayDataset, FeaturePipeline and Model runs.
+
+        While the profiler is active (``with Profiler() as prof:``) every instrumented
+        method records a span with its wall time, CPU time of the process (including the
+        native threads of CatBoost and LightGBM), peak
+        traced memory and the shapes of its array arguments and results. Spans nest, so
+        a hyp_op span contains its trials, and each trial its train and predict spans.
+        When no profiler is active the instrumented methods only check one global.
+
+        Parameters
+        ----------
+            memory (bool, optional):
+                Trace the peak memory with tracemalloc. It covers Python and NumPy
+                allocations and slows allocation heavy code down. The peaks of spans
+                running in parallel threads are not separated. Defaults to True.
+
+        Example
+        -------
+            with Profiler() as prof:
+                dataset.add_rolling_features(columns, [np.mean], [4])
+                model.train(train_x, train_y, val_x, val_y)
+            print(prof.summary())
+            prof.save_chrome_trace("trace.json")
+        """
+        self.memory = memory
+        self.events = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._started_tracemalloc = False
+
+    def __enter__(self) -> "Profiler":
+        global _active
+        if _active is not None and _active is not self:
+            raise RuntimeError("Another Profiler is already active")
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _begin(self, name: str, category: str) -> dict:
+        span = {"name": name, "category": category}
+        stack = self._stack()
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["peak_abs"] = max(stack[-1]["peak_abs"], peak)
+            tracemalloc.reset_peak()
+            span["mem_start"] = span["peak_abs"] = current
+        span["depth"] = len(stack)
+        stack.append(span)
+        span["cpu_start"] = time.process_time()
+        span["start"] = time.perf_counter_ns()
+        return span
+
+    def _end(self, span: dict, **info):
+        end = time.perf_counter_ns()
+        cpu = time.process_time() - span.pop("cpu_start")
+        stack = self._stack()
+        stack.pop()
+
+        event = {
+            "name": span["name"],
+            "category": span["category"],
+            "thread": threading.get_ident(),
+            "depth": span["depth"],
+            "start_us": (span["start"] - self._origin) / 1e3,
+            "wall_s": (end - span["start"]) / 1e9,
+            "cpu_s": cpu,
+        }
+        if self.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            peak_abs = max(span["peak_abs"], peak)
+            event["peak_mb"] = (peak_abs - span["mem_start"]) / 2**20
+            if stack:
+                stack[-1]["peak_abs"] = max(stack[-1]["peak_abs"], peak_abs)
+        event.update(info)
+        with self._lock:
+            self.events.append(event)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Recorded spans, one row per span in order of completion.
+        """
+        return pd.DataFrame(self.events)
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Calls, total and mean wall time, total CPU time and the largest peak memory per stage.
+
+        Returns
+        -------
+            pd.DataFrame: One row per stage, sorted by total wall time.
+        """
+        df = self.to_frame()
+        if df.empty:
+            return df
+        aggregations = {
+            "calls": ("wall_s", "size"),
+            "wall_s": ("wall_s", "sum"),
+            "mean_wall_s": ("wall_s", "mean"),
+            "cpu_s": ("cpu_s", "sum"),
+        }
+        if "peak_mb" in df:
+            aggregations["peak_mb"] = ("peak_mb", "max")
+        return df.groupby("name").agg(**aggregations).sort_values("wall_s", ascending=False)
+
+    def save_log(self, path: str):
+        """
+        Write the spans as JSON lines, one object per span.
+
+        Parameters
+        ----------
+            path (str):
+                Output file.
+
+        Returns
+        -------
+            None
+        """
+        with open(path, "w") as f:
+            for event in self.events:
+                f.write(json.dumps(event, default=str) + "\n")
+
+    def save_chrome_trace(self, path: str):
+        """
+        Write the spans in the Chrome trace event format, to be opened in chrome://tracing,
+        Perfetto or speedscope as a timeline / flame graph.
+
+        Parameters
+        ----------
+            path (str):
+                Output file.
+
+        Returns
+        -------
+            None
+        """
+        trace = []
+        for event in self.events:
+            args = {
+                k: v
+                for k, v in event.items()
+                if k not in ("name", "category", "thread", "start_us", "wall_s")
+            }
+            trace.append(
+                {
+                    "name": event["name"],
+                    "cat": event["category"],
+                    "ph": "X",
+                    "ts": event["start_us"],
+                    "dur": event["wall_s"] * 1e6,
+                    "pid": os.getpid(),
+                    "tid": event["thread"],
+                    "args": args,
+                }
+            )
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, default=str)
+
+
+def get_profiler() -> Profiler:
+    """
+    The active Profiler, None while profiling is disabled.
+    """
+    return _active
+
+
+@contextmanager
+def profile(name: str, category: str = "stage", **info):
+    """
+    Record a block as a span of the active Profiler, e.g. a hyp_op trial.
+    """
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    span = profiler._begin(name, category)
+    try:
+        yield
+    finally:
+        profiler._end(span, **info)
+
+
+def profiled(fn):
+    """
+    Record every call of a method as a span of the active Profiler, with the shapes
+    of its array arguments and results.
+    """
+    name = fn.__qualname__
+    category = name.split(".")[0]
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        profiler = _active
+        if profiler is None:
+            return fn(*args, **kwargs)
+        span = profiler._begin(name, category)
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            return result
+        finally:
+            info = {
+                "in_shapes": _shapes(args[1:]) + _shapes(kwargs.values()),
+                "out_shapes": _shapes([result]) if result is not None else [],
+            }
+            # Dataset transforms work on self.df and return None
+            df = getattr(args[0], "df", None) if args else None
+            if isinstance(df, pd.DataFrame):
+                info["df_shape"] = list(df.shape)
+            profiler._end(span, **info)
+
+    return wrapper
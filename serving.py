@@ -0,0 +1,418 @@
+import argparse
+import asyncio
+import ipaddress
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .model import Model
+from .profiling import profile
+
+_LOOPBACK = ("localhost",)
+
+
+def _check_local(host: str):
+    if host in _LOOPBACK:
+        return
+    try:
+        if ipaddress.ip_address(host).is_loopback:
+            return
+    except ValueError:
+        pass
+    raise ValueError(f"ForecastServer only binds to localhost, got {host}")
+
+
+class ForecastServer:
+    def __init__(
+        self,
+        model,
+        max_batch: int = 256,
+        max_wait_ms: float = 5.0,
+        horizon: int = 1,
+        n_features: int = None,
+        latency_window: int = 10000,
+    ):
+        """
+        Micro-batching forecast service around Model.predict.
+
+        Concurrent requests (e.g. one per turbine every 10 minutes) are queued and
+        coalesced: the batcher waits at most max_wait_ms after the first queued request,
+        or until max_batch rows are collected, and scores all of them in one predict
+        call. The model is loaded once and warmed up with a dummy batch, predictions run
+        in a worker thread so requests keep being queued while a batch is scored.
+
+        Parameters
+        ----------
+            model (Model or str):
+                Trained Model, or the directory of a saved one (loaded with fast=True).
+
+            max_batch (int, optional):
+                Maximum number of rows per predict call. Defaults to 256.
+
+            max_wait_ms (float, optional):
+                Latency window in which requests are coalesced. Defaults to 5.0.
+
+            horizon (int, optional):
+                Horizon passed to Model.predict. Defaults to 1.
+
+            n_features (int, optional):
+                Features per row for the warm-up batch, taken from the model if None. Defaults to None.
+
+            latency_window (int, optional):
+                Number of recent requests the latency percentiles are computed over. Defaults to 10000.
+
+        Example
+        -------
+            server = ForecastServer("models/kelmarsh", max_wait_ms=2)
+            async with server:
+                forecasts = await asyncio.gather(*(server.predict(x) for x in turbine_rows))
+                print(server.stats())
+        """
+        self.model = Model.load(model, fast=True) if isinstance(model, str) else model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self.horizon = horizon
+        self.n_features = n_features
+        self.latencies = deque(maxlen=latency_window)
+        self.batch_sizes = deque(maxlen=latency_window)
+        self.batch_times = deque(maxlen=latency_window)
+        self.requests = 0
+        self._queue = None
+        self._batcher = None
+        self._http = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def _warm_up(self):
+        n_features = self.n_features
+        if n_features is None:
+            n_features = getattr(self.model, "n_features", None)
+        if n_features is None and self.model.feature_names is not None:
+            n_features = len(self.model.feature_names)
+        if n_features is None:
+            return
+        self.n_features = n_features
+        self.model.predict(np.zeros((self.max_batch, n_features), dtype=np.float32), self.horizon)
+
+    async def start(self) -> "ForecastServer":
+        """
+        Warm the model up and start the batcher.
+        """
+        if self._batcher is not None:
+            return self
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._warm_up)
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        return self
+
+    async def stop(self):
+        """
+        Stop the HTTP endpoint and the batcher, queued and in-flight requests are cancelled.
+        """
+        if self._http is not None:
+            self._http.close()
+            await self._http.wait_closed()
+            self._http = None
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            future.cancel()
+
+    async def __aenter__(self) -> "ForecastServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def predict(self, features) -> np.ndarray:
+        """
+        Queue one row (or a few rows) of features and wait for its forecast.
+
+        Parameters
+        ----------
+            features (np.ndarray):
+                Features of one turbine, 1D, or 2D with one row per forecast.
+
+        Returns
+        -------
+            np.ndarray: Forecast of every row, the rows of a 1D request are squeezed.
+        """
+        if self._batcher is None:
+            raise RuntimeError("ForecastServer is not started")
+        rows = np.asarray(features, dtype=np.float32)
+        single = rows.ndim == 1
+        rows = rows.reshape(1, -1) if single else rows
+        if rows.ndim != 2:
+            raise ValueError(f"Expected 1D or 2D features, got {rows.ndim} dimensions")
+        if self.n_features is None:
+            # models without a known feature count take the count of the first request
+            self.n_features = rows.shape[1]
+        elif rows.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {rows.shape[1]}")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((rows, future, time.perf_counter()))
+        pred = await future
+        return pred[0] if single else pred
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        items = []
+        try:
+            while True:
+                items = [await self._queue.get()]
+                n_rows = len(items[0][0])
+                deadline = loop.time() + self.max_wait
+                while n_rows < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    items.append(item)
+                    n_rows += len(item[0])
+
+                start = time.perf_counter()
+                try:
+                    batch = np.concatenate([rows for rows, _, _ in items])
+                    pred = await loop.run_in_executor(self._executor, self._predict, batch)
+                except Exception as e:
+                    # a failing batch fails its own requests, the batcher keeps serving
+                    for _, future, _ in items:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                done = time.perf_counter()
+
+                offset = 0
+                for rows, future, queued in items:
+                    if not future.done():
+                        future.set_result(pred[offset : offset + len(rows)])
+                    offset += len(rows)
+                    self.latencies.append(done - queued)
+                self.requests += len(items)
+                self.batch_sizes.append(len(batch))
+                self.batch_times.append(done - start)
+                items = []
+        finally:
+            # requests already taken off the queue (gathered or being scored) when the
+            # batcher is stopped are cancelled like the queued ones
+            for _, future, _ in items:
+                if not future.done():
+                    future.cancel()
+
+    def _predict(self, batch: np.ndarray) -> np.ndarray:
+        with profile("ForecastServer.batch", "ForecastServer", rows=len(batch)):
+            return np.asarray(self.model.predict(batch, self.horizon))
+
+    def queue_depth(self) -> int:
+        """
+        Number of requests waiting for the next batch.
+        """
+        return 0 if self._queue is None else self._queue.qsize()
+
+    def stats(self) -> dict:
+        """
+        Queue depth, request and batch counts, mean batch size and the percentiles of the
+        request latency (queued to answered) and of the predict time per batch, in ms.
+        """
+        stats = {
+            "queue_depth": self.queue_depth(),
+            "requests": self.requests,
+            "batches": len(self.batch_sizes),
+            "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+        }
+        for name, values in (("latency", self.latencies), ("batch", self.batch_times)):
+            for q in (50, 95, 99):
+                stats[f"{name}_p{q}_ms"] = float(np.percentile(values, q) * 1e3) if values else None
+        return stats
+
+    async def serve_http(self, host: str = "127.0.0.1", port: int = 8765):
+        """
+        Serve the model over HTTP on localhost.
+
+        POST /predict with {"features": [...]} (one row) or {"features": [[...], ...]}
+        answers {"predictions": [...]}, GET /stats answers stats().
+
+        Parameters
+        ----------
+            host (str, optional):
+                Loopback address to bind to. Defaults to "127.0.0.1".
+
+            port (int, optional):
+                Port to listen on, 0 for a free one. Defaults to 8765.
+
+        Returns
+        -------
+            int: The port the server listens on.
+        """
+        _check_local(host)
+        await self.start()
+        self._http = await asyncio.start_server(self._handle, host, port)
+        return self._http.sockets[0].getsockname()[1]
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, value = line.decode().split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    if method == "GET" and target == "/stats":
+                        status, payload = 200, self.stats()
+                    elif method == "POST" and target == "/predict":
+                        pred = await self.predict(json.loads(body)["features"])
+                        status, payload = 200, {"predictions": np.asarray(pred).tolist()}
+                    else:
+                        status, payload = 404, {"error": f"{method} {target} not found"}
+                except (ValueError, KeyError, TypeError) as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+                data = json.dumps(payload).encode()
+                reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[status]
+                writer.write(
+                    f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _http_predict(reader, writer, features) -> list:
+    body = json.dumps({"features": np.asarray(features).tolist()}).encode()
+    writer.write(
+        f"POST /predict HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+        + body
+    )
+    await writer.drain()
+    await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, value = line.decode().split(":", 1)
+        if key.lower() == "content-length":
+            length = int(value)
+    return json.loads(await reader.readexactly(length))["predictions"]
+
+
+async def load_test(
+    server: ForecastServer,
+    X: np.ndarray,
+    n_turbines: int = 100,
+    n_rounds: int = 20,
+    port: int = None,
+) -> dict:
+    """
+    Simulate a farm: every round all turbines request a forecast concurrently.
+
+    Parameters
+    ----------
+        server (ForecastServer):
+            Started server.
+
+        X (np.ndarray):
+            Feature rows, turbine i of a round sends row (round * n_turbines + i) % len(X).
+
+        n_turbines (int, optional):
+            Concurrent requests per round. Defaults to 100.
+
+        n_rounds (int, optional):
+            Number of rounds. Defaults to 20.
+
+        port (int, optional):
+            Send the requests over HTTP to this localhost port (one keep-alive connection
+            per turbine) instead of in-process. Defaults to None.
+
+    Returns
+    -------
+        dict: Server stats with the throughput in requests per second and the unbatched
+        predict time per request in ms for comparison.
+    """
+    connections = []
+    if port is not None:
+        connections = [await asyncio.open_connection("127.0.0.1", port) for _ in range(n_turbines)]
+
+    async def request(i, row):
+        if port is None:
+            return await server.predict(row)
+        return await _http_predict(*connections[i], row)
+
+    start = time.perf_counter()
+    for r in range(n_rounds):
+        rows = [X[(r * n_turbines + i) % len(X)] for i in range(n_turbines)]
+        await asyncio.gather(*(request(i, row) for i, row in enumerate(rows)))
+    elapsed = time.perf_counter() - start
+
+    for _, writer in connections:
+        writer.close()
+
+    single = X[:1].astype(np.float32)
+    timings = []
+    for _ in range(min(200, n_turbines * n_rounds)):
+        t = time.perf_counter()
+        server.model.predict(single, server.horizon)
+        timings.append(time.perf_counter() - t)
+
+    stats = server.stats()
+    stats["throughput_rps"] = n_turbines * n_rounds / elapsed
+    stats["unbatched_predict_ms"] = float(np.median(timings) * 1e3)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batching forecast server on localhost")
+    parser.add_argument("model", help="Directory of a model saved with Model.save")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--horizon", type=int, default=1)
+    parser.add_argument("--load-test", action="store_true", help="Run a load test with random features and exit")
+    parser.add_argument("--turbines", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    async def main():
+        server = ForecastServer(args.model, args.max_batch, args.max_wait_ms, args.horizon)
+        port = await server.serve_http(args.host, args.port)
+        if args.load_test:
+            X = np.random.default_rng(0).normal(size=(1000, server.n_features))
+            stats = await load_test(server, X, args.turbines, args.rounds, port)
+            await server.stop()
+            print(json.dumps(stats, indent=2))
+            return
+        print(f"Serving on http://{args.host}:{port}")
+        async with server._http:
+            await server._http.serve_forever()
+
+    asyncio.run(main())
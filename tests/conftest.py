@@ -0,0 +1,41 @@
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the repository is the Wind package itself (imported as Wind.dataset, Wind.model, ...),
+# register it under that name so the tests run from any checkout directory
+ROOT = Path(__file__).resolve().parents[1]
+if "Wind" not in sys.modules:
+    package = types.ModuleType("Wind")
+    package.__path__ = [str(ROOT)]
+    sys.modules["Wind"] = package
+
+
+def _scada_frame(n: int = 1500, seed: int = 0, missing: float = 0.0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "wind_speed": rng.normal(8, 2, n),
+            "rotor_rpm": rng.normal(12, 1, n),
+            "active_power_total": np.sin(np.arange(n) / 20) + rng.normal(0, 0.05, n),
+            "pitch": rng.normal(0, 1, n),
+        },
+        index=pd.date_range("2016-01-01", periods=n, freq="10min"),
+    )
+    if missing:
+        # scattered gaps and a gap at the start, which forward filling cannot reach
+        df.loc[rng.random(n) < missing, "wind_speed"] = np.nan
+        df.iloc[:3, 0] = np.nan
+    return df
+
+
+@pytest.fixture
+def scada_frame():
+    """
+    Factory of synthetic 10 minute SCADA frames, scada_frame(n, seed, missing).
+    """
+    return _scada_frame
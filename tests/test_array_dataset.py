@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Wind.array_dataset import ArrayDataset
+from Wind.dataset import Dataset
+
+
+@pytest.mark.parametrize("target_col", ["wind_speed", "active_power_total", "pitch"])
+def test_create_dataset_keeps_the_column_order(target_col, scada_frame):
+    df = scada_frame(800)
+    expected = Dataset(df).create_dataset(df, 12, 3, target_col=target_col)
+
+    dataset = ArrayDataset(df, reserve=2)
+    values = dataset.values.copy()
+    result = dataset.create_dataset(12, 3, target_col=target_col)
+
+    assert dataset.column_names == list(df.columns)
+    np.testing.assert_array_equal(dataset.values, values)
+    assert result[6] == expected[6]
+    for got, want in zip(result[:6], expected[:6]):
+        np.testing.assert_allclose(got, want)
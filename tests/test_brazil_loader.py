@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+xr = pytest.importorskip("xarray")
+pytest.importorskip("netCDF4")
+
+from Wind.brazil_loader import list_variables, load_dataset, load_netcdf
+
+
+def write_netcdf(path, heights):
+    time = pd.date_range("2020-01-01", periods=120, freq="1min")
+    rng = np.random.default_rng(0)
+    ds = xr.Dataset(
+        {
+            "wind_speed": (("Time", "Height"), rng.normal(8, 1, (len(time), len(heights)))),
+            "power": (("Time", "Turbine"), rng.normal(1000, 50, (len(time), 2))),
+        },
+        coords={"Time": time, "Height": heights, "Turbine": [1.0, 2.0]},
+    )
+    ds["wind_speed"].attrs["units"] = "m/s"
+    ds.to_netcdf(path)
+    return ds
+
+
+@pytest.mark.parametrize("heights", [[60.0, 100.0], ["hub", "top"]])
+def test_columns_per_height(tmp_path, heights):
+    path = tmp_path / "uebb.nc"
+    ds = write_netcdf(path, heights)
+
+    df = load_netcdf(path, height=heights, chunk_rows=50)
+    assert list(df.columns) == [f"wind_speed_{h}" for h in heights] + ["power"]
+    np.testing.assert_allclose(df[f"wind_speed_{heights[1]}"], ds["wind_speed"].sel(Height=heights[1]))
+    assert list_variables(path).loc["wind_speed", "units"] == "m/s"
+
+
+def test_resampled_chunks_match_a_single_resample(tmp_path):
+    path = tmp_path / "uebb.nc"
+    write_netcdf(path, [60.0, 100.0])
+
+    df = load_netcdf(path, freq="10min", chunk_rows=7)
+    expected = load_netcdf(path).resample("10min").mean()
+    pd.testing.assert_frame_equal(df, expected, check_freq=False)
+
+
+def test_load_dataset_forwards_chunk_rows_and_dtype(tmp_path):
+    path = tmp_path / "uebb.nc"
+    write_netcdf(path, [60.0, 100.0])
+
+    dataset = load_dataset(path, freq="10min", chunk_rows=7, dtype="float32")
+    assert (dataset.df.dtypes == np.float32).all()
+    expected = load_netcdf(path, freq="10min", chunk_rows=7, dtype="float32")
+    pd.testing.assert_frame_equal(dataset.df, expected)
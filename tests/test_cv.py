@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from Wind.cv import cross_validate, rolling_origin_folds
+
+
+def test_expanding_folds_cover_the_tail():
+    folds = rolling_origin_folds(120, n_folds=4, val_size=10)
+    assert [(train.start, train.stop) for train, _ in folds] == [(0, 80), (0, 90), (0, 100), (0, 110)]
+    assert [(val.start, val.stop) for _, val in folds] == [(80, 90), (90, 100), (100, 110), (110, 120)]
+
+
+def test_default_val_size_and_sliding_origin():
+    folds = rolling_origin_folds(60, n_folds=5, train_size=20)
+    assert all(len(val) == 10 for _, val in folds)
+    assert folds[0] == (range(0, 10), range(10, 20))
+    assert folds[-1] == (range(30, 50), range(50, 60))
+
+
+def test_gap_leaves_windows_out_before_validation():
+    folds = rolling_origin_folds(100, n_folds=3, val_size=10, gap=5)
+    for train, val in folds:
+        assert val.start - train.stop == 5
+    assert folds[0][0] == range(0, 65)
+
+    with pytest.raises(ValueError):
+        rolling_origin_folds(30, n_folds=3, val_size=10, gap=0)
+    with pytest.raises(ValueError):
+        rolling_origin_folds(35, n_folds=3, val_size=10, gap=5)
+
+
+@pytest.mark.parametrize(
+    "backend, params, prediction_type",
+    [
+        ("cb", {"iterations": 20, "verbose": 0}, "one_shot"),
+        ("lgb", {"n_estimators": 20, "verbose": -1}, "one_shot"),
+        ("lgb", {"n_estimators": 20, "verbose": -1}, "recursive"),
+    ],
+)
+def test_cross_validate_scores_every_fold(backend, params, prediction_type, scada_frame):
+    pytest.importorskip({"cb": "catboost", "lgb": "lightgbm"}[backend])
+    df = scada_frame(600)
+    scores = cross_validate(
+        df, 12, 3, backend, params, prediction_type, n_folds=2, n_workers=2, threads_per_worker=1
+    )
+    assert list(scores.index) == [0, 1, "mean", "std"]
+    assert np.isfinite(scores[["MAE", "RMSE", "R2"]].to_numpy(dtype=float)).all()
+    assert (scores.loc[[0, 1], "val_windows"] == scores.loc[0, "val_windows"]).all()
+    assert scores.loc[1, "train_windows"] > scores.loc[0, "train_windows"]
@@ -0,0 +1,130 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("dask.dataframe")
+
+from Wind import dask_dataset
+from Wind.dask_dataset import DaskDataset, fleet_dataset
+from Wind.dataset import Dataset
+
+
+def write_cache(path, df, turbine=2):
+    turbine_path = path / str(turbine)
+    turbine_path.mkdir(parents=True)
+    np.save(turbine_path / "time.npy", df.index.values.astype("datetime64[ns]").view(np.int64))
+    for i, column in enumerate(df.columns):
+        np.save(turbine_path / f"col_{i}.npy", df[column].to_numpy(dtype="float64"))
+    meta = {
+        "columns": list(df.columns),
+        "complete": True,
+        "index_name": df.index.name,
+        "dtype": "float64",
+        "sources": {},
+    }
+    with open(turbine_path / "meta.json", "w") as f:
+        json.dump(meta, f)
+
+
+def collect(stream):
+    batches = list(stream)
+    return np.concatenate([x for x, _ in batches]), np.concatenate([y for _, y in batches])
+
+
+def test_transforms_match_dataset(scada_frame):
+    df = scada_frame(3000, missing=0.05)
+    reference = Dataset(df.copy())
+    reference.fill_nan(["wind_speed"])
+    reference.apply_rolling_window(reference.df, "rotor_rpm", 7, np.mean)
+    reference.add_last_t(reference.df, "wind_speed", 3)
+    reference.add_rolling_features(["wind_speed"], ["std", "max"], [5, 20])
+
+    dataset = DaskDataset(df.copy(), npartitions=7)
+    dataset.fill_nan(["wind_speed"])
+    dataset.apply_rolling_window("rotor_rpm", 7, np.mean)
+    dataset.add_last_t("wind_speed", 3)
+    dataset.add_rolling_features(["wind_speed"], ["std", "max"], [5, 20])
+
+    result = dataset.to_frame()
+    assert list(result.columns) == list(reference.df.columns)
+    np.testing.assert_allclose(result.to_numpy(), reference.df.to_numpy())
+
+
+def test_fill_nan_carries_over_all_nan_partitions(scada_frame):
+    df = scada_frame(1000, missing=0.05)
+    df.iloc[300:700, 0] = np.nan
+    reference = Dataset(df.copy())
+    reference.fill_nan(["wind_speed"])
+
+    dataset = DaskDataset(df.copy(), npartitions=10)
+    dataset.fill_nan(["wind_speed"])
+    np.testing.assert_allclose(dataset.to_frame()["wind_speed"], reference.df["wind_speed"])
+
+
+def test_windows_match_create_dataset(scada_frame):
+    df = scada_frame(3000, missing=0.05)
+    expected = Dataset(df).create_dataset(df, 12, 3)
+
+    train, val, test, names = DaskDataset(df, npartitions=6).create_dataset(12, 3)
+    assert names == expected[6]
+    for stream, i in zip((train, val, test), range(3)):
+        x, y = collect(stream)
+        assert len(stream) == len(x)
+        np.testing.assert_allclose(x, expected[i])
+        np.testing.assert_allclose(y, expected[i + 3])
+
+
+def test_from_scada_cache_reads_each_partition_once(tmp_path, monkeypatch, scada_frame):
+    df = scada_frame(2000, missing=0.05)
+    df.index.name = "Date"
+    write_cache(tmp_path, df)
+
+    loads = []
+    load_scada = dask_dataset.load_scada
+
+    def counting_load(*args):
+        loads.append(args)
+        return load_scada(*args)
+
+    monkeypatch.setattr(dask_dataset, "load_scada", counting_load)
+    dataset = DaskDataset.from_scada_cache(tmp_path, 2, start="2016-01-02", partition_rows=250)
+    expected = df[df.index >= "2016-01-02"]
+    assert dataset.lengths == [250] * 7 + [len(expected) - 1750]
+
+    loads.clear()
+    dataset.fill_nan(["wind_speed"])
+    assert len(loads) == len(dataset.lengths)
+
+    # the windows read every partition of the training range once, the filling
+    # does not recompute the rest of the series
+    loads.clear()
+    train, _, _, _ = dataset.create_dataset(12, 3, target_col="active_power_total")
+    x, _ = collect(train)
+    _, _, train_stop = train.sources[0][1:]
+    assert len(loads) == -(-train_stop // 250)
+
+    reference = Dataset(expected.copy())
+    reference.fill_nan(["wind_speed"])
+    np.testing.assert_allclose(x, reference.create_dataset(reference.df, 12, 3)[0])
+
+
+def test_fleet_dataset_does_not_cross_series(scada_frame):
+    first, second = scada_frame(600, seed=0, missing=0.05), scada_frame(900, seed=1, missing=0.05)
+    datasets = [DaskDataset(first, npartitions=3), DaskDataset(second, npartitions=4)]
+    train, val, test, _ = fleet_dataset(datasets, 12, 3)
+
+    for stream, i in zip((train, val, test), range(3)):
+        x, y = collect(stream)
+        expected = [Dataset(df).create_dataset(df, 12, 3) for df in (first, second)]
+        np.testing.assert_allclose(x, np.concatenate([e[i] for e in expected]))
+        np.testing.assert_allclose(y, np.concatenate([e[i + 3] for e in expected]))
+
+
+@pytest.mark.parametrize("batch_size", [None, 64])
+def test_n_batches_matches_the_stream(batch_size, scada_frame):
+    df = scada_frame(1000, missing=0.05)
+    train, val, test, _ = DaskDataset(df, npartitions=7).create_dataset(12, 3, batch_size=batch_size)
+    for stream in (train, val, test):
+        assert stream.n_batches == len(list(stream))
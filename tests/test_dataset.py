@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from Wind.dataset import Dataset
+
+
+def split(df, gap=0, shuffle=False):
+    return Dataset(df).split_windows(df, 12, 6, shuffle=shuffle, gap=gap, random_state=0)
+
+
+def test_split_windows_match_create_dataset(scada_frame):
+    df = scada_frame(2000)
+    expected = Dataset(df).create_dataset(df, 12, 6)
+    train, val, test, names = split(df)
+    assert names == expected[6]
+    for i, windows in enumerate((train, val, test)):
+        np.testing.assert_allclose(windows.x(), expected[i])
+        np.testing.assert_allclose(windows.y(), expected[i + 3])
+
+
+@pytest.mark.parametrize("gap", [1, 6, 144])
+def test_gap_purges_at_the_chronological_boundary(scada_frame, gap):
+    df = scada_frame(2000)
+    train, val, _, _ = split(df)
+    purged, purged_val, _, _ = split(df, gap=gap)
+
+    # train windows end prediction_horizon positions before the first validation window
+    assert len(purged) == len(train) - max(gap - 6 + 1, 0)
+    np.testing.assert_allclose(purged.x(), train.x()[: len(purged)])
+    assert len(purged_val) == len(val)
+
+
+@pytest.mark.parametrize("gap", [0, 6, 144])
+def test_shuffle_keeps_the_purged_windows(scada_frame, gap):
+    df = scada_frame(2000)
+    purged, val, _, _ = split(df, gap=gap)
+    train, shuffled_val, _, _ = split(df, gap=gap, shuffle=True)
+    assert len(train) + len(shuffled_val) == len(purged) + len(val)
+    assert len(train) == len(purged)
+
+
+def test_gap_without_training_windows_raises(scada_frame):
+    df = scada_frame(200)
+    with pytest.raises(ValueError, match="No training windows"):
+        split(df, gap=500, shuffle=True)
+
+
+@pytest.mark.parametrize("name, function", [("std", np.std), ("var", np.var)])
+def test_named_and_numpy_rolling_aggregations_agree(scada_frame, name, function):
+    df = scada_frame(300)
+    named = Dataset(df.copy())
+    named.add_rolling_features(["wind_speed"], [name], [10])
+    numpy = Dataset(df.copy())
+    numpy.apply_rolling_window(numpy.df, "wind_speed", 10, function)
+
+    column = f"rolling_{name}_wind_speed_10"
+    np.testing.assert_allclose(named.df[column], numpy.df[column])
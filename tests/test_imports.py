@@ -0,0 +1,11 @@
+import pytest
+
+from Wind.benchmark import PACKAGE_MODULES, check_imports
+
+
+@pytest.mark.parametrize("module", PACKAGE_MODULES)
+def test_import_budget(module):
+    # raises if the import takes longer than the budget or loads a heavy dependency
+    results = check_imports((module,), budget_s=0.25, repeat=3)
+    assert results["loaded"].iloc[0] == []
+    assert results["seconds"].iloc[0] <= 0.25
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from Wind import kelmarsh_download
+from Wind.kelmarsh_download import download_file, download_zenodo_data, is_verified
+
+PAYLOAD = bytes(range(256)) * 4000
+MD5 = hashlib.md5(PAYLOAD).hexdigest()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # serves PAYLOAD at /file with Range support and a Zenodo style record at /records/1
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("Range")))
+        if self.path.startswith("/records/"):
+            body = json.dumps(self.server.record).encode()
+            self.send_response(200)
+        else:
+            body, start = PAYLOAD, 0
+            range_header = self.headers.get("Range")
+            if range_header:
+                start = int(range_header[len("bytes=") :].rstrip("-"))
+                if start >= len(PAYLOAD):
+                    self.send_response(416)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = PAYLOAD[start:]
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+            else:
+                self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.requests = []
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.record = {
+        "metadata": {"title": "Test", "version": "1", "license": {"id": "cc-by-4.0"}},
+        "links": {"latest_html": base + "/records/1"},
+        "doi": "10.0/test",
+        "files": [{"key": "data.zip", "size": len(PAYLOAD), "checksum": "md5:" + MD5, "links": {"self": base + "/file"}}],
+    }
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd, base
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize("offset", [300000, len(PAYLOAD)])
+def test_resumes_a_partial_download_with_a_range_request(server, tmp_path, offset):
+    httpd, base = server
+    outfile = str(tmp_path / "data.zip")
+    with open(outfile + ".part", "wb") as f:
+        f.write(PAYLOAD[:offset])
+
+    # a complete .part file is answered with 416 and only renamed
+    download_file(base + "/file", outfile, md5=MD5)
+
+    assert httpd.requests == [("/file", f"bytes={offset}-")]
+    with open(outfile, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert not os.path.exists(outfile + ".part")
+    assert is_verified(outfile, MD5)
+
+
+def test_checksum_mismatch_removes_the_download(server, tmp_path):
+    _, base = server
+    outfile = str(tmp_path / "data.zip")
+    with pytest.raises(IOError):
+        download_file(base + "/file", outfile, md5="0" * 32)
+    assert not os.path.exists(outfile)
+    assert not os.path.exists(outfile + ".part")
+
+
+def test_verified_files_are_skipped_through_the_marker(server, tmp_path, monkeypatch):
+    httpd, base = server
+    path = str(tmp_path) + "/"
+    download_zenodo_data(1, path, max_workers=2, url_zenodo=base + "/records/")
+    assert os.path.exists(path + "data.zip.md5")
+
+    # a valid marker is trusted without hashing the file again
+    def no_hashing(*args):
+        raise AssertionError("verified file was hashed again")
+
+    httpd.requests.clear()
+    monkeypatch.setattr(kelmarsh_download.hashlib, "md5", no_hashing)
+    summary = download_zenodo_data(1, path, max_workers=2, url_zenodo=base + "/records/")
+    assert httpd.requests == [("/records/1", None)]
+    assert summary["bytes"] == 0
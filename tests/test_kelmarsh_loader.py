@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from Wind import kelmarsh_loader
+from Wind.kelmarsh_loader import build_cache, load_scada
+
+
+def write_scada_csvs(path, turbine=2):
+    rng = np.random.default_rng(turbine)
+    for year in (2016, 2017):
+        index = pd.date_range(f"{year}-01-01", periods=200, freq="10min", name="# Date and time")
+        df = pd.DataFrame(
+            {
+                "Wind speed (m/s)": rng.normal(8, 2, len(index)),
+                "Power (kW)": rng.normal(1000, 100, len(index)),
+                "Rotor speed (RPM)": rng.normal(12, 1, len(index)),
+                "Status": "ok",
+            },
+            index=index,
+        )
+        name = f"Turbine_Data_Kelmarsh_{turbine}_{year}-01-01_-_{year + 1}-01-01_228.csv"
+        with open(path / name, "w") as f:
+            f.write("# header\n" * 9)
+            df.to_csv(f)
+
+
+def test_build_cache_adds_columns_to_the_cache(tmp_path, monkeypatch):
+    write_scada_csvs(tmp_path)
+    reads = []
+    read_scada_csv = kelmarsh_loader.read_scada_csv
+    monkeypatch.setattr(
+        kelmarsh_loader, "read_scada_csv", lambda f, columns=None: reads.append(columns) or read_scada_csv(f, columns)
+    )
+
+    cache = build_cache(tmp_path, columns=["Wind speed (m/s)", "Status"])
+    cache = build_cache(tmp_path, columns=["Power (kW)"])
+    assert reads == [["Wind speed (m/s)", "Status"]] * 2 + [["Power (kW)"]] * 2
+
+    # cached and non-numeric columns are not parsed again
+    reads.clear()
+    build_cache(tmp_path, columns=["Wind speed (m/s)", "Power (kW)", "Status"])
+    assert reads == []
+
+    df = load_scada(cache, 2)
+    assert list(df.columns) == ["Wind speed (m/s)", "Power (kW)"]
+    expected = pd.concat(read_scada_csv(f) for f in kelmarsh_loader.find_scada_files(tmp_path)[2])
+    pd.testing.assert_frame_equal(df, expected[list(df.columns)], check_freq=False)
+
+    build_cache(tmp_path)
+    assert list(load_scada(cache, 2).columns) == ["Wind speed (m/s)", "Power (kW)", "Rotor speed (RPM)"]
+
+
+def test_build_cache_reports_non_numeric_columns(tmp_path, capsys):
+    write_scada_csvs(tmp_path)
+    build_cache(tmp_path)
+    assert "Status" in capsys.readouterr().out
+
+
+def test_changed_csvs_rebuild_the_cached_columns(tmp_path):
+    write_scada_csvs(tmp_path)
+    cache = build_cache(tmp_path, columns=["Wind speed (m/s)"])
+    build_cache(tmp_path, columns=["Power (kW)"])
+
+    csv = sorted(tmp_path.glob("*.csv"))[0]
+    with open(csv, "a") as f:
+        f.write("2016-01-02 09:20:00,1.0,2.0,3.0,ok\n")
+    build_cache(tmp_path, columns=["Rotor speed (RPM)"])
+
+    df = load_scada(cache, 2)
+    assert list(df.columns) == ["Wind speed (m/s)", "Power (kW)", "Rotor speed (RPM)"]
+    assert len(df) == 401
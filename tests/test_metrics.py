@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from Wind.metrics import MetricAccumulator, align_predictions
+from Wind.utils import score_function
+
+
+def test_summary_matches_sklearn_over_batches():
+    rng = np.random.default_rng(0)
+    y_true, y_pred = rng.normal(size=(500, 3)), rng.normal(size=(500, 3))
+    acc = MetricAccumulator()
+    for rows in np.array_split(np.arange(500), 7):
+        acc.update(y_true[rows], y_pred[rows])
+
+    scores = acc.summary()
+    assert scores["MAE"] == pytest.approx(mean_absolute_error(y_true, y_pred))
+    assert scores["R2"] == pytest.approx(r2_score(y_true, y_pred))
+    assert score_function(y_true, y_pred)[2] == pytest.approx(scores["R2"])
+
+
+@pytest.mark.parametrize("y_pred", [[3.0, 3.0, 3.0], [3.0, 2.0, 3.0]])
+def test_r2_of_constant_targets_matches_sklearn(y_pred):
+    y_true = [3.0, 3.0, 3.0]
+    result = MetricAccumulator().update(y_true, y_pred).summary()
+    assert result["R2"] == r2_score(y_true, y_pred)
+
+
+def test_single_column_predictions_are_scored_against_y_index():
+    y_true = np.arange(12.0).reshape(4, 3)
+    y_pred = y_true[:, 1] + 0.5
+
+    aligned_true, aligned_pred = align_predictions(y_true, y_pred, y_index=1)
+    np.testing.assert_array_equal(aligned_true, y_true[:, [1]])
+    assert score_function(aligned_true, aligned_pred)[0] == pytest.approx(0.5)
+
+    with pytest.raises(ValueError):
+        align_predictions(y_true, y_true[:, :2])
@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Wind.dataset import Dataset
+from Wind.model import Model
+from Wind.utils import score_function
+
+
+@pytest.mark.parametrize(
+    "backend, params",
+    [("cb", {"iterations": 40, "use_best_model": False, "verbose": 0}), ("lgb", {"n_estimators": 40, "verbose": -1})],
+)
+def test_train_batches_splits_the_tree_budget(backend, params, scada_frame):
+    pytest.importorskip({"cb": "catboost", "lgb": "lightgbm"}[backend])
+    df = scada_frame()
+    train, val, _, _ = Dataset(df).stream_dataset(df, 12, 3, batch_size=128)
+    assert len(train) > 3
+
+    model = Model(backend, params)
+    model.train_batches(train, val, verbose=0)
+    trees = model.model.tree_count_ if backend == "cb" else model.model.booster_.num_trees()
+    assert trees == 40
+
+
+def test_train_batches_requires_n_batches_for_generators(scada_frame):
+    pytest.importorskip("lightgbm")
+    df = scada_frame()
+    train, val, _, _ = Dataset(df).stream_dataset(df, 12, 3, batch_size=128)
+
+    model = Model("lgb", {"n_estimators": 10, "verbose": -1})
+    with pytest.raises(ValueError):
+        model.train_batches(iter(train), val, verbose=0)
+    model.train_batches(iter(train), val, verbose=0, n_batches=len(train))
+    assert model.model.booster_.num_trees() == 10
+
+
+@pytest.mark.parametrize("backend", ["cb", "lgb"])
+def test_per_horizon_models_match_separate_fits(backend):
+    pytest.importorskip({"cb": "catboost", "lgb": "lightgbm"}[backend])
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(1500, 6))
+    y = np.column_stack([x[:, h] + rng.normal(0, 0.3, len(x)) for h in range(3)])
+    params = {"iterations": 60, "verbose": 0} if backend == "cb" else {"n_estimators": 60, "verbose": -1}
+
+    model = Model(backend, params)
+    model.train(x[:1000], y[:1000], x[1000:], y[1000:], multioutput=True, verbose=0, multioutput_strategy="per_horizon")
+
+    expected = []
+    for h in range(3):
+        reference = Model(backend, params)
+        reference.train(x[:1000], y[:1000, h], x[1000:], y[1000:, h], verbose=0, early_stopping_rounds=50)
+        expected.append(reference.predict(x[1000:]))
+    np.testing.assert_allclose(model.predict(x[1000:]), np.column_stack(expected), rtol=1e-6)
+
+
+def test_model_summarizer_scores_single_horizon_models_like_score_function():
+    pytest.importorskip("lightgbm")
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(900, 4))
+    y = np.column_stack([x[:, h] + rng.normal(0, 0.3, len(x)) for h in range(3)])
+    model = Model("lgb", {"n_estimators": 30, "verbose": -1})
+    model.train(x[:500], y[:500, -1], x[500:700], y[500:700, -1], verbose=0)
+
+    scores, _ = model.model_summarizer(
+        x[500:700], y[500:700], x[700:], y[700:], plots=False, feat_importance=False
+    )
+    expected = score_function(y[700:, -1], model.predict(x[700:]))
+    np.testing.assert_allclose(scores.loc["Test"].to_numpy(), expected)
+
+
+def hyp_op_data():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(600, 4))
+    y = x[:, 0] + rng.normal(0, 0.3, len(x))
+    return x[400:], y[400:], x[:400], y[:400]
+
+
+def test_hyp_op_prunes_on_the_optimized_metric(monkeypatch):
+    optuna = pytest.importorskip("optuna")
+    pytest.importorskip("catboost")
+    reported = []
+    report = optuna.trial.Trial.report
+    monkeypatch.setattr(optuna.trial.Trial, "report", lambda self, value, step: reported.append(value) or report(self, value, step))
+
+    val_x, val_y, train_x, train_y = hyp_op_data()
+    model = Model("cb")
+    _, best_mae = model.hyp_op(val_x, val_y, train_x, train_y, trial=2)
+
+    # the last report of a trial is the validation MAE the objective returns
+    assert reported and min(reported) == pytest.approx(best_mae, rel=0.05)
+    assert best_mae == pytest.approx(score_function(val_y, model.predict(val_x))[0])
+
+
+def test_hyp_op_raises_when_every_trial_is_pruned(monkeypatch):
+    optuna = pytest.importorskip("optuna")
+    pytest.importorskip("catboost")
+
+    class PruneAll(optuna.pruners.BasePruner):
+        def prune(self, study, trial):
+            return True
+
+    monkeypatch.setattr(optuna.pruners, "MedianPruner", lambda **kwargs: PruneAll())
+    val_x, val_y, train_x, train_y = hyp_op_data()
+    with pytest.raises(ValueError, match="trials"):
+        Model("cb").hyp_op(val_x, val_y, train_x, train_y, trial=2)
+
+
+def test_per_horizon_catboost_caches_one_pool_pair_and_updates(tmp_path):
+    pytest.importorskip("catboost")
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(900, 5))
+    y = np.column_stack([x[:, h] + rng.normal(0, 0.3, len(x)) for h in range(4)])
+
+    model = Model("cb", {"iterations": 30, "verbose": 0}, cache_dir=str(tmp_path))
+    model.train(x[:600], y[:600], x[600:], y[600:], multioutput=True, verbose=0, multioutput_strategy="per_horizon")
+    assert len(model._pools) == 1
+    assert len(list(tmp_path.iterdir())) == 3
+
+    # warm starts keep the borders of the trained models
+    model.update(x[:300], y[:300], x[600:], y[600:], iterations=5, verbose=0)
+    assert model.predict(x[:5]).shape == (5, 4)
+
+
+PERSISTED_MODELS = [
+    ("cb", {"iterations": 30, "verbose": 0}, None),
+    ("cb", {"iterations": 30, "verbose": 0}, "native"),
+    ("cb", {"iterations": 30, "verbose": 0}, "per_horizon"),
+    ("lgb", {"n_estimators": 30, "verbose": -1}, None),
+    ("lgb", {"n_estimators": 30, "verbose": -1}, "per_horizon"),
+]
+
+
+@pytest.mark.parametrize("backend, params, strategy", PERSISTED_MODELS)
+def test_save_load_and_update(tmp_path, backend, params, strategy):
+    pytest.importorskip({"cb": "catboost", "lgb": "lightgbm"}[backend])
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(900, 5)).astype(np.float32)
+    y = np.column_stack([x[:, h] + rng.normal(0, 0.3, len(x)) for h in range(3)])
+    if strategy is None:
+        y = y[:, -1]
+
+    model = Model(backend, params)
+    kwargs = {} if strategy is None else {"multioutput": True, "multioutput_strategy": strategy}
+    model.train(x[:600], y[:600], x[600:], y[600:], verbose=0, **kwargs)
+    expected = model.predict(x[600:])
+    model.save(str(tmp_path), feature_names=[f"f{i}" for i in range(5)])
+
+    loaded = Model.load(str(tmp_path))
+    assert loaded.feature_names == [f"f{i}" for i in range(5)]
+    np.testing.assert_allclose(loaded.predict(x[600:]), expected, rtol=1e-5, atol=1e-6)
+
+    fast = Model.load(str(tmp_path), fast=True)
+    np.testing.assert_allclose(fast.predict(x[600:]), expected, rtol=1e-4, atol=1e-5)
+    np.testing.assert_allclose(fast.predict_fast(x[600:605]), expected[:5], rtol=1e-4, atol=1e-5)
+    if backend == "cb":
+        with pytest.raises(ValueError):
+            fast.update(x[:300], y[:300], x[600:], y[600:], iterations=5, verbose=0)
+
+    # warm starts continue both the trained and the loaded model
+    for warm in (model, loaded):
+        warm.update(x[:300], y[:300], x[600:], y[600:], iterations=5, verbose=0)
+        assert warm.predict(x[600:]).shape == expected.shape
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Wind.dataset import Dataset
+from Wind.online import OnlineFeatureState, _RollingState
+from Wind.pipeline import FeaturePipeline
+
+
+@pytest.mark.parametrize("window", [1, 2, 7, 50])
+@pytest.mark.parametrize("aggregation", ["sum", "mean", "std", "var", "min", "max", "median", "quantile_0.9"])
+def test_rolling_state_matches_pandas(window, aggregation):
+    rng = np.random.default_rng(window)
+    x = rng.normal(1e3, 5, 600)
+    x[rng.random(len(x)) < 0.03] = np.nan
+    x[200:230] = 7.0
+
+    rolling = pd.Series(x).rolling(window)
+    if aggregation.startswith("quantile_"):
+        expected = rolling.quantile(float(aggregation[len("quantile_") :])).to_numpy()
+    elif aggregation in ("std", "var"):
+        expected = getattr(rolling, aggregation)(ddof=0).to_numpy()
+    else:
+        expected = getattr(rolling, aggregation)().to_numpy()
+
+    state = _RollingState(window)
+    result = []
+    for value in x:
+        state.push(value)
+        result.append(state.value(aggregation))
+    np.testing.assert_allclose(result, expected, rtol=1e-7, atol=1e-9)
+
+
+def test_online_state_matches_create_dataset(scada_frame):
+    raw = scada_frame(600, missing=0.05)
+    pipeline = (
+        FeaturePipeline()
+        .fill_nan(["wind_speed", "rotor_rpm"])
+        .add_seasonal_feat()
+        .add_rolling_features(["wind_speed"], ["mean", "std", "max", "median"], [6, 24])
+        .add_last_t("active_power_total", 3)
+    )
+    dataset = Dataset(raw.copy())
+    dataset.apply_pipeline(pipeline)
+    train_x, *_ = dataset.create_dataset(dataset.df, 12, 3, test_split=0, val_split=0)
+
+    state = OnlineFeatureState(pipeline, list(raw.columns), 12)
+    rows = []
+    for timestamp, record in raw.iterrows():
+        vector = state.update(record, timestamp)
+        if vector is not None:
+            rows.append(vector.copy())
+
+    # windows ending in the last prediction_horizon records have no label and no dataset row
+    assert len(rows) == len(train_x) + 3
+    np.testing.assert_allclose(np.array(rows[: len(train_x)]), train_x, rtol=1e-9, atol=1e-9)
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from Wind.model import Model
+from Wind.serving import ForecastServer, load_test
+
+
+class SlowModel:
+    # predicts the row sums after waiting for release, to keep a batch in flight
+    feature_names = ["a", "b", "c"]
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def predict(self, X, horizon=1):
+        self.calls += 1
+        if self.calls > 1:
+            self.release.wait(5)
+        return np.asarray(X).sum(axis=1)
+
+
+def test_load_test_over_http(scada_frame):
+    pytest.importorskip("lightgbm")
+    df = scada_frame(600)
+    x, y = df.drop(columns="active_power_total").to_numpy(), df["active_power_total"].to_numpy()
+    model = Model("lgb", {"n_estimators": 20, "verbose": -1})
+    model.train(x[:400], y[:400], x[400:], y[400:], verbose=0)
+    model.feature_names = list(df.columns.drop("active_power_total"))
+
+    async def main():
+        server = ForecastServer(model, max_wait_ms=2)
+        port = await server.serve_http(port=0)
+        try:
+            stats = await load_test(server, x, n_turbines=20, n_rounds=5, port=port)
+            direct = await server.predict(x[:3])
+        finally:
+            await server.stop()
+        return stats, direct
+
+    stats, direct = asyncio.run(main())
+    assert stats["requests"] == 100
+    assert stats["mean_batch_size"] > 1
+    np.testing.assert_allclose(direct, model.predict(x[:3].astype(np.float32)))
+
+
+def test_stop_cancels_pending_requests():
+    model = SlowModel()
+
+    async def main():
+        server = ForecastServer(model, max_wait_ms=1)
+        await server.start()
+        in_flight = asyncio.ensure_future(server.predict([1.0, 2.0, 3.0]))
+        await asyncio.sleep(0.05)
+        queued = asyncio.ensure_future(server.predict([4.0, 5.0, 6.0]))
+        await asyncio.sleep(0.01)
+        await server.stop()
+        model.release.set()
+        return await asyncio.wait_for(asyncio.gather(in_flight, queued, return_exceptions=True), 1)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
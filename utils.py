@@ -1,6 +1,5 @@
-from sklearn.metrics import mean_absolute_error, r2_score, mean_squared_error
 import numpy as np
-from tabulate import tabulate
+from .metrics import MetricAccumulator
 
 def score_function(true_values, predicted_values):
     """
@@ -12,17 +11,13 @@ def score_function(true_values, predicted_values):
 
     Returns:
     float: Score representing the performance of the prediction model.
-    """
-    # Calculate the mean absolute percentage error (MAPE)
-    mae = mean_absolute_error(true_values, predicted_values)
-
-    # Calculate the root mean squared error (RMSE)
-    rmse = mean_squared_error(true_values, predicted_values, squared=False)
 
-    # Calculate the R2 score
-    r_2 = r2_score(true_values, predicted_values)
+    All three metrics come from one MetricAccumulator pass. For 2D values the metrics of the
+    columns are averaged, as sklearn's mean_absolute_error, mean_squared_error and r2_score do.
+    """
+    scores = MetricAccumulator().update(true_values, predicted_values).summary()
 
-    return mae, rmse, r_2
+    return scores["MAE"], scores["RMSE"], scores["R2"]
 
 def experiment_results(names, results,title = 'Results'):
     """
@@ -30,7 +25,8 @@ def experiment_results(names, results,title = 'Results'):
 
     Parameters:
         names (list): List of model names.
-        results (list of dict): List of dictionaries containing metric results for each model.
+        results (list of dict): List of dictionaries containing metric results for each model,
+            or MetricAccumulator objects whose summary is used.
         title (str, optional): Title to be displayed above the results table. Default is 'Results'.
 
     This function takes model names and their corresponding metric results and displays them in a formatted table.
@@ -46,6 +42,7 @@ def experiment_results(names, results,title = 'Results'):
         ]
         experiment_results(names, results, title='Experiment 1 Results')
     """
+    results = [r.summary() if isinstance(r, MetricAccumulator) else r for r in results]
     metrics = ['MAE', 'RMSE', 'R2']
 
     header = ['Metric'] + metrics
@@ -68,5 +65,96 @@ def experiment_results(names, results,title = 'Results'):
             value = ['**' + str(val) + '**' if idx > 0 else val for idx, val in enumerate(value)]
         table_data.append(value)
 
+    from tabulate import tabulate
+
     table = tabulate(table_data, headers=header, tablefmt='pipe')
-    print(table)
\ No newline at end of file
+    print(table)
+
+def lttb_downsample(x, y, n_out):
+    """
+    Downsample a series with Largest-Triangle-Three-Buckets.
+
+    Parameters:
+    x (numpy.ndarray): Positions of the points.
+    y (numpy.ndarray): Values of the points.
+    n_out (int): Number of points to keep, at least 3.
+
+    Returns:
+    tuple: Positions and values of the kept points.
+
+    The first and the last point are kept. The other points are split into n_out - 2
+    buckets and the point of a bucket spanning the largest triangle with the previously
+    kept point and the mean of the next bucket is kept, which preserves peaks and troughs.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo = hi
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        next_hi = max(next_hi, next_lo + 1)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return x[kept], y[kept]
+
+
+def minmax_downsample(x, y, n_out):
+    """
+    Downsample a series by keeping the minimum and the maximum of every bucket.
+
+    Parameters:
+    x (numpy.ndarray): Positions of the points.
+    y (numpy.ndarray): Values of the points.
+    n_out (int): Number of points to keep, two per bucket.
+
+    Returns:
+    tuple: Positions and values of the kept points, in order.
+
+    Cheaper than lttb_downsample and keeps every extreme, which makes the plot of a
+    noisy series look like the plot of all its points.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(y)
+    buckets = n_out // 2
+    if n_out >= n or buckets < 1:
+        return x, y
+
+    size = -(-n // buckets)
+    padded = np.pad(y, (0, buckets * size - n), mode="edge").reshape(buckets, size)
+    offsets = np.arange(buckets)[:, None] * size
+    kept = np.sort(
+        np.stack([padded.argmin(axis=1), padded.argmax(axis=1)], axis=1) + offsets, axis=1
+    )
+    kept = np.unique(np.minimum(kept.reshape(-1), n - 1))
+    return x[kept], y[kept]
+
+
+def downsample(y, n_out, method='lttb'):
+    """
+    Downsample a series for plotting.
+
+    Parameters:
+    y (numpy.ndarray): Values of the series, its positions are 0 to len(y) - 1.
+    n_out (int): Number of points to keep.
+    method (str, optional): 'lttb', 'minmax' or None to keep all points. Default is 'lttb'.
+
+    Returns:
+    tuple: Positions and values of the kept points.
+    """
+    x = np.arange(len(y))
+    if method is None or n_out is None:
+        return x, np.asarray(y)
+    if method == 'lttb':
+        return lttb_downsample(x, y, n_out)
+    if method == 'minmax':
+        return minmax_downsample(x, y, n_out)
+    raise ValueError(f"Unknown downsampling method: {method}")
@@ -0,0 +1,254 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class SlidingWindows:
+    def __init__(
+        self,
+        target: np.ndarray,
+        exog: np.ndarray,
+        window_size: int,
+        prediction_horizon: int,
+        start: int = 0,
+        stop: int = None,
+    ):
+        """
+        Lazy (X, y) windows over a contiguous range of one time series.
+
+        Window ``i`` uses ``target[start + i : start + i + window_size]`` as lags,
+        the exogenous row at ``start + i + window_size - 1`` and
+        ``target[start + i + window_size : start + i + window_size + prediction_horizon]``
+        as labels. Lags and labels are read-only strided views over ``target``,
+        nothing is copied until ``x`` or ``y`` is called.
+
+        Parameters
+        ----------
+            target (np.ndarray):
+                1D array holding the target series.
+
+            exog (np.ndarray):
+                2D array of exogenous features aligned with ``target``, or None for univariate windows.
+
+            window_size (int):
+                Size of the input window.
+
+            prediction_horizon (int):
+                Number of steps to predict into the future.
+
+            start (int, optional):
+                First row of the range covered by the windows. Defaults to 0.
+
+            stop (int, optional):
+                End (exclusive) of the range covered by the windows. Defaults to the series length.
+        """
+        self.target = np.ascontiguousarray(target)
+        self.exog = exog
+        self.window_size = window_size
+        self.prediction_horizon = prediction_horizon
+        self.start, self.stop, _ = slice(start, stop).indices(len(self.target))
+        self.stop = max(self.stop, self.start)
+
+        n = self.stop - self.start - window_size - prediction_horizon + 1
+        self.n_windows = max(n, 0)
+
+        series = self.target[self.start : self.stop]
+        if self.n_windows:
+            self.lags = sliding_window_view(series, window_size)[: self.n_windows]
+            self.future = sliding_window_view(series[window_size:], prediction_horizon)[
+                : self.n_windows
+            ]
+        else:
+            self.lags = np.empty((0, window_size), dtype=self.target.dtype)
+            self.future = np.empty((0, prediction_horizon), dtype=self.target.dtype)
+
+    def __len__(self) -> int:
+        return self.n_windows
+
+    @property
+    def n_features(self) -> int:
+        """
+        Number of columns of the materialized X matrix.
+        """
+        return self.window_size + (0 if self.exog is None else self.exog.shape[1])
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        dtype of the materialized X matrix.
+        """
+        if self.exog is None:
+            return self.target.dtype
+        return np.result_type(self.target.dtype, self.exog.dtype)
+
+    def _positions(self, idx) -> np.ndarray:
+        if idx is None:
+            return np.arange(self.n_windows)
+        if isinstance(idx, slice):
+            return np.arange(*idx.indices(self.n_windows))
+        return np.asarray(idx)
+
+    def x(self, idx=None) -> np.ndarray:
+        """
+        Materialize the input matrix for the selected windows.
+
+        Parameters
+        ----------
+            idx (slice or array-like, optional):
+                Window positions to gather. Defaults to all windows.
+
+        Returns
+        -------
+            np.ndarray: Array of shape (n, n_features) holding the lags followed by the exogenous features.
+        """
+        positions = self._positions(idx)
+        out = np.empty((len(positions), self.n_features), dtype=self.dtype)
+        out[:, : self.window_size] = self.lags[positions]
+        if self.exog is not None:
+            rows = self.start + self.window_size - 1 + positions
+            out[:, self.window_size :] = self.exog[rows]
+        return out
+
+    def y(self, idx=None) -> np.ndarray:
+        """
+        Materialize the label matrix for the selected windows.
+
+        Parameters
+        ----------
+            idx (slice or array-like, optional):
+                Window positions to gather. Defaults to all windows.
+
+        Returns
+        -------
+            np.ndarray: Array of shape (n, prediction_horizon).
+        """
+        return self.future[self._positions(idx)]
+
+    def batches(self, batch_size: int = 4096, max_bytes: int = None) -> "WindowBatches":
+        """
+        Iterate over the windows in (X, y) mini-batches.
+
+        Parameters
+        ----------
+            batch_size (int, optional):
+                Number of windows per batch. Defaults to 4096.
+
+            max_bytes (int, optional):
+                Upper bound for the memory of one (X, y) batch. When given, the batch size
+                is reduced so that a batch never exceeds it. Defaults to None.
+
+        Returns
+        -------
+            WindowBatches: Re-iterable object yielding (X_batch, y_batch) tuples.
+        """
+        return WindowBatches(self, batch_size, max_bytes)
+
+    def subset(self, positions: np.ndarray) -> "WindowSubset":
+        """
+        Select windows by position without materializing them.
+
+        Parameters
+        ----------
+            positions (np.ndarray):
+                Window positions, in the order the rows should be gathered.
+
+        Returns
+        -------
+            WindowSubset: Lazy selection of windows.
+        """
+        return WindowSubset(self, positions)
+
+
+class WindowSubset:
+    def __init__(self, windows: SlidingWindows, positions: np.ndarray):
+        """
+        Lazy selection of windows of a SlidingWindows object, e.g. a shuffled split.
+
+        Only the positions are stored, rows are gathered from the underlying views
+        when ``x`` or ``y`` is called, so a batch only copies its own rows.
+
+        Parameters
+        ----------
+            windows (SlidingWindows):
+                Windows to select from.
+
+            positions (np.ndarray):
+                Window positions, in the order the rows should be gathered.
+        """
+        self.windows = windows
+        self.positions = np.asarray(positions, dtype=np.intp)
+        self.target = windows.target
+        self.window_size = windows.window_size
+        self.prediction_horizon = windows.prediction_horizon
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def n_features(self) -> int:
+        return self.windows.n_features
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.windows.dtype
+
+    def x(self, idx=None) -> np.ndarray:
+        """
+        Materialize the input matrix for the selected windows, see SlidingWindows.x.
+        """
+        return self.windows.x(self.positions if idx is None else self.positions[idx])
+
+    def y(self, idx=None) -> np.ndarray:
+        """
+        Materialize the label matrix for the selected windows, see SlidingWindows.y.
+        """
+        return self.windows.y(self.positions if idx is None else self.positions[idx])
+
+    def batches(self, batch_size: int = 4096, max_bytes: int = None) -> "WindowBatches":
+        """
+        Iterate over the selected windows in (X, y) mini-batches, see SlidingWindows.batches.
+        """
+        return WindowBatches(self, batch_size, max_bytes)
+
+
+class WindowBatches:
+    def __init__(self, windows, batch_size: int = 4096, max_bytes: int = None):
+        """
+        Re-iterable stream of (X, y) mini-batches over a SlidingWindows or WindowSubset object.
+
+        Only one batch is materialized at a time, so the memory used by a pass is
+        bounded by the batch size regardless of the length of the split.
+
+        Parameters
+        ----------
+            windows (SlidingWindows or WindowSubset):
+                Windows to stream.
+
+            batch_size (int, optional):
+                Number of windows per batch. Defaults to 4096.
+
+            max_bytes (int, optional):
+                Upper bound for the memory of one (X, y) batch. Defaults to None.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+
+        self.windows = windows
+        if max_bytes is not None:
+            row_bytes = (
+                windows.n_features * windows.dtype.itemsize
+                + windows.prediction_horizon * windows.target.dtype.itemsize
+            )
+            if max_bytes < row_bytes:
+                raise ValueError(
+                    f"max_bytes={max_bytes} is smaller than a single window ({row_bytes} bytes)"
+                )
+            batch_size = min(batch_size, max_bytes // row_bytes)
+        self.batch_size = batch_size
+
+    def __len__(self) -> int:
+        return -(-len(self.windows) // self.batch_size)
+
+    def __iter__(self):
+        for start in range(0, len(self.windows), self.batch_size):
+            idx = slice(start, start + self.batch_size)
+            yield self.windows.x(idx), self.windows.y(idx)